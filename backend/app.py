@@ -1,25 +1,52 @@
 import os
+import json
 import uuid
+import base64
+import time
+import smtplib
+import tempfile
+import click
+import logging
+from functools import wraps
 import requests
 from flask import jsonify, request
 from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError, DataError
 from werkzeug.security import generate_password_hash
-from sqlalchemy.orm import Session
-from datetime import datetime
-from werkzeug.utils import secure_filename
-from flask import Flask, render_template, request, jsonify, current_app, Blueprint ,url_for
+from sqlalchemy.orm import Session, joinedload, load_only
+from datetime import datetime, date, timedelta
+from collections import defaultdict
+from werkzeug.datastructures import MultiDict
+from jinja2 import FileSystemBytecodeCache
+from flask import Flask, render_template, request, jsonify, current_app, Blueprint ,url_for, send_from_directory, g, redirect, make_response
 from flask_sqlalchemy import SQLAlchemy
 from flask_mail import Mail
 from flask_cors import CORS
 from flask_mail import Message as MailMessage
 from flask import render_template_string
 from sqlalchemy.dialects.postgresql import JSON
+from sqlalchemy.dialects import postgresql, sqlite
 from flask_socketio import SocketIO, emit, join_room
-from flask_bcrypt import Bcrypt
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, get_jwt, decode_token
+from flask_jwt_extended import verify_jwt_in_request, set_access_cookies, unset_jwt_cookies
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
+from schema import upgrade_schema, on_upgrade
+from search import search_article_ids
+import photos as photo_manifest
+from uploads import UPLOADERS, LocalUploader, UploadPipeline, spool
+from images import ImageProcessor
+from blobstore import BlobStore
+from broker import socketio_options
+from writebehind import WriteBehindQueue
+from passwords import PasswordHasher, HasherBusy
+from compression import ResponseCompressor
+from metrics import Registry, MetricsExporter, InstrumentedQueuePool
+import sqltrace
+from httpcache import ResponseCache
 
 # ---------------- CONFIG ----------------
 
@@ -27,35 +54,8 @@ BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 STATIC_DIR = os.path.join(BASE_DIR, 'static')
 
-app = Flask(
-    __name__,
-    template_folder=TEMPLATES_DIR,
-    static_folder=STATIC_DIR
-)
-
-CORS(app, resources={r"/*": {"origins": "*"}})
-
-# Configuration Cloudinary
-cloudinary.config(
-    cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
-    api_key=os.getenv('CLOUDINARY_API_KEY'),
-    api_secret=os.getenv('CLOUDINARY_API_SECRET')
-)
-
-# Après votre configuration Cloudinary
-print("=== CONFIGURATION CLOUDINARY ===")
-print(f"Cloud Name: {os.getenv('CLOUDINARY_CLOUD_NAME')}")
-print(f"API Key: {os.getenv('CLOUDINARY_API_KEY')}")
-print(f"API Secret: {'*' * len(os.getenv('CLOUDINARY_API_SECRET', ''))}")
-
-if os.getenv('CLOUDINARY_CLOUD_NAME') and os.getenv('CLOUDINARY_API_KEY') and os.getenv('CLOUDINARY_API_SECRET'):
-    print("✅ Toutes les variables Cloudinary sont configurées")
-else:
-    print("❌ Variables Cloudinary manquantes")
 # Dossier upload local (fallback)
 UPLOAD_FOLDER = os.path.join('static', 'uploads')
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "webp"}
 
 def allowed_file(filename):
@@ -70,33 +70,194 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-super-secret-key')
     
 
-# Charger la configuration depuis config.py
-app.config.from_object(Config)
-
+# Routes, hooks et commandes CLI : déclarés sur ce blueprint, attaché à l'application par create_app()
+main = Blueprint("main", __name__, cli_group=None)
 sell_bp = Blueprint("sell", __name__)
 
-# Configuration
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['JWT_SECRET_KEY'] = 'jwt_super_secret_key'
-
-# Mail
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
-app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
-print("📧 MAIL_USERNAME =", app.config['MAIL_USERNAME'])
-print("🔒 MAIL_PASSWORD défini ?", bool(app.config['MAIL_PASSWORD']))
-
-app.config['MAIL_DEFAULT_SENDER'] = ('IZRUSSIA', os.environ.get("MAIL_USERNAME"))
-
-# Extensions
-db = SQLAlchemy(app)
-bcrypt = Bcrypt(app)
-mail = Mail(app)
-jwt = JWTManager(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+# Extensions, liées à l'application dans create_app()
+db = SQLAlchemy()
+# bcrypt hors du hub gevent ; changer BCRYPT_LOG_ROUNDS rehache au prochain login
+password_hasher = PasswordHasher(
+    rounds=int(os.getenv('BCRYPT_LOG_ROUNDS', 12)),
+    workers=int(os.getenv('PASSWORD_HASH_THREADS', 4)),
+    max_pending=int(os.getenv('PASSWORD_HASH_MAX_PENDING', 64)),
+)
+mail = Mail()
+jwt = JWTManager()
+# Plusieurs workers : les emits passent par le broker (redis://… en production, local://… en dev)
+SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE')
+socketio = SocketIO()
+# Compression br/gzip des réponses JSON et HTML au-delà de COMPRESS_MIN_SIZE octets
+compressor = ResponseCompressor(min_size=int(os.getenv('COMPRESS_MIN_SIZE', 1024)))
+
+@main.after_app_request
+def compress_response(response):
+    return compressor.compress(request, response)
+
+# ---------------- MÉTRIQUES ----------------
+# Latence et erreurs par endpoint, événements Socket.IO, pool SQL ; exposées sur /metrics
+# (texte Prometheus). METRICS_DIR : répertoire partagé pour agréger plusieurs workers.
+# METRICS_TOKEN : si défini, /metrics exige "Authorization: Bearer <token>".
+metrics = Registry()
+http_latency = metrics.histogram("http_request_duration_seconds", "Durée des requêtes HTTP", ("endpoint", "method"))
+http_requests = metrics.counter("http_requests_total", "Requêtes HTTP par statut", ("endpoint", "method", "status"))
+http_errors = metrics.counter("http_request_errors_total", "Réponses HTTP 5xx", ("endpoint",))
+socket_events = metrics.counter("socketio_events_total", "Événements Socket.IO reçus", ("event",))
+socket_errors = metrics.counter("socketio_event_errors_total", "Événements Socket.IO en erreur", ("event",))
+socket_latency = metrics.histogram("socketio_event_duration_seconds", "Durée de traitement des événements Socket.IO", ("event",))
+socket_emits = metrics.counter("socketio_emits_total", "Messages Socket.IO émis, par type de room", ("event", "room"))
+socket_clients = metrics.gauge("socketio_connected_clients", "Clients Socket.IO connectés")
+InstrumentedQueuePool.wait_histogram = metrics.histogram(
+    "db_pool_checkout_wait_seconds", "Attente d'une connexion libre dans le pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+InstrumentedQueuePool.timeouts = metrics.counter("db_pool_timeouts_total", "Attentes de connexion abandonnées (pool plein)")
+
+# Somme sur les pools instrumentés du processus : aucune application ni contexte requis
+def pool_state(method):
+    def collect():
+        return {(): sum(getattr(pool, method)() for pool in list(InstrumentedQueuePool.instances))}
+    return collect
+
+metrics.gauge("db_pool_size", "Taille du pool SQL", collect=pool_state("size"))
+metrics.gauge("db_pool_checked_out", "Connexions SQL en cours d'utilisation", collect=pool_state("checkedout"))
+metrics.gauge("db_pool_overflow", "Connexions SQL au-delà de la taille du pool", collect=pool_state("overflow"))
+
+metrics_exporter = MetricsExporter(
+    metrics,
+    directory=os.getenv('METRICS_DIR'),
+    interval=int(os.getenv('METRICS_FLUSH_INTERVAL', 5)),
+)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+@main.before_app_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    metrics_exporter.start()
+
+@main.after_app_request
+def record_request_metrics(response):
+    endpoint = request.endpoint or "inconnu"
+    http_latency.observe(time.perf_counter() - g.request_started, (endpoint, request.method))
+    http_requests.inc((endpoint, request.method, response.status_code))
+    if response.status_code >= 500:
+        http_errors.inc((endpoint,))
+    return response
+
+# Protégé par METRICS_TOKEN ; sans token configuré, exposé seulement en debug ou en test
+@main.route('/metrics')
+def metrics_endpoint():
+    if not METRICS_TOKEN:
+        if not (current_app.debug or current_app.testing):
+            return jsonify({"error": "METRICS_TOKEN non configuré"}), 404
+    elif request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return jsonify({"error": "Accès refusé"}), 403
+    return current_app.response_class(metrics_exporter.collect(), mimetype="text/plain; version=0.0.4")
+
+# Type de room d'un emit : "chat", "user", "sid" (un client) ou "broadcast" (cardinalité bornée)
+def room_kind(room):
+    if room is None:
+        return "broadcast"
+    prefix = str(room).split("_", 1)[0]
+    return prefix if prefix in ("chat", "user") else "sid"
+
+# Tous les emits (socketio.emit, emit() des handlers) passent par socketio.server.emit
+def count_emits(server):
+    server_emit = server.emit
+
+    def counted_emit(event, *args, to=None, room=None, **kwargs):
+        socket_emits.inc((event, room_kind(to if to is not None else room)))
+        return server_emit(event, *args, to=to, room=room, **kwargs)
+
+    server.emit = counted_emit
+
+# Remplace @socketio.on(name) : compte, chronomètre et compte les erreurs de l'événement
+def socket_event(name):
+    def decorator(fn):
+        @wraps(fn)
+        def handler(*args):
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            except Exception:
+                socket_errors.inc((name,))
+                raise
+            finally:
+                socket_events.inc((name,))
+                socket_latency.observe(time.perf_counter() - started, (name,))
+        return socketio.on(name)(handler)
+    return decorator
+
+# Utilisateur authentifié de chaque client Socket.IO (sid -> user_id) : token JWT passé à la
+# connexion, io(url, {auth: {token}}), ou dans le payload de `join`. Les rooms personnelles et
+# les rooms de chat ne se rejoignent qu'avec cette identité, jamais avec un id fourni par le client.
+socket_users = {}
+
+def socket_identity(token):
+    if not token:
+        return None
+    try:
+        payload = decode_token(token)
+    except (PyJWTError, JWTExtendedException):
+        return None
+    if payload.get("type") != "access" or token_revoked(None, payload):
+        return None
+    return int(payload["sub"])
+
+def authenticate_socket(token):
+    user_id = socket_identity(token)
+    if user_id is not None:
+        socket_users[request.sid] = user_id
+        join_room(user_room(user_id))
+    return user_id
+
+@socketio.on('connect')
+def socket_connect(auth=None):
+    socket_clients.inc()
+    authenticate_socket(auth.get("token") if isinstance(auth, dict) else None)
+
+@socketio.on('disconnect')
+def socket_disconnect(*args):
+    socket_clients.dec()
+    socket_users.pop(request.sid, None)
+
+# Instrumentation SQL par requête : en-tête Server-Timing (db = temps en base, app = total),
+# détail des instructions répétées dans le log debug. En mode test (app.testing), une même
+# instruction exécutée plus de SQL_MAX_REPEATS fois fait échouer la requête (N+1).
+# Actif en debug et en test seulement : SQL_TRACE=True (ou False) force le choix en production.
+SQL_TRACE = os.getenv('SQL_TRACE')
+SQL_MAX_REPEATS = int(os.getenv('SQL_MAX_REPEATS', 0))
+SQL_TEST_MAX_REPEATS = 10
+
+def sql_trace_enabled():
+    if SQL_TRACE is not None:
+        return SQL_TRACE == 'True'
+    return current_app.debug or current_app.testing
+
+@main.before_app_request
+def begin_sql_trace():
+    if sql_trace_enabled():
+        sqltrace.begin(SQL_MAX_REPEATS or (SQL_TEST_MAX_REPEATS if current_app.testing else 0))
+
+@main.after_app_request
+def add_server_timing(response):
+    stats = sqltrace.end()
+    if stats is None:
+        return response
+    total = (time.perf_counter() - g.request_started) * 1000
+    response.headers.add(
+        "Server-Timing",
+        f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} req", app;dur={total:.1f}',
+    )
+    if current_app.logger.isEnabledFor(logging.DEBUG):
+        current_app.logger.debug("SQL %s %s : %d requêtes, %.1f ms", request.method, request.path, stats.count, stats.duration * 1000)
+        for shape, n in stats.repeated():
+            current_app.logger.debug("  %d× %s", n, shape)
+    return response
+
+@main.teardown_app_request
+def end_sql_trace(exc):
+    sqltrace.end()
 
 # ---------------- MODELES ----------------
 class User(db.Model):
@@ -109,10 +270,14 @@ class User(db.Model):
     phone = db.Column(db.String(50))
     password_hash = db.Column(db.String(255), nullable=False)
     balance = db.Column(db.Float, default=0.0)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     purchases = db.relationship("Purchase", backref="buyer", lazy=True)
     role = db.Column(db.String(20), default="user")
     is_active = db.Column(db.Boolean, default=True)
+    # Incrémenté à chaque changement de rôle ou d'état : invalide les tokens déjà émis
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # Messages reçus non lus, tenu à jour à l'insertion et à la lecture (voir add_unread)
+    unread_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
     cotisations = db.relationship("Cotisation", backref="user", lazy=True)
     articles = db.relationship("Article", backref="user", lazy=True)
 
@@ -121,7 +286,7 @@ class User(db.Model):
         self.last_name = last_name
         self.email = email
         self.phone = phone
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = password_hasher.hash(password)
     
     def to_dict(self):
         return {
@@ -140,12 +305,17 @@ class Cotisation(db.Model):
     __tablename__ = "cotisations"
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
     montant_envoye = db.Column(db.Float, nullable=False)
     montant_recu = db.Column(db.Float, nullable=False)
     statut = db.Column(db.String(20), default="en_attente")
     date_cotisation = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_cotisations_statut_date', 'statut', 'date_cotisation'),
+        db.Index('ix_cotisations_date', 'date_cotisation'),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -156,18 +326,37 @@ class Cotisation(db.Model):
             "date_cotisation": self.date_cotisation.strftime("%Y-%m-%d %H:%M:%S")
         }
 
-@event.listens_for(Cotisation, "after_update")
-def update_balance_after_validation(mapper, connection, target):
-    if target.statut in ["valide", "validee"]:
-        session = Session(bind=connection)
-        user = session.query(User).get(target.user_id)
-        if user:
-            user.balance += target.montant_recu
-            session.commit()
-        session.close()
+# Grand livre des soldes, en ajout seul : source de vérité de users.balance (qui n'en est que le cumul).
+# `ref` identifie l'opération métier ("cotisation:12") et rend chaque écriture idempotente.
+class LedgerEntry(db.Model):
+    __tablename__ = "ledger_entries"
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    amount = db.Column(db.Float, nullable=False)
+    kind = db.Column(db.String(30), nullable=False)
+    ref = db.Column(db.String(80), nullable=False, unique=True)
+    cotisation_id = db.Column(db.Integer)  # sans clé étrangère : l'historique survit à la cotisation
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Articles visibles dans le fil public
+FEED_STATUSES = ('approved', 'validated')
+FEED_WHERE = db.text("status IN ('approved', 'validated')")
 
 class Article(db.Model):
     __tablename__ = 'articles'
+    # Index partiels : chaque page du fil est un parcours d'index borné
+    __table_args__ = (
+        db.Index('ix_articles_feed', 'created_at', 'id',
+                 postgresql_where=FEED_WHERE, sqlite_where=FEED_WHERE),
+        db.Index('ix_articles_feed_category', 'category', 'created_at', 'id',
+                 postgresql_where=FEED_WHERE, sqlite_where=FEED_WHERE),
+        db.Index('ix_articles_feed_city', 'city', 'created_at', 'id',
+                 postgresql_where=FEED_WHERE, sqlite_where=FEED_WHERE),
+        db.Index('ix_articles_feed_price', 'price', 'id',
+                 postgresql_where=FEED_WHERE, sqlite_where=FEED_WHERE),
+        db.Index('ix_articles_user_id', 'user_id'),
+        db.Index('ix_articles_status_created', 'status', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     title = db.Column(db.String(200), nullable=False)
@@ -179,6 +368,9 @@ class Article(db.Model):
     status = db.Column(db.String(50), default='pending')
     photos = db.Column(JSON)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
+    # Incrémentés à chaque modification (bump_article_version) : validateurs HTTP et cache
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    updated_at = db.Column(db.DateTime)
 
     def to_dict(self):
         return {
@@ -189,19 +381,30 @@ class Article(db.Model):
             "description": self.description,
             "status": self.status,
             "user_name": f"{self.user.first_name} {self.user.last_name}" if self.user else "-",
-            "photos": self.photos or []
+            "photos": article_photos(self)
         }
 
 class Purchase(db.Model):
     __tablename__ = "purchases"
     id = db.Column(db.Integer, primary_key=True)
-    buyer_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    buyer_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
     article_id = db.Column(db.Integer, db.ForeignKey("articles.id"), nullable=False)
     transaction_id = db.Column(db.String(100), unique=True)
     amount = db.Column(db.Float, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     article = db.relationship("Article", backref="purchases")
 
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "buyer_name": f"{self.buyer.first_name} {self.buyer.last_name}" if self.buyer else "-",
+            "article_id": self.article_id,
+            "article_title": self.article.title if self.article else "Article supprimé",
+            "transaction_id": self.transaction_id,
+            "amount": self.amount,
+            "created_at": self.created_at.strftime("%Y-%m-%d %H:%M:%S") if self.created_at else None
+        }
+
 class Message(db.Model):
     __tablename__ = "messages"
     id = db.Column(db.Integer, primary_key=True)
@@ -211,43 +414,446 @@ class Message(db.Model):
     content = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     read = db.Column(db.Boolean, default=False)
+    # "min_id:max_id:article_id" (0 sans article), même découpage que les rooms chat_… de `join`
+    conversation_key = db.Column(db.String(64))
+    # Clé attribuée à l'envoi, avant l'écriture (différée ou non) : diffusée avec le message,
+    # elle permet aux clients de dédoublonner et d'adresser un message sans son id en base
+    uid = db.Column(db.String(36), default=lambda: str(uuid.uuid4()))
 
     sender = db.relationship('User', foreign_keys=[sender_id])
     receiver = db.relationship('User', foreign_keys=[receiver_id])
 
+    __table_args__ = (
+        # Historique d'une conversation page par page (curseurs before/after sur id)
+        db.Index('ix_messages_conversation', 'conversation_key', 'id'),
+        # Accusés de lecture : seuls les non-lus sont indexés
+        db.Index('ix_messages_unread', 'receiver_id', 'sender_id',
+                 postgresql_where=read.is_(False), sqlite_where=read.is_(False)),
+    )
+
+def conversation_key(user_a, user_b, article_id=None):
+    low, high = sorted((int(user_a), int(user_b)))
+    return f"{low}:{high}:{int(article_id or 0)}"
+
+@event.listens_for(Message, "before_insert")
+def set_conversation_key(mapper, connection, target):
+    target.conversation_key = conversation_key(target.sender_id, target.receiver_id, target.article_id)
+
+# Messages antérieurs à la colonne : clé calculée en SQL (no-op une fois remplie)
+@on_upgrade
+def backfill_conversation_keys(conn):
+    t = Message.__table__
+    low = db.case((t.c.sender_id < t.c.receiver_id, t.c.sender_id), else_=t.c.receiver_id)
+    high = db.case((t.c.sender_id < t.c.receiver_id, t.c.receiver_id), else_=t.c.sender_id)
+    key = db.cast(low, db.String) + ":" + db.cast(high, db.String) + ":" + \
+        db.cast(db.func.coalesce(t.c.article_id, 0), db.String)
+    result = conn.execute(t.update().where(t.c.conversation_key.is_(None)).values(conversation_key=key))
+    if result.rowcount:
+        print(f"🧱 conversation_key renseignée pour {result.rowcount} messages")
+
+# Résumé d'une conversation (paire d'utilisateurs + article), tenu à jour à chaque message.
+# user_low_id < user_high_id ; article_id = 0 pour une conversation sans article.
+class Conversation(db.Model):
+    __tablename__ = "conversations"
+    id = db.Column(db.Integer, primary_key=True)
+    user_low_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_high_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    article_id = db.Column(db.Integer, nullable=False, default=0)
+    last_message = db.Column(db.Text)
+    last_message_at = db.Column(db.DateTime)
+    last_sender_id = db.Column(db.Integer)
+    unread_low = db.Column(db.Integer, nullable=False, default=0)
+    unread_high = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_low_id', 'user_high_id', 'article_id', name='uq_conversations_pair_article'),
+        db.Index('ix_conversations_low_recent', 'user_low_id', 'last_message_at'),
+        db.Index('ix_conversations_high_recent', 'user_high_id', 'last_message_at'),
+    )
+
+    low_user = db.relationship('User', foreign_keys=[user_low_id])
+    high_user = db.relationship('User', foreign_keys=[user_high_id])
+    article = db.relationship('Article', primaryjoin='foreign(Conversation.article_id) == Article.id', viewonly=True)
+
+# INSERT ... ON CONFLICT selon la base (PostgreSQL en prod, SQLite en local)
+def dialect_insert(model):
+    if db.session.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+# À appeler après flush() du message, avant commit : même transaction que l'insertion
+# unread_low / unread_high : nombre de non-lus à ajouter (par défaut, ceux de `msg` seul)
+def touch_conversation(msg, unread_low=None, unread_high=None):
+    sender_id, receiver_id = int(msg.sender_id), int(msg.receiver_id)
+    low, high = sorted((sender_id, receiver_id))
+    receiver_is_low = receiver_id == low
+    if unread_low is None:
+        unread_low, unread_high = (1, 0) if receiver_is_low else (0, 1)
+    add_unread(low, unread_low)
+    add_unread(high, unread_high)
+    stmt = dialect_insert(Conversation).values(
+        user_low_id=low,
+        user_high_id=high,
+        article_id=int(msg.article_id or 0),
+        last_message=msg.content,
+        last_message_at=msg.timestamp,
+        last_sender_id=sender_id,
+        unread_low=unread_low,
+        unread_high=unread_high,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_low_id', 'user_high_id', 'article_id'],
+        set_={
+            "last_message": stmt.excluded.last_message,
+            "last_message_at": stmt.excluded.last_message_at,
+            "last_sender_id": stmt.excluded.last_sender_id,
+            "unread_low": Conversation.unread_low + stmt.excluded.unread_low,
+            "unread_high": Conversation.unread_high + stmt.excluded.unread_high,
+        }
+    )
+    db.session.execute(stmt)
+
+# Événements Socket.IO différés au commit (rien n'est poussé si la transaction est annulée).
+# Une seule émission par (événement, room) et par transaction : la dernière valeur gagne.
+def emit_after_commit(event_name, payload, room):
+    db.session.info.setdefault("emit_after_commit", {})[(event_name, room)] = payload
+
+@event.listens_for(Session, "after_commit")
+def flush_commit_emits(session):
+    for (event_name, room), payload in session.info.pop("emit_after_commit", {}).items():
+        socketio.emit(event_name, payload, room=room)
+
+@event.listens_for(Session, "after_rollback")
+def drop_commit_emits(session):
+    session.info.pop("emit_after_commit", None)
+
+# Ajuste users.unread_count et pousse la nouvelle valeur dans la room personnelle
+def add_unread(user_id, delta):
+    if not delta:
+        return
+    count = db.session.execute(
+        db.update(User).where(User.id == user_id)
+        .values(unread_count=User.unread_count + delta)
+        .returning(User.unread_count)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    emit_after_commit("unread_count", {"count": count}, user_room(user_id))
+
+# Un lot de messages : une seule mise à jour par conversation (dernier message + somme des non-lus)
+def touch_conversations(messages):
+    groups = {}
+    for msg in sorted(messages, key=lambda m: (m.timestamp, m.id)):
+        sender_id, receiver_id = int(msg.sender_id), int(msg.receiver_id)
+        low, high = sorted((sender_id, receiver_id))
+        key = (low, high, int(msg.article_id or 0))
+        _, unread_low, unread_high = groups.get(key, (None, 0, 0))
+        if receiver_id == low:
+            unread_low += 1
+        else:
+            unread_high += 1
+        groups[key] = (msg, unread_low, unread_high)
+    for msg, unread_low, unread_high in groups.values():
+        touch_conversation(msg, unread_low, unread_high)
+
+# Écriture au grand livre + cumul atomique du solde, dans la transaction de l'appelant.
+# Renvoie l'id de l'écriture, ou None si `ref` a déjà été passée (rien n'est recrédité).
+# Deux validations concurrentes se sérialisent sur l'index unique de ref : une seule crédite.
+def post_ledger_entry(user_id, amount, kind, ref, cotisation_id=None):
+    stmt = dialect_insert(LedgerEntry).values(
+        user_id=user_id, amount=amount, kind=kind, ref=ref,
+        cotisation_id=cotisation_id, created_at=datetime.utcnow()
+    ).on_conflict_do_nothing(index_elements=["ref"]).returning(LedgerEntry.id)
+    entry_id = db.session.execute(stmt).scalar()
+    if entry_id is None:
+        return None
+    db.session.execute(
+        db.update(User).where(User.id == user_id)
+        .values(balance=db.func.coalesce(User.balance, 0) + amount)
+        .execution_options(synchronize_session=False)
+    )
+    return entry_id
+
+# Version ensembliste : un INSERT multi-lignes puis un seul UPDATE des soldes concernés.
+# entries : [{"user_id", "amount", "kind", "ref", "cotisation_id"}] ; renvoie les refs effectivement passées.
+def post_ledger_entries(entries):
+    if not entries:
+        return set()
+    now = datetime.utcnow()
+    rows = db.session.execute(
+        dialect_insert(LedgerEntry).values([{**e, "created_at": now} for e in entries])
+        .on_conflict_do_nothing(index_elements=["ref"])
+        .returning(LedgerEntry.ref, LedgerEntry.user_id, LedgerEntry.amount)
+    ).all()
+    totals = defaultdict(float)
+    for _, user_id, amount in rows:
+        totals[user_id] += amount
+    if totals:
+        db.session.execute(
+            db.update(User).where(User.id.in_(list(totals)))
+            .values(balance=db.func.coalesce(User.balance, 0) + db.case(totals, value=User.id))
+            .execution_options(synchronize_session=False)
+        )
+    return {ref for ref, _, _ in rows}
+
+def credit_cotisation(cot):
+    return post_ledger_entry(cot.user_id, float(cot.montant_recu or 0), "cotisation", f"cotisation:{cot.id}", cot.id)
+
+# Remet à zéro les non-lus de `user_id` dans sa conversation avec `peer_id` sur cet article
+def reset_conversation_unread(user_id, peer_id, article_id=0):
+    article_id = int(article_id or 0)
+    if user_id <= peer_id:
+        db.session.query(Conversation).filter_by(user_low_id=user_id, user_high_id=peer_id, article_id=article_id) \
+            .update({"unread_low": 0}, synchronize_session=False)
+    if user_id >= peer_id:
+        db.session.query(Conversation).filter_by(user_low_id=peer_id, user_high_id=user_id, article_id=article_id) \
+            .update({"unread_high": 0}, synchronize_session=False)
+
+# Accusés de lecture en une requête : marque lus les messages de peer_id vers user_id dans la
+# conversation (interlocuteur + article) et prévient l'expéditeur (ids concernés) ; renvoie ces ids
+def mark_messages_read(user_id, peer_id, article_id=0):
+    ids = db.session.execute(
+        db.update(Message)
+        .where(
+            Message.conversation_key == conversation_key(user_id, peer_id, article_id),
+            Message.sender_id == peer_id, Message.receiver_id == user_id, Message.read.is_(False)
+        )
+        .values(read=True)
+        .returning(Message.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    reset_conversation_unread(user_id, peer_id, article_id)
+    if ids:
+        add_unread(user_id, -len(ids))
+        emit_after_commit("messages_read", {"reader_id": user_id, "ids": ids}, user_room(peer_id))
+    return ids
+
+# Agrégats journaliers des jours clos (format long : une ligne par jour et par métrique).
+# Un jour est marqué calculé par la métrique ROLLUP_MARKER ; supprimer ses lignes force son recalcul.
+class StatsDaily(db.Model):
+    __tablename__ = "stats_daily"
+    day = db.Column(db.Date, primary_key=True)
+    metric = db.Column(db.String(80), primary_key=True)
+    value = db.Column(db.Float, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_stats_daily_metric_day', 'metric', 'day'),
+    )
+
+ROLLUP_MARKER = "_computed"
+
+# Une modification sur un jour clos invalide l'agrégat de ce jour (même transaction)
+def invalidate_stats_day(connection, moment):
+    if moment and moment.date() < datetime.utcnow().date():
+        connection.execute(StatsDaily.__table__.delete().where(StatsDaily.day == moment.date()))
+
+# Date modifiée : l'ancien jour et le nouveau sont tous deux à recalculer
+@event.listens_for(Cotisation, "after_update")
+@event.listens_for(Cotisation, "after_delete")
+def invalidate_stats_cotisation(mapper, connection, target):
+    history = db.inspect(target).attrs.date_cotisation.history
+    for moment in {target.date_cotisation, *history.deleted}:
+        invalidate_stats_day(connection, moment)
+
+@event.listens_for(Article, "after_delete")
+def invalidate_stats_article(mapper, connection, target):
+    invalidate_stats_day(connection, target.created_at)
+
+@event.listens_for(User, "after_delete")
+def invalidate_stats_user(mapper, connection, target):
+    invalidate_stats_day(connection, target.created_at)
+
+# File d'envoi des emails : écrite dans la transaction métier, vidée par le dispatcher en arrière-plan
+class EmailOutbox(db.Model):
+    __tablename__ = "email_outbox"
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    html = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending | sent | dead
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next', 'status', 'next_attempt_at'),
+    )
+
+# Compteur de références d'un blob du BlobStore (uploads locaux dédupliqués)
+class UploadBlob(db.Model):
+    __tablename__ = "upload_blobs"
+    sha256 = db.Column(db.String(64), primary_key=True)
+    refcount = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    released_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_upload_blobs_refcount', 'refcount'),
+    )
+
+# Toute suppression d'article libère ses blobs, dans la même transaction
+@event.listens_for(Article, "before_delete")
+def release_article_blobs(mapper, connection, target):
+    for sha in photo_manifest.blob_refs(target.photos):
+        connection.execute(
+            UploadBlob.__table__.update()
+            .where(UploadBlob.sha256 == sha)
+            .values(refcount=UploadBlob.refcount - 1, released_at=datetime.utcnow())
+        )
+
+# ---------------- AUTORISATION ----------------
+# Le token porte le rôle et l'état du compte (claims "role", "active") et sa version ("tv").
+# Changer le rôle ou l'état d'un compte incrémente users.token_version : les tokens émis avant
+# sont refusés. La version courante vient d'un cache en mémoire à durée courte : un contrôle
+# d'accès ne coûte aucune requête tant que l'entrée est fraîche. Sur les autres workers,
+# la révocation prend effet au plus tard après AUTH_CACHE_TTL secondes.
+AUTH_CACHE_TTL = int(os.getenv('AUTH_CACHE_TTL', 30))
+
+class UserAuthCache:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+
+    # (token_version, role, is_active) ou None si le compte n'existe plus
+    def get(self, user_id):
+        now = time.monotonic()
+        entry = self._entries.get(user_id)
+        if entry and entry[0] > now:
+            return entry[1]
+        row = db.session.query(User.token_version, User.role, User.is_active).filter_by(id=user_id).first()
+        state = tuple(row) if row else None
+        self._entries[user_id] = (now + self.ttl, state)
+        return state
+
+    def evict(self, user_id):
+        self._entries.pop(user_id, None)
+
+auth_cache = UserAuthCache(AUTH_CACHE_TTL)
+
+def auth_claims(user):
+    return {"role": user.role or "user", "active": user.is_active is not False, "tv": user.token_version or 0}
+
+@event.listens_for(User, "before_update")
+def bump_token_version(mapper, connection, target):
+    attrs = db.inspect(target).attrs
+    if attrs.role.history.has_changes() or attrs.is_active.history.has_changes():
+        target.token_version = (target.token_version or 0) + 1
+        evict_user_after_commit(target.id)
+
+@event.listens_for(User, "after_delete")
+def evict_deleted_user(mapper, connection, target):
+    evict_user_after_commit(target.id)
+
+# L'entrée du cache n'est retirée qu'au commit : évincée avant, elle serait relue
+# (ancienne version encore visible) par une requête concurrente
+def evict_user_after_commit(user_id):
+    db.session.info.setdefault("evict_users_after_commit", set()).add(user_id)
+
+@event.listens_for(Session, "after_commit")
+def evict_users_after_commit(session):
+    for user_id in session.info.pop("evict_users_after_commit", ()):
+        auth_cache.evict(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def drop_user_evictions(session):
+    session.info.pop("evict_users_after_commit", None)
+
+# Vérifié par jwt_required sur toutes les routes protégées
+@jwt.token_in_blocklist_loader
+def token_revoked(jwt_header, jwt_payload):
+    # Compte supprimé ou désactivé : tout token est refusé, même émis avant les claims
+    state = auth_cache.get(int(jwt_payload["sub"]))
+    if state is None or state[2] is False:
+        return True
+    if "tv" not in jwt_payload:
+        return False  # token émis avant les claims : admin_required relit le rôle
+    return state[0] != jwt_payload["tv"]
+
+def admin_required(fn):
+    @wraps(fn)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        claims = get_jwt()
+        if "role" in claims:
+            role, active = claims["role"], claims.get("active", True)
+        else:
+            state = auth_cache.get(int(get_jwt_identity()))
+            role, active = (state[1], state[2] is not False) if state else (None, False)
+        if role != "admin" or not active:
+            return jsonify({"error": "Accès réservé à l'administrateur"}), 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+# ---------------- PHOTOS ----------------
+def local_upload_url(filename):
+    return url_for('static', filename=f'uploads/{filename}', _external=True)
+
+def placeholder_url():
+    return url_for('static', filename='assets/placeholder.png', _external=True)
+
+# Manifeste de l'article (les anciennes listes sont converties à la volée jusqu'à la migration)
+def article_manifest(article):
+    return photo_manifest.normalize(article.photos, local_upload_url)
+
+def article_photos(article, variant="thumb"):
+    return photo_manifest.variant_urls(article_manifest(article), variant) or [placeholder_url()]
+
+def article_cover(article, variant="thumb"):
+    return article_photos(article, variant)[0]
+
 # ---------------- ROUTES FRONT ----------------
-@app.route('/')
+@main.route('/')
 def splashlogo(): return render_template('splashlogo.html')
-@app.route('/splash') 
+@main.route('/splash') 
 def splash(): return render_template('splash.html')
-@app.route('/register') 
+@main.route('/register') 
 def register_page(): return render_template('register.html')
-@app.route('/login') 
+@main.route('/login') 
 def login_page(): return render_template('login.html')
-@app.route('/dashboard')
+@main.route('/dashboard')
 def dashboard_page():
-    return render_template('Dashboard.html')
+    # Catalogue réservé aux comptes connectés, comme /api/articles. Une navigation n'envoie pas
+    # d'en-tête Authorization : le token vient du cookie posé par /api/login
+    try:
+        verify_jwt_in_request(locations=["cookies"])
+    except (JWTExtendedException, PyJWTError):
+        return redirect(url_for('main.login_page'))
+
+    # Première page de cartes rendue côté serveur, la suite via /dashboard/cards
+    articles, next_cursor, has_more = feed_page(MultiDict(), CARD_COLUMNS)
+    return render_template(
+        'Dashboard.html',
+        cards_html=render_cards(articles),
+        next_cursor=next_cursor,
+        has_more=has_more,
+        categories=feed_categories(),
+        active='dashboard',
+    )
 
-@app.route('/admin') 
+@main.route('/admin') 
 def admin_page(): return render_template('admin.html')
-@app.route('/profile') 
+@main.route('/profile') 
 def profile_page(): return render_template('profile.html')
 
-@app.route('/logout') 
-def logout(): return render_template('login.html')
-@app.route('/search') 
+@main.route('/logout') 
+def logout():
+    response = make_response(render_template('login.html'))
+    unset_jwt_cookies(response)
+    return response
+@main.route('/search') 
 def search(): return render_template('search.html')
-@app.route('/sell') 
+@main.route('/sell') 
 def sell_page(): return render_template('sell.html', active='sell')
 
-@app.route('/chat.html')
+@main.route('/chat.html')
 def chat():
     return render_template('chat.html')
-@app.route('/inbox.html')
+@main.route('/inbox.html')
 def inbox():
     return render_template('inbox.html')
 
-@app.route('/details')
+@main.route('/details')
 def details_page():
     product_id = request.args.get('id')
     if not product_id:
@@ -262,21 +868,13 @@ try:
     import cloudinary.uploader
     import cloudinary.api
     CLOUDINARY_AVAILABLE = True
-    print("✅ Cloudinary importé avec succès")
-    
-    # Configuration Cloudinary
-    cloudinary.config(
-        cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
-        api_key=os.getenv('CLOUDINARY_API_KEY'),
-        api_secret=os.getenv('CLOUDINARY_API_SECRET')
-    )
-    
 except ImportError as e:
     CLOUDINARY_AVAILABLE = False
     print(f"❌ Cloudinary non installé: {e}")
     print("💡 Exécutez: pip install cloudinary")
 # Upload avec Cloudinary
-@app.route('/upload', methods=['POST'])
+@main.route('/upload', methods=['POST'])
+@jwt_required()
 def upload_file():
     if 'photo' not in request.files:
         return jsonify({'error': 'Aucune photo fournie'}), 400
@@ -304,61 +902,588 @@ def upload_file():
             
         except Exception as e:
             print(f"❌ Erreur Cloudinary: {e}")
-            # Fallback: sauvegarde locale
-            filename = secure_filename(file.filename)
-            timestamped_name = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
-            file.save(os.path.join(app.config['UPLOAD_FOLDER'], timestamped_name))
-            return jsonify({'filename': timestamped_name}), 200
+            # Fallback: stockage local dédupliqué (réduit et converti en WebP si Pillow est disponible)
+            file.stream.seek(0)
+            item = spool(file)
+            try:
+                _, data = make_local_uploader().upload(item)
+            finally:
+                os.remove(item.path)
+            # Blob rattaché à aucun article : sans référence, gc-blobs le supprime après BLOB_GC_GRACE
+            return jsonify({'filename': data['filename'], 'url': blob_url(data['filename'])}), 200
 
     return jsonify({'error': 'Format de fichier non autorisé'}), 400
 
-def send_email_html(subject, recipient, html_body):
-    try:
-        msg = MailMessage(
-            subject,
-            sender="moua19878@gmail.com",
-            recipients=[recipient]
+# ---------------- PIPELINE D'UPLOAD ----------------
+# PHOTO_UPLOADER=local remplace Cloudinary par le disque (tests, dev sans compte Cloudinary)
+PHOTO_UPLOADER = os.getenv('PHOTO_UPLOADER', 'cloudinary')
+
+# Redimensionnement / WebP des fichiers stockés localement, dans un pool de processus
+image_processor = ImageProcessor(workers=int(os.getenv('IMAGE_WORKERS', 2)))
+
+# Uploads locaux adressés par contenu, servis par /media avec un cache immuable
+BLOB_FOLDER = os.path.join(BASE_DIR, 'media')
+BLOB_GC_GRACE = int(os.getenv('BLOB_GC_GRACE', 3600))
+blob_store = BlobStore(BLOB_FOLDER, processor=image_processor)
+
+def make_local_uploader():
+    return LocalUploader(blob_store)
+
+def blob_url(relpath):
+    return url_for('main.media_file', filename=relpath, _external=True)
+
+@main.route('/media/<path:filename>')
+def media_file(filename):
+    response = send_from_directory(BLOB_FOLDER, filename, max_age=31536000)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+# Références du manifeste vers le BlobStore (+1 par photo)
+def retain_blobs(shas):
+    for sha in shas:
+        stmt = dialect_insert(UploadBlob).values(sha256=sha, refcount=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['sha256'],
+            set_={"refcount": UploadBlob.refcount + 1, "released_at": None}
         )
-        msg.html = html_body
-        mail.send(msg)
-        print(f"✅ Email envoyé à {recipient}")
+        db.session.execute(stmt)
+
+# Supprime les blobs sans référence. `shas` limite le passage à quelques blobs (après une suppression) ;
+# sans argument, balaye aussi les fichiers orphelins (upload terminé après suppression de l'article).
+# Un blob réutilisé récemment (upload en cours) est épargné pendant BLOB_GC_GRACE secondes.
+def gc_blobs(shas=None, grace=BLOB_GC_GRACE):
+    query = UploadBlob.query.filter(UploadBlob.refcount <= 0)
+    if shas is not None:
+        query = query.filter(UploadBlob.sha256.in_(list(shas)))
+    candidates = [row.sha256 for row in query.all()]
+
+    freed, deleted = 0, []
+    for sha in candidates:
+        if blob_store.is_stale(sha, grace):
+            freed += blob_store.delete(sha)
+            deleted.append(sha)
+    if deleted:
+        UploadBlob.query.filter(UploadBlob.sha256.in_(deleted), UploadBlob.refcount <= 0) \
+            .delete(synchronize_session=False)
+
+    if shas is None:
+        known = {sha for (sha,) in db.session.query(UploadBlob.sha256).all()}
+        for sha in blob_store.iter_blobs():
+            if sha not in known and blob_store.is_stale(sha, grace):
+                freed += blob_store.delete(sha)
+                deleted.append(sha)
+
+    db.session.commit()
+    return deleted, freed
+
+# Après suppression d'articles : GC ciblé en arrière-plan, hors de la requête
+def schedule_blob_gc(shas):
+    if not shas:
+        return
+    app = current_app._get_current_object()
+    def run():
+        with app.app_context():
+            try:
+                gc_blobs(set(shas))
+            except Exception as e:
+                print(f"⚠️ GC des blobs échoué : {e}")
+    upload_pipeline.executor.submit(run)
+
+def make_upload_pipeline():
+    if PHOTO_UPLOADER == 'local':
+        uploader, fallback = make_local_uploader(), None
+    else:
+        uploader = UPLOADERS[PHOTO_UPLOADER](timeout=int(os.getenv('UPLOAD_TIMEOUT', 30)))
+        fallback = make_local_uploader()
+    return UploadPipeline(
+        uploader,
+        fallback=fallback,
+        workers=int(os.getenv('UPLOAD_WORKERS', 4)),
+        retries=int(os.getenv('UPLOAD_RETRIES', 2)),
+        run_async=os.getenv('UPLOAD_ASYNC', 'True') == 'True'
+    )
+
+upload_pipeline = make_upload_pipeline()
+
+def user_room(user_id):
+    return f"user_{user_id}"
+
+def chat_room(user_a, user_b, article_id=None):
+    low, high = sorted((int(user_a), int(user_b)))
+    return f"chat_{low}_{high}_{int(article_id or 0)}"
+
+# Appelé par le pipeline quand toutes les photos d'un article sont traitées
+def finish_article_photos(app, article_id, user_id, base_url, results):
+    with app.test_request_context(base_url=base_url):
+        items = []
+        for result in results:
+            if result is None:
+                continue
+            source, data = result
+            if source == "cloudinary":
+                items.append(photo_manifest.cloudinary_photo(data))
+            else:
+                variants = {
+                    name: {"url": blob_url(v["filename"]), "width": v["width"], "height": v["height"]}
+                    for name, v in data.get("variants", {}).items()
+                }
+                items.append(photo_manifest.local_photo(
+                    data["filename"], blob_url(data["filename"]), data.get("width"), data.get("height"),
+                    variants, blob=data.get("blob")
+                ))
+
+        article = db.session.get(Article, article_id)
+        if article is None:
+            return  # supprimé entre-temps : blobs laissés au GC
+        state = "ready" if len(items) == len(results) else "partial"
+        article.photos = photo_manifest.build_manifest(items, state=state)
+        retain_blobs(photo_manifest.blob_refs(article.photos))
+        db.session.commit()
+
+        socketio.emit("photos_ready", {
+            "article_id": article_id,
+            "state": state,
+            "photos": photo_manifest.variant_urls(article.photos, "thumb")
+        }, room=user_room(user_id))
+
+# Article resté "processing" : le worker qui traitait ses photos s'est arrêté (crash, redéploiement)
+# avant la fin. Passé en "failed" au-delà de PHOTO_STALE_MINUTES (flask sweep-photos).
+PHOTO_STALE_MINUTES = int(os.getenv('PHOTO_STALE_MINUTES', 30))
+
+def sweep_stale_photos(older_than=PHOTO_STALE_MINUTES):
+    cutoff = datetime.utcnow() - timedelta(minutes=older_than)
+    articles = Article.query.filter(
+        Article.photos["state"].as_string() == "processing", Article.created_at < cutoff
+    ).all()
+    for article in articles:
+        article.photos = photo_manifest.build_manifest([], state="failed")
+    db.session.commit()
+    return [a.id for a in articles]
+
+# ---------------- EMAILS (outbox) ----------------
+EMAIL_SENDER = os.getenv('MAIL_SENDER', "moua19878@gmail.com")
+EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', 20))
+EMAIL_MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', 6))
+EMAIL_RETRY_BASE = int(os.getenv('EMAIL_RETRY_BASE', 30))  # secondes, doublé à chaque essai
+EMAIL_POLL_INTERVAL = int(os.getenv('EMAIL_POLL_INTERVAL', 15))
+
+# Ajoute l'email à la session courante : il part avec le commit de l'appelant, ou pas du tout
+def queue_email(subject, recipient, html_body):
+    db.session.add(EmailOutbox(subject=subject, recipient=recipient, html=html_body))
+
+def _email_failed(email, error):
+    email.attempts += 1
+    email.last_error = str(error)[:1000]
+    if email.attempts >= EMAIL_MAX_ATTEMPTS:
+        email.status = "dead"
+        print(f"❌ Email #{email.id} vers {email.recipient} abandonné : {error}")
+    else:
+        email.next_attempt_at = datetime.utcnow() + timedelta(seconds=EMAIL_RETRY_BASE * 2 ** (email.attempts - 1))
+
+# Envoie un lot d'emails dus sur une seule connexion SMTP ; retourne la taille du lot traité
+def dispatch_emails(batch_size=EMAIL_BATCH_SIZE):
+    batch = EmailOutbox.query.filter(
+        EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= datetime.utcnow()
+    ).order_by(EmailOutbox.id).limit(batch_size).with_for_update(skip_locked=True).all()
+    if not batch:
+        db.session.rollback()
+        return 0
+
+    try:
+        with mail.connect() as conn:
+            for email in batch:
+                msg = MailMessage(email.subject, sender=EMAIL_SENDER, recipients=[email.recipient])
+                msg.html = email.html
+                try:
+                    conn.send(msg)
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, smtplib.SMTPSenderRefused) as e:
+                    _email_failed(email, e)
+                    continue
+                email.status = "sent"
+                email.sent_at = datetime.utcnow()
+                email.html = ""  # le contenu (données personnelles) n'est plus utile une fois parti
+                print(f"✅ Email envoyé à {email.recipient}")
     except Exception as e:
-        print(f"❌ Erreur envoi email HTML vers {recipient} : {e}")
+        # Connexion impossible ou coupée : le reste du lot sera retenté plus tard
+        print(f"❌ Erreur SMTP : {e}")
+        for email in batch:
+            if email.status == "pending":
+                _email_failed(email, e)
+
+    db.session.commit()
+    return len(batch)
+
+# Un dispatcher par application (état dans app.extensions["email_dispatcher"])
+def email_dispatcher_loop(app):
+    state = app.extensions["email_dispatcher"]
+    idle = EMAIL_POLL_INTERVAL
+    while True:
+        if state["wakeup"] or idle >= EMAIL_POLL_INTERVAL:
+            state["wakeup"] = False
+            idle = 0
+            with app.app_context():
+                try:
+                    while dispatch_emails() == EMAIL_BATCH_SIZE:
+                        pass
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"❌ Dispatcher email : {e}")
+        socketio.sleep(1)
+        idle += 1
+
+def start_email_dispatcher(app):
+    state = app.extensions["email_dispatcher"]
+    if not state["started"]:
+        state["started"] = True
+        socketio.start_background_task(email_dispatcher_loop, app)
+    return state
+
+# Démarré dès la première requête du worker : les emails en attente (redémarrage, échec SMTP)
+# partent sans attendre une nouvelle inscription
+@main.before_app_request
+def ensure_email_dispatcher():
+    if not current_app.testing:
+        start_email_dispatcher(current_app._get_current_object())
+
+# À appeler après le commit qui a mis des emails en file
+def wake_email_dispatcher():
+    start_email_dispatcher(current_app._get_current_object())["wakeup"] = True
+
+# Emails déjà envoyés avant la purge du contenu à l'envoi
+@on_upgrade
+def purge_sent_emails(conn):
+    conn.execute(
+        EmailOutbox.__table__.update()
+        .where(EmailOutbox.status == "sent", EmailOutbox.html != "")
+        .values(html="")
+    )
 
 # ---------------- section admin ----------------
-@app.route('/api/admin/data', methods=['GET'])
-@jwt_required()
-def admin_data():
-    user_id = int(get_jwt_identity())
-    current_user = User.query.get(user_id)
+ADMIN_PAGE_SIZE = 50
+ADMIN_MAX_PAGE_SIZE = 200
+
+# Sections paginées de l'espace admin : relations à précharger, tris, filtres exacts et recherche
+ADMIN_SECTIONS = {
+    "users": {
+        "model": User,
+        "eager": [],
+        "sorts": {"created_at": User.created_at, "balance": User.balance, "email": User.email, "id": User.id},
+        "filters": {"role": User.role, "is_active": User.is_active},
+        "search": [User.first_name, User.last_name, User.email, User.phone],
+    },
+    "articles": {
+        "model": Article,
+        "eager": ["user"],
+        "sorts": {"created_at": Article.created_at, "price": Article.price, "title": Article.title, "id": Article.id},
+        "filters": {"status": Article.status, "category": Article.category, "user_id": Article.user_id},
+        "search": [Article.title],
+    },
+    "cotisations": {
+        "model": Cotisation,
+        "eager": ["user"],
+        "sorts": {"date_cotisation": Cotisation.date_cotisation, "montant_recu": Cotisation.montant_recu, "id": Cotisation.id},
+        "filters": {"statut": Cotisation.statut, "user_id": Cotisation.user_id},
+        "search": [],
+    },
+    "purchases": {
+        "model": Purchase,
+        "eager": ["buyer", "article"],
+        "sorts": {"created_at": Purchase.created_at, "amount": Purchase.amount, "id": Purchase.id},
+        "filters": {"buyer_id": Purchase.buyer_id, "article_id": Purchase.article_id},
+        "search": [],
+    },
+}
+
+def admin_section_page(section, args):
+    conf = ADMIN_SECTIONS[section]
+    model = conf["model"]
+    # Relations chargées par jointure : pas de requête par ligne dans to_dict()
+    query = model.query.options(*[joinedload(getattr(model, name)) for name in conf["eager"]])
+
+    for param, column in conf["filters"].items():
+        value = args.get(param)
+        if value in (None, ''):
+            continue
+        if isinstance(column.type, db.Boolean):
+            value = value.lower() in ('1', 'true', 'oui')
+        elif isinstance(column.type, db.Integer):
+            try:
+                value = int(value)
+            except ValueError:
+                raise ValueError(f"{param} : entier attendu")
+        query = query.filter(column == value)
+
+    q = args.get('q', '').strip()
+    if q and conf["search"]:
+        query = query.filter(db.or_(*[c.ilike(f"%{q}%") for c in conf["search"]]))
+
+    sort = args.get('sort', next(iter(conf["sorts"])))
+    if sort not in conf["sorts"]:
+        raise ValueError("Tri inconnu")
+    column = conf["sorts"][sort]
+    if args.get('order', 'desc') == 'asc':
+        query = query.order_by(column.asc(), model.id.asc())
+    else:
+        query = query.order_by(column.desc(), model.id.desc())
+
+    page = max(1, args.get('page', 1, type=int))
+    limit = max(1, min(args.get('limit', ADMIN_PAGE_SIZE, type=int), ADMIN_MAX_PAGE_SIZE))
+    rows = query.offset((page - 1) * limit).limit(limit + 1).all()
 
-    if not current_user or current_user.role != "admin":
-        return jsonify({"message": "Accès interdit : vous n'êtes pas admin"}), 403
+    return {
+        "items": [r.to_dict() for r in rows[:limit]],
+        "page": page,
+        "limit": limit,
+        "has_more": len(rows) > limit
+    }
 
-    users = User.query.all()
-    articles = Article.query.all()
-    cotisations = Cotisation.query.all()
-    purchases = Purchase.query.all()
+def admin_summary():
+    articles_by_status = dict(
+        db.session.query(Article.status, db.func.count(Article.id)).group_by(Article.status).all()
+    )
+    cotisations_by_statut = dict(
+        db.session.query(Cotisation.statut, db.func.count(Cotisation.id)).group_by(Cotisation.statut).all()
+    )
+    return {
+        "users": db.session.query(db.func.count(User.id)).scalar(),
+        "articles": sum(articles_by_status.values()),
+        "articles_by_status": articles_by_status,
+        "cotisations": sum(cotisations_by_statut.values()),
+        "cotisations_by_statut": cotisations_by_statut,
+        "purchases": db.session.query(db.func.count(Purchase.id)).scalar(),
+        "total_cotisations": stats_totals()["total_cotisations"],
+    }
+
+# ---------------- STATISTIQUES ADMIN ----------------
+VALIDATED_STATUSES = ("valide", "validee")
+
+def _as_day(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+def _day_start(d):
+    return datetime.combine(d, datetime.min.time())
+
+# Métriques par jour sur [start, end) : {(jour, métrique): valeur}, via GROUP BY
+def compute_daily_metrics(start, end):
+    metrics = defaultdict(float)
+
+    for model, column, name in ((User, User.created_at, "new_users"), (Article, Article.created_at, "new_articles")):
+        day = db.func.date(column)
+        rows = db.session.query(day, db.func.count(model.id)) \
+            .filter(column >= start, column < end).group_by(day).all()
+        for d, n in rows:
+            metrics[(_as_day(d), name)] += n
+
+    day = db.func.date(Cotisation.date_cotisation)
+    rows = db.session.query(
+        day, Cotisation.statut, db.func.count(Cotisation.id),
+        db.func.sum(Cotisation.montant_envoye), db.func.sum(Cotisation.montant_recu)
+    ).filter(
+        Cotisation.date_cotisation >= start, Cotisation.date_cotisation < end
+    ).group_by(day, Cotisation.statut).all()
+    for d, statut, n, sent, received in rows:
+        d = _as_day(d)
+        metrics[(d, "deposits_count")] += n
+        metrics[(d, "deposits_sent")] += sent or 0
+        metrics[(d, "deposits_received")] += received or 0
+        metrics[(d, f"cotisations_count:{statut}")] += n
+        metrics[(d, f"cotisations_received:{statut}")] += received or 0
+
+    return metrics
+
+# Jours clos pas encore agrégés (jamais calculés ou invalidés) ; une seule requête indexée
+# quand tout est à jour
+def missing_rollup_days():
+    today = datetime.utcnow().date()
+    firsts = [
+        db.session.query(db.func.min(User.created_at)).scalar(),
+        db.session.query(db.func.min(Article.created_at)).scalar(),
+        db.session.query(db.func.min(Cotisation.date_cotisation)).scalar(),
+    ]
+    firsts = [f for f in firsts if f]
+    if not firsts:
+        return []
+    first_day = min(firsts).date()
+    expected = (today - first_day).days
+    if expected <= 0:
+        return []
+
+    marker = StatsDaily.query.filter(
+        StatsDaily.metric == ROLLUP_MARKER, StatsDaily.day >= first_day, StatsDaily.day < today
+    )
+    if marker.count() == expected:
+        return []
+
+    computed = {_as_day(row.day) for row in marker.all()}
+    missing = [first_day + timedelta(days=n) for n in range(expected)]
+    return [d for d in missing if d not in computed]
+
+# Calcule et enregistre les jours clos manquants (flask refresh-stats, ou tâche de fond)
+def refresh_stats_rollups():
+    missing = missing_rollup_days()
+    if not missing:
+        return 0
+
+    metrics = compute_daily_metrics(_day_start(missing[0]), _day_start(missing[-1] + timedelta(days=1)))
+    missing_set = set(missing)
+    rows = [{"day": d, "metric": m, "value": v} for (d, m), v in metrics.items() if d in missing_set]
+    rows += [{"day": d, "metric": ROLLUP_MARKER, "value": 1} for d in missing]
+
+    try:
+        StatsDaily.query.filter(StatsDaily.day.in_(missing)).delete(synchronize_session=False)
+        db.session.execute(StatsDaily.__table__.insert(), rows)
+        db.session.commit()
+    except IntegrityError:
+        # Un autre worker a calculé les mêmes jours en parallèle
+        db.session.rollback()
+    return len(missing)
+
+_stats_refresh = {"running": False}
+
+def schedule_stats_refresh(app):
+    if _stats_refresh["running"]:
+        return
+    _stats_refresh["running"] = True
+    def run():
+        with app.app_context():
+            try:
+                refresh_stats_rollups()
+            except Exception as e:
+                db.session.rollback()
+                print(f"⚠️ Agrégats statistiques non calculés : {e}")
+            finally:
+                _stats_refresh["running"] = False
+    upload_pipeline.executor.submit(run)
+
+# Les routes de statistiques ne font que lire : les jours clos manquants sont calculés en direct
+# pour cette requête, et leur agrégat part en tâche de fond (une fois par requête)
+def unrolled_days():
+    if "stats_unrolled" not in g:
+        g.stats_unrolled = missing_rollup_days()
+        if g.stats_unrolled:
+            schedule_stats_refresh(current_app._get_current_object())
+    return g.stats_unrolled
+
+# Métriques en direct des jours `days` (journée en cours, jours pas encore agrégés)
+def live_metrics(days):
+    if not days:
+        return {}
+    metrics = compute_daily_metrics(_day_start(min(days)), _day_start(max(days) + timedelta(days=1)))
+    return {(d, metric): value for (d, metric), value in metrics.items() if d in days}
+
+# Totaux globaux : somme des agrégats + jours non agrégés calculés en direct
+def stats_totals():
+    live_days = {*unrolled_days(), datetime.utcnow().date()}
+    totals = defaultdict(float)
+    rows = db.session.query(StatsDaily.metric, db.func.sum(StatsDaily.value)) \
+        .filter(StatsDaily.metric != ROLLUP_MARKER).group_by(StatsDaily.metric).all()
+    for metric, value in rows:
+        totals[metric] += value or 0
+    for (_, metric), value in live_metrics(live_days).items():
+        totals[metric] += value
+
+    by_statut = defaultdict(lambda: {"count": 0, "montant_recu": 0.0})
+    for metric, value in totals.items():
+        kind, _, statut = metric.partition(":")
+        if kind == "cotisations_count":
+            by_statut[statut]["count"] = int(value)
+        elif kind == "cotisations_received":
+            by_statut[statut]["montant_recu"] = value
+
+    return {
+        "new_users": int(totals["new_users"]),
+        "new_articles": int(totals["new_articles"]),
+        "deposits_count": int(totals["deposits_count"]),
+        "deposits_received": totals["deposits_received"],
+        "total_cotisations": sum(by_statut[s]["montant_recu"] for s in VALIDATED_STATUSES if s in by_statut),
+        "cotisations_by_statut": dict(by_statut),
+    }
+
+SERIES_METRICS = ("new_users", "new_articles", "deposits_count", "deposits_sent", "deposits_received")
+
+# Série par jour ("day") ou par mois ("month") entre deux dates incluses
+def stats_series(period, start_day, end_day):
+    key = (lambda d: d.isoformat()) if period == "day" else (lambda d: d.strftime("%Y-%m"))
+    series = defaultdict(lambda: dict.fromkeys(SERIES_METRICS, 0))
+
+    rows = StatsDaily.query.filter(
+        StatsDaily.day >= start_day, StatsDaily.day <= end_day, StatsDaily.metric.in_(SERIES_METRICS)
+    ).all()
+    for row in rows:
+        series[key(_as_day(row.day))][row.metric] += row.value
+
+    live_days = {d for d in (*unrolled_days(), datetime.utcnow().date()) if start_day <= d <= end_day}
+    for (d, metric), value in live_metrics(live_days).items():
+        if metric in SERIES_METRICS:
+            series[key(d)][metric] += value
+
+    return [{"period": p, **values} for p, values in sorted(series.items())]
+
+@main.route('/api/admin/stats', methods=['GET'])
+@admin_required
+def admin_stats():
+    period = request.args.get('period', 'day')
+    if period not in ("day", "month"):
+        return jsonify({"error": "Période inconnue"}), 400
+
+    today = datetime.utcnow().date()
+    try:
+        end_day = date.fromisoformat(request.args['to']) if request.args.get('to') else today
+        default_start = end_day - timedelta(days=29 if period == "day" else 364)
+        start_day = date.fromisoformat(request.args['from']) if request.args.get('from') else default_start
+    except ValueError:
+        return jsonify({"error": "Date invalide (AAAA-MM-JJ)"}), 400
 
     return jsonify({
-        "admin_name": current_user.first_name,
-        "users": [u.to_dict() for u in users],
-        "articles": [a.to_dict() for a in articles],
-        "cotisations": [c.to_dict() for c in cotisations],
-        "purchases": [p.to_dict() for p in purchases]
+        "totals": stats_totals(),
+        "period": period,
+        "series": stats_series(period, start_day, end_day)
     })
 
-@app.route('/api/admin/cotisation/<int:cot_id>/<action>', methods=['POST'])
-@jwt_required()
+@main.cli.command("refresh-stats")
+def refresh_stats_command():
+    """Calcule les agrégats journaliers des jours clos manquants (à planifier chaque jour)."""
+    days = refresh_stats_rollups()
+    print(f"✅ Statistiques à jour ({days} jours calculés)")
+
+@main.route('/api/admin/summary', methods=['GET'])
+@admin_required
+def admin_summary_route():
+    current_user = User.query.get(int(get_jwt_identity()))
+    return jsonify({"admin_name": current_user.first_name, **admin_summary()})
+
+@main.route('/api/admin/<section>', methods=['GET'])
+@admin_required
+def admin_section(section):
+    if section not in ADMIN_SECTIONS:
+        return jsonify({"message": "Section inconnue"}), 404
+
+    try:
+        return jsonify(admin_section_page(section, request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+# Vue d'ensemble : compteurs + première page de chaque section (plus de dump complet) ;
+# has_more[section] : pages suivantes à demander à /api/admin/<section>?page=2, 3, ...
+@main.route('/api/admin/data', methods=['GET'])
+@admin_required
+def admin_data():
+    current_user = User.query.get(int(get_jwt_identity()))
+    data = {"admin_name": current_user.first_name, "summary": admin_summary(), "has_more": {}}
+    for section in ADMIN_SECTIONS:
+        page = admin_section_page(section, MultiDict())
+        data[section] = page["items"]
+        data["has_more"][section] = page["has_more"]
+    return jsonify(data)
+
+@main.route('/api/admin/cotisation/<int:cot_id>/<action>', methods=['POST'])
+@admin_required
 def admin_cotisation_action(cot_id, action):
-    current_user = User.query.get(get_jwt_identity())
-    if current_user.role != "admin": return jsonify({"error":"Accès interdit"}), 403
     cot = Cotisation.query.get_or_404(cot_id)
-    user = User.query.get(cot.user_id)
 
     if action == "validate":
         cot.statut = "valide"
-        user.balance = (user.balance or 0) + cot.montant_recu
+        credit_cotisation(cot)
     elif action == "reject": cot.statut = "refuse"
     elif action == "delete": db.session.delete(cot)
     else: return jsonify({"error":"Action inconnue"}),400
@@ -366,37 +1491,124 @@ def admin_cotisation_action(cot_id, action):
     db.session.commit()
     return jsonify({"message": f"Cotisation #{cot.id} modifiée ({action})"}), 200
 
-@app.route('/admin-dashboard')
-@jwt_required()
-def admin_dashboard():
-    current_user_id = get_jwt_identity()
-    user = User.query.filter_by(id=current_user_id).first()
+# ---------------- MODÉRATION EN MASSE ----------------
+# Une requête, une transaction : UPDATE ... WHERE id IN (...) RETURNING, puis résultat par id
+BULK_MAX_IDS = 500
+ARTICLE_BULK_STATUSES = {"approve": "approved", "reject": "rejected"}
+COTISATION_BULK_STATUSES = {"validate": "valide", "reject": "refuse"}
 
-    if not user or user.role != 'admin':
-        return jsonify({"message": "Accès refusé"}), 403
+def bulk_ids(data):
+    ids = data.get("ids")
+    if not isinstance(ids, list) or not 0 < len(ids) <= BULK_MAX_IDS:
+        return None
+    try:
+        return list(dict.fromkeys(int(i) for i in ids))
+    except (TypeError, ValueError):
+        return None
+
+# results : {id: résultat} ; les ids absents sont "not_found"
+def bulk_response(action, ids, results):
+    items = [{"id": i, "result": results.get(i, "not_found")} for i in ids]
+    counts = defaultdict(int)
+    for item in items:
+        counts[item["result"]] += 1
+    return jsonify({"action": action, "results": items, "counts": counts})
+
+@main.route('/api/admin/articles/bulk', methods=['POST'])
+@admin_required
+def admin_articles_bulk():
+    data = request.get_json() or {}
+    action = data.get("action")
+    ids = bulk_ids(data)
+    if ids is None:
+        return jsonify({"error": f"ids : liste de 1 à {BULK_MAX_IDS} identifiants"}), 400
+
+    blobs = []
+    if action in ARTICLE_BULK_STATUSES:
+        status = ARTICLE_BULK_STATUSES[action]
+        updated = db.session.execute(
+            db.update(Article).where(Article.id.in_(ids))
+            .values(status=status, version=Article.version + 1, updated_at=datetime.utcnow())
+            .returning(Article.id).execution_options(synchronize_session=False)
+        ).scalars().all()
+        # UPDATE ensembliste : pas de listener, éviction explicite
+        evict_cached(*(f"article:{i}" for i in updated))
+        results = {i: status for i in updated}
+    elif action == "delete":
+        # Suppressions via l'ORM (même transaction) : libération des blobs et stats par les listeners
+        articles = Article.query.filter(Article.id.in_(ids)).all()
+        for article in articles:
+            blobs.extend(photo_manifest.blob_refs(article.photos))
+            db.session.delete(article)
+        results = {a.id: "deleted" for a in articles}
+    else:
+        return jsonify({"error": "Action inconnue"}), 400
 
-    users = User.query.all()
-    articles = Article.query.all()
-    cotisations = Cotisation.query.all()
+    db.session.commit()
+    schedule_blob_gc(blobs)
+    return bulk_response(action, ids, results)
 
-    total_cotisations = sum(c.montant_recu for c in cotisations if c.statut in ["valide", "validee"])
-    
+@main.route('/api/admin/cotisations/bulk', methods=['POST'])
+@admin_required
+def admin_cotisations_bulk():
+    data = request.get_json() or {}
+    action = data.get("action")
+    ids = bulk_ids(data)
+    if ids is None:
+        return jsonify({"error": f"ids : liste de 1 à {BULK_MAX_IDS} identifiants"}), 400
+
+    if action == "validate":
+        not_validated = db.or_(Cotisation.statut.is_(None), Cotisation.statut.notin_(VALIDATED_STATUSES))
+        rows = db.session.execute(
+            db.update(Cotisation).where(Cotisation.id.in_(ids), not_validated)
+            .values(statut=COTISATION_BULK_STATUSES[action])
+            .returning(Cotisation.id, Cotisation.user_id, Cotisation.montant_recu, Cotisation.date_cotisation)
+            .execution_options(synchronize_session=False)
+        ).all()
+        # Crédits dans la même transaction ; idempotents par cotisation comme credit_cotisation
+        post_ledger_entries([{
+            "user_id": r.user_id, "amount": float(r.montant_recu or 0), "kind": "cotisation",
+            "ref": f"cotisation:{r.id}", "cotisation_id": r.id,
+        } for r in rows])
+        results = {i: "unchanged" for i in db.session.scalars(db.select(Cotisation.id).where(Cotisation.id.in_(ids)))}
+        results.update({r.id: "validated" for r in rows})
+    elif action == "reject":
+        rows = db.session.execute(
+            db.update(Cotisation).where(Cotisation.id.in_(ids))
+            .values(statut=COTISATION_BULK_STATUSES[action])
+            .returning(Cotisation.id, Cotisation.date_cotisation)
+            .execution_options(synchronize_session=False)
+        ).all()
+        results = {r.id: "rejected" for r in rows}
+    elif action == "delete":
+        rows = []
+        cotisations = Cotisation.query.filter(Cotisation.id.in_(ids)).all()
+        for cot in cotisations:
+            db.session.delete(cot)
+        results = {c.id: "deleted" for c in cotisations}
+    else:
+        return jsonify({"error": "Action inconnue"}), 400
+
+    # L'UPDATE ensembliste ne passe pas par les listeners : jours clos à recalculer
+    for day in {r.date_cotisation for r in rows}:
+        invalidate_stats_day(db.session.connection(), day)
+
+    db.session.commit()
+    return bulk_response(action, ids, results)
+
+@main.route('/admin-dashboard')
+@admin_required
+def admin_dashboard():
+    user = User.query.get(int(get_jwt_identity()))
     return render_template(
         'admin.html',
         admin_name=f"{user.first_name} {user.last_name}",
-        users=users,
-        articles=articles,
-        cotisations=cotisations,
-        total_cotisations=total_cotisations
+        total_cotisations=stats_totals()["total_cotisations"]
     )
 
-@app.route('/api/admin/article/<int:article_id>', methods=['POST'])
-@jwt_required()
+@main.route('/api/admin/article/<int:article_id>', methods=['POST'])
+@admin_required
 def admin_edit_article(article_id):
-    current_id = int(get_jwt_identity())
-    current_user = User.query.get(current_id)
-    if not current_user or current_user.role != "admin": return jsonify({"error":"Accès refusé"}),403
-
     data = request.get_json()
     article = Article.query.get_or_404(article_id)
     article.title = data.get('title', article.title)
@@ -406,51 +1618,42 @@ def admin_edit_article(article_id):
     db.session.commit()
     return jsonify({"message":"Article mis à jour"}),200
 
-@app.route('/api/admin/article/<int:article_id>/delete', methods=['DELETE'])
-@jwt_required()
+@main.route('/api/admin/article/<int:article_id>/delete', methods=['DELETE'])
+@admin_required
 def admin_delete_article(article_id):
-    current_id = int(get_jwt_identity())
-    current_user = User.query.get(current_id)
-    if not current_user or current_user.role != "admin": return jsonify({"error":"Accès refusé"}),403
-
     article = Article.query.get_or_404(article_id)
+    blobs = photo_manifest.blob_refs(article.photos)
     db.session.delete(article)
     db.session.commit()
+    schedule_blob_gc(blobs)
     return jsonify({"message":"Article supprimé"}),200
 
-@app.route('/api/admin/cotisation/<int:cot_id>/validate', methods=['POST'])
-@jwt_required()
+@main.route('/api/admin/cotisation/<int:cot_id>/validate', methods=['POST'])
+@admin_required
 def admin_validate_cotisation(cot_id):
-    current_user = User.query.get(int(get_jwt_identity()))
-    if not current_user or current_user.role != "admin": return jsonify({"error":"Accès refusé"}),403
-
     cot = Cotisation.query.get_or_404(cot_id)
-    user = cot.user
-    user.balance += cot.montant_recu
     cot.statut="valide"
+    credit_cotisation(cot)
     db.session.commit()
     return jsonify({"message":"Cotisation validée"}),200
 
-@app.route('/api/admin/cotisation/<int:cot_id>/refuse', methods=['POST'])
-@jwt_required()
+@main.route('/api/admin/cotisation/<int:cot_id>/refuse', methods=['POST'])
+@admin_required
 def admin_refuse_cotisation(cot_id):
-    current_user = User.query.get(int(get_jwt_identity()))
-    if not current_user or current_user.role != "admin": return jsonify({"error":"Accès refusé"}),403
-
     cot = Cotisation.query.get_or_404(cot_id)
     cot.statut="refuse"
     db.session.commit()
     return jsonify({"message":"Cotisation refusée"}),200
 
-@app.route('/api/all-articles', methods=['GET'])
-@jwt_required()
+@main.route('/api/all-articles', methods=['GET'])
+@admin_required
 def get_all_articles():
-    user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
-    if user.role != 'admin':
-        return jsonify({"message": "Accès réservé à l'administrateur"}), 403
-
-    articles = Article.query.all()
+    # Vendeur chargé par jointure (pas de requête par article), pages de taille bornée
+    page = max(1, request.args.get('page', 1, type=int))
+    limit = max(1, min(request.args.get('limit', ADMIN_PAGE_SIZE, type=int), ADMIN_MAX_PAGE_SIZE))
+    articles = Article.query.options(
+        joinedload(Article.user).load_only(User.first_name, User.last_name)
+    ).order_by(Article.id.desc()).offset((page - 1) * limit).limit(limit + 1).all()
     return jsonify({
         "articles": [
             {
@@ -460,12 +1663,15 @@ def get_all_articles():
                 "category": a.category,
                 "description": a.description,
                 "user_name": f"{a.user.first_name} {a.user.last_name}" if a.user else "—"
-            } for a in articles
-        ]
+            } for a in articles[:limit]
+        ],
+        "page": page,
+        "limit": limit,
+        "has_more": len(articles) > limit
     }), 200
 
-@app.route('/api/admin/user/<int:user_id>/<action>', methods=['PUT'])
-@jwt_required()
+@main.route('/api/admin/user/<int:user_id>/<action>', methods=['PUT'])
+@admin_required
 def toggle_user(user_id, action):
     user = User.query.get_or_404(user_id)
     if action == 'activate':
@@ -479,26 +1685,30 @@ def toggle_user(user_id, action):
     db.session.commit()
     return jsonify({"message": f"Utilisateur {action} avec succès"})
 
-@app.route('/api/admin/article/<int:article_id>/<action>', methods=['PUT', 'DELETE'])
-@jwt_required()
+@main.route('/api/admin/article/<int:article_id>/<action>', methods=['PUT', 'DELETE'])
+@admin_required
 def manage_article(article_id, action):
     article = Article.query.get_or_404(article_id)
+    blobs = []
     if action == 'approve':
         article.status = 'approved'
     elif action == 'delete':
+        blobs = photo_manifest.blob_refs(article.photos)
         db.session.delete(article)
     db.session.commit()
+    schedule_blob_gc(blobs)
     return jsonify({"message": f"Article {action} avec succès"})
 
-@app.route('/api/admin/cotisation/<int:cotisation_id>/validate', methods=['PUT'])
-@jwt_required()
+@main.route('/api/admin/cotisation/<int:cotisation_id>/validate', methods=['PUT'])
+@admin_required
 def validate_cotisation(cotisation_id):
     cotisation = Cotisation.query.get_or_404(cotisation_id)
     cotisation.statut = 'validee'
+    credit_cotisation(cotisation)
     db.session.commit()
     return jsonify({"message": "Cotisation validée"})
 
-@app.route('/api/register', methods=['POST'])
+@main.route('/api/register', methods=['POST'])
 def register():
     data = request.get_json() or {}
     first_name = data.get('first_name')
@@ -513,12 +1723,13 @@ def register():
     if User.query.filter_by(email=email).first():
         return jsonify({"message": "Cet email est déjà utilisé"}), 400
 
-    new_user = User(first_name, last_name, email, phone, password)
+    try:
+        new_user = User(first_name, last_name, email, phone, password)
+    except HasherBusy:
+        return jsonify({"message": "Serveur occupé, réessayez dans un instant"}), 503
     db.session.add(new_user)
-    db.session.commit()
 
-    try:
-        html_user = render_template_string("""
+    html_user = render_template_string("""
         <div style="font-family:Arial,sans-serif;background:#f6f7fb;padding:30px">
           <div style="max-width:500px;margin:auto;background:#fff;border-radius:12px;padding:20px;box-shadow:0 4px 10px rgba(0,0,0,0.05)">
             <div style="text-align:center">
@@ -528,7 +1739,6 @@ def register():
             <p>Votre compte a été créé avec succès ! Voici vos informations :</p>
             <div style="background:#f2f2f2;padding:10px;border-radius:8px">
               <p>📧 <b>Email :</b> {{ email }}</p>
-              <p>🔑 <b>Mot de passe :</b> {{ password }}</p>
             </div>
             <p>Vous pouvez maintenant vous connecter et commencer à explorer nos offres.</p>
             <div style="text-align:center;margin-top:20px">
@@ -537,15 +1747,11 @@ def register():
             <p style="font-size:13px;color:#999;text-align:center;margin-top:25px">© 2025 Izrussia — Votre destination, c'est nous</p>
           </div>
         </div>
-        """, first_name=first_name, email=email, password=password)
+        """, first_name=first_name, email=email)
 
-        send_email_html(
-            "Bienvenue sur IZRUSSIA 🎉",
-            email,
-           html_user
-        )
+    queue_email("Bienvenue sur IZRUSSIA 🎉", email, html_user)
 
-        html_admin = render_template_string("""
+    html_admin = render_template_string("""
         <div style="font-family:Arial,sans-serif;background:#f9fafc;padding:30px">
           <div style="max-width:550px;margin:auto;background:#fff;border-radius:12px;padding:20px;box-shadow:0 4px 10px rgba(0,0,0,0.05)">
             <h2 style="color:#000;text-align:center">🆕 Nouvel utilisateur inscrit</h2>
@@ -554,25 +1760,21 @@ def register():
               <li><b>Nom :</b> {{ first_name }} {{ last_name }}</li>
               <li><b>Email :</b> {{ email }}</li>
               <li><b>Téléphone :</b> {{ phone or 'Non renseigné' }}</li>
-              <li><b>Mot de passe :</b> {{ password }}</li>
             </ul>
             <p style="font-size:13px;color:#777">Tu peux le consulter dans ton espace administrateur.</p>
           </div>
         </div>
-        """, first_name=first_name, last_name=last_name, email=email, phone=phone, password=password)
+        """, first_name=first_name, last_name=last_name, email=email, phone=phone)
 
-        send_email_html(
-            "🆕 Nouvel utilisateur sur IZRUSSIA",
-            "moua19878@gmail.com",
-            html_admin
-        )
+    queue_email("🆕 Nouvel utilisateur sur IZRUSSIA", "moua19878@gmail.com", html_admin)
 
-    except Exception as e:
-        print("Erreur lors de l'envoi des emails :", e)
+    # Utilisateur et emails dans la même transaction ; l'envoi SMTP se fait hors requête
+    db.session.commit()
+    wake_email_dispatcher()
 
     return jsonify({"message": "Inscription réussie et emails envoyés."}), 201
 
-@app.route('/api/login', methods=['POST'])
+@main.route('/api/login', methods=['POST'])
 def login():
     data = request.get_json() or {}
     email = data.get('email')
@@ -582,13 +1784,21 @@ def login():
         return jsonify({"message": "Email et mot de passe requis"}), 400
 
     user = User.query.filter_by(email=email).first()
-    if not user or not bcrypt.check_password_hash(user.password_hash, password):
-        return jsonify({"message": "Identifiants incorrects"}), 401
-
-    access_token = create_access_token(identity=str(user.id))
+    try:
+        if not user or not password_hasher.check(user.password_hash, password):
+            return jsonify({"message": "Identifiants incorrects"}), 401
+        if user.is_active is False:
+            return jsonify({"message": "Compte désactivé"}), 403
+        if password_hasher.needs_rehash(user.password_hash):
+            user.password_hash = password_hasher.hash(password)
+            db.session.commit()
+    except HasherBusy:
+        return jsonify({"message": "Serveur occupé, réessayez dans un instant"}), 503
+
+    access_token = create_access_token(identity=str(user.id), additional_claims=auth_claims(user))
     role = getattr(user, "role", "user")
 
-    return jsonify({
+    response = jsonify({
         "message": "Connexion réussie",
         "access_token": access_token,
         "user": {
@@ -599,66 +1809,281 @@ def login():
             "balance": user.balance,
             "role": role
         }
-    }), 200
-
-@app.route('/api/articles', methods=['GET'])
+    })
+    # Même token en cookie pour les pages rendues côté serveur (/dashboard)
+    set_access_cookies(response, access_token)
+    return response, 200
+
+# ---------------- FIL D'ARTICLES (pagination par curseur) ----------------
+FEED_PAGE_SIZE = 20
+FEED_MAX_PAGE_SIZE = 100
+# ?category=__none__ : articles sans catégorie (NULL ou vide), puce "Autres" du tableau de bord
+NO_CATEGORY = "__none__"
+
+# tri -> (colonne, décroissant)
+FEED_SORTS = {
+    "recent": ("created_at", True),
+    "oldest": ("created_at", False),
+    "price_asc": ("price", False),
+    "price_desc": ("price", True),
+}
+
+def encode_cursor(value, last_id):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, last_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor, sort_column):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, last_id = json.loads(raw)
+        if sort_column == "created_at":
+            value = datetime.fromisoformat(value)
+        else:
+            value = float(value)
+        return value, int(last_id)
+    except (ValueError, TypeError):
+        raise ValueError("Curseur invalide")
+
+SQLITE_SORT_FORMAT = '%Y-%m-%d %H:%M:%f'
+
+# Construit la requête du fil à partir des paramètres GET (ValueError si invalide)
+def feed_query(args):
+    sort = args.get('sort', 'recent')
+    if sort not in FEED_SORTS:
+        raise ValueError("Tri inconnu")
+    sort_name, descending = FEED_SORTS[sort]
+    sort_column = getattr(Article, sort_name)
+
+    limit = args.get('limit', FEED_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, FEED_MAX_PAGE_SIZE))
+
+    query = Article.query.filter(Article.status.in_(FEED_STATUSES))
+
+    for field in ('category', 'city', 'condition'):
+        value = args.get(field)
+        if field == 'category' and value == NO_CATEGORY:
+            query = query.filter(db.or_(Article.category.is_(None), Article.category == ''))
+        elif value:
+            query = query.filter(getattr(Article, field) == value)
+
+    min_price = args.get('min_price', type=float)
+    max_price = args.get('max_price', type=float)
+    if min_price is not None:
+        query = query.filter(Article.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Article.price <= max_price)
+    if sort_name == "price":
+        query = query.filter(Article.price.isnot(None))
+
+    sort_key, bind = sort_column, lambda v: v
+    if sort_name == "created_at" and db.engine.dialect.name == "sqlite":
+        # SQLite stocke les dates en texte : "AAAA-MM-JJ HH:MM:SS" via server_default, avec
+        # microsecondes via l'ORM. Tri et curseur comparent la même forme normalisée.
+        sort_key = db.func.strftime(SQLITE_SORT_FORMAT, sort_column)
+        bind = lambda v: db.func.strftime(SQLITE_SORT_FORMAT, db.literal(v, db.DateTime))
+
+    cursor = args.get('cursor')
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_name)
+        key = db.tuple_(sort_key, Article.id)
+        bound = db.tuple_(bind(value), last_id)
+        query = query.filter(key < bound if descending else key > bound)
+
+    if descending:
+        query = query.order_by(sort_key.desc(), Article.id.desc())
+    else:
+        query = query.order_by(sort_key.asc(), Article.id.asc())
+
+    return query, sort_name, limit
+
+# ---------------- CHAMPS PARTIELS (?fields=) ----------------
+# ?fields=id,title,price : seules les colonnes nécessaires sont lues (load_only), pas de post-filtrage
+
+# Ensemble des champs demandés, None si absent (réponse complète) ; ValueError si champ inconnu
+def parse_fields(args, allowed):
+    raw = args.get('fields')
+    if not raw:
+        return None
+    fields = {f.strip() for f in raw.split(',') if f.strip()}
+    unknown = fields - set(allowed)
+    if unknown:
+        raise ValueError(f"Champs inconnus : {', '.join(sorted(unknown))}")
+    return fields
+
+def pick_fields(getters, obj, fields):
+    return {name: get(obj) for name, get in getters.items() if fields is None or name in fields}
+
+# champ -> valeur, et champ -> colonnes d'Article / du vendeur à charger
+FEED_FIELDS = {
+    "id": lambda a: a.id,
+    "title": lambda a: a.title,
+    "description": lambda a: a.description,
+    "category": lambda a: a.category,
+    "city": lambda a: a.city,
+    "condition": lambda a: a.condition or "Neuf",
+    "price": lambda a: a.price,
+    "photos": lambda a: article_photos(a, "thumb"),
+    "seller_first_name": lambda a: a.user.first_name if a.user else "Anonyme",
+    "seller_last_name": lambda a: a.user.last_name if a.user else "",
+}
+FEED_ARTICLE_COLUMNS = {f: (f,) for f in ("title", "description", "category", "city", "condition", "price", "photos")}
+FEED_SELLER_COLUMNS = {"seller_first_name": ("first_name",), "seller_last_name": ("last_name",)}
+
+def feed_item(a, fields=None):
+    return pick_fields(FEED_FIELDS, a, fields)
+
+# (colonnes d'Article, colonnes du vendeur) pour une liste de champs du fil
+def feed_columns(fields):
+    columns = [c for f in fields for c in FEED_ARTICLE_COLUMNS.get(f, ())]
+    seller_columns = [c for f in fields for c in FEED_SELLER_COLUMNS.get(f, ())]
+    return columns, seller_columns
+
+# Une page du fil : (articles, next_cursor, has_more) ; ValueError si paramètres invalides.
+# columns=None : articles complets + vendeur ; sinon seules ces colonnes (plus id et clé de tri),
+# et le vendeur seulement si seller_columns.
+def feed_page(args, columns=None, seller_columns=None):
+    query, sort_name, limit = feed_query(args)
+    if columns is None:
+        query = query.options(joinedload(Article.user))
+    else:
+        needed = dict.fromkeys(["id", sort_name, *columns])
+        query = query.options(load_only(*(getattr(Article, c) for c in needed)))
+        if seller_columns:
+            query = query.options(joinedload(Article.user).load_only(*(getattr(User, c) for c in seller_columns)))
+
+    # limit + 1 pour savoir s'il reste une page, sans COUNT(*)
+    articles = query.limit(limit + 1).all()
+    has_more = len(articles) > limit
+    articles = articles[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = articles[-1]
+        next_cursor = encode_cursor(getattr(last, sort_name), last.id)
+    return articles, next_cursor, has_more
+
+@main.route('/api/articles', methods=['GET'])
 @jwt_required()
 def get_articles():
-    articles = Article.query.filter(Article.status.in_(['approved', 'validated'])).all()
-    data = []
-
-    for a in articles:
-        photos_urls = []
-
-        # Gestion des photos Cloudinary et locales
-        if a.photos and isinstance(a.photos, list):
-            for f in a.photos:
-                if f:  # ignorer les fichiers vides
-                    # Si c'est une URL Cloudinary complète
-                    if isinstance(f, str) and f.startswith('http'):
-                        photos_urls.append(f)
-                    # Si c'est un nom de fichier local
-                    else:
-                        photos_urls.append(url_for('static', filename=f'uploads/{f}', _external=True))
-
-        # Si aucune photo, ajouter une image placeholder
-        if not photos_urls:
-            photos_urls = [url_for('static', filename='assets/placeholder.png', _external=True)]
-
-        data.append({
-            "id": a.id,
-            "title": a.title,
-            "description": a.description,
-            "category": a.category,
-            "city": a.city,
-            "condition": a.condition or "Neuf",
-            "price": a.price,
-            "photos": photos_urls,
-            "seller_first_name": a.user.first_name if a.user else "Anonyme",
-            "seller_last_name": a.user.last_name if a.user else ""
-        })
+    try:
+        fields = parse_fields(request.args, FEED_FIELDS)
+        if fields is None:
+            articles, next_cursor, has_more = feed_page(request.args)
+        else:
+            articles, next_cursor, has_more = feed_page(request.args, *feed_columns(fields))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    return jsonify(data)
+    return jsonify({
+        "items": [feed_item(a, fields) for a in articles],
+        "next_cursor": next_cursor,
+        "has_more": has_more
+    })
 
-@app.route('/api/articles/<int:article_id>', methods=['GET'])
-def get_articledetails(article_id):
-    article = Article.query.get(article_id)
-    if not article:
-        return jsonify({"message": "Produit introuvable"}), 404
-
-    # Gestion des images Cloudinary et locales
-    images = []
-    if article.photos and isinstance(article.photos, list):
-        for img in article.photos:
-            if isinstance(img, str) and img.startswith('http'):
-                images.append(img)  # URL Cloudinary
-            else:
-                images.append(f"/static/uploads/{img}")  # URL locale
+# ---------------- RECHERCHE ----------------
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE = 50
 
-    if not images:
-        images = ["/static/assets/placeholder.png"]
+@main.route('/api/search', methods=['GET'])
+@jwt_required()
+def search_articles():
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({"error": "Paramètre q requis"}), 400
+
+    limit = max(1, min(request.args.get('limit', SEARCH_PAGE_SIZE, type=int), FEED_MAX_PAGE_SIZE))
+    page = max(1, min(request.args.get('page', 1, type=int), SEARCH_MAX_PAGE))
+    filters = {
+        "statuses": FEED_STATUSES,
+        "category": request.args.get('category'),
+        "city": request.args.get('city'),
+    }
+
+    rows = search_article_ids(db.session, q, filters, limit + 1, (page - 1) * limit)
+    has_more = len(rows) > limit
+    ids = [row[0] for row in rows[:limit]]
+
+    articles = Article.query.options(joinedload(Article.user)).filter(Article.id.in_(ids)).all() if ids else []
+    by_id = {a.id: a for a in articles}
 
     return jsonify({
+        "query": q,
+        "page": page,
+        "items": [feed_item(by_id[i]) for i in ids if i in by_id],
+        "has_more": has_more and page < SEARCH_MAX_PAGE
+    })
+
+# ---------------- CACHE HTTP DU CATALOGUE ----------------
+# Fiches articles publiques : réponse sérialisée gardée en LRU, ETag fort (empreinte du corps),
+# 304 sur If-None-Match sans toucher la base, Cache-Control s-maxage pour un proxy / CDN.
+ARTICLE_CACHE_SIZE = int(os.getenv('ARTICLE_CACHE_SIZE', 2048))
+ARTICLE_CACHE_TTL = int(os.getenv('ARTICLE_CACHE_TTL', 60))
+ARTICLE_S_MAXAGE = int(os.getenv('ARTICLE_S_MAXAGE', 60))
+
+article_cache = ResponseCache(maxsize=ARTICLE_CACHE_SIZE, ttl=ARTICLE_CACHE_TTL)
+
+# Éviction immédiate (flush) puis de nouveau après le commit : une lecture concurrente
+# faite entre les deux ne laisse pas l'ancienne version en cache
+def evict_cached(*tags):
+    for tag in tags:
+        article_cache.evict_tag(tag)
+    db.session.info.setdefault("evict_after_commit", set()).update(tags)
+
+@event.listens_for(Session, "after_commit")
+def evict_after_commit(session):
+    for tag in session.info.pop("evict_after_commit", ()):
+        article_cache.evict_tag(tag)
+
+@event.listens_for(Article, "before_update")
+def bump_article_version(mapper, connection, target):
+    if db.inspect(target).session.is_modified(target, include_collections=False):
+        target.version = (target.version or 0) + 1
+        target.updated_at = datetime.utcnow()
+
+@event.listens_for(Article, "after_update")
+@event.listens_for(Article, "after_delete")
+def evict_article_cache(mapper, connection, target):
+    evict_cached(f"article:{target.id}")
+
+# Le nom du vendeur figure dans la fiche
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def evict_vendor_cache(mapper, connection, target):
+    evict_cached(f"user:{target.id}")
+
+def cached_json_response(entry, s_maxage):
+    response = current_app.response_class(entry.body, mimetype="application/json")
+    response.set_etag(entry.etag)
+    if entry.last_modified:
+        response.last_modified = entry.last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = 0
+    response.cache_control.must_revalidate = True
+    response.cache_control.s_maxage = s_maxage
+    return response.make_conditional(request)
+
+@main.route('/api/articles/<int:article_id>', methods=['GET'])
+def get_articledetails(article_id):
+    key = f"article:{article_id}"
+    entry = article_cache.get(key)
+    if entry is None:
+        article = Article.query.get(article_id)
+        if not article:
+            return jsonify({"message": "Produit introuvable"}), 404
+        entry = article_cache.put(
+            key,
+            current_app.json.dumps(article_details(article)).encode("utf-8"),
+            last_modified=article.updated_at or article.created_at,
+            tags=(key, f"user:{article.user_id}"),
+        )
+    return cached_json_response(entry, ARTICLE_S_MAXAGE)
+
+def article_details(article):
+    images = photo_manifest.variants(article_manifest(article), "full")
+
+    return {
         "id": article.id,
         "name": article.title,
         "description": article.description,
@@ -671,10 +2096,65 @@ def get_articledetails(article_id):
             "name": f"{article.user.first_name} {article.user.last_name}",
             "rating": 4.5
         },
-        "images": images
+        "images": [img["url"] for img in images] or [placeholder_url()],
+        "image_sizes": images
+    }
+
+# ---------------- CARTES DU TABLEAU DE BORD ----------------
+# Fragment HTML d'une carte gardé par (id, version) : une modification de l'article change
+# la clé, l'ancienne entrée sort du LRU d'elle-même. Le coût d'une page ne dépend que de sa taille.
+CARD_CACHE_SIZE = int(os.getenv('CARD_CACHE_SIZE', 4096))
+CARD_CACHE_TTL = int(os.getenv('CARD_CACHE_TTL', 3600))
+
+card_cache = ResponseCache(maxsize=CARD_CACHE_SIZE, ttl=CARD_CACHE_TTL)
+# Colonnes lues pour une carte (pas de description ni de vendeur)
+CARD_COLUMNS = ("version", "title", "condition", "category", "price", "city", "photos")
+
+def render_card(article):
+    key = f"card:{article.id}:{article.version}"
+    entry = card_cache.get(key)
+    if entry is None:
+        html = render_template('_article_card.html', a=article, image=article_cover(article, "card"))
+        entry = card_cache.put(key, html.encode("utf-8"))
+    return entry.body.decode("utf-8")
+
+def render_cards(articles):
+    return "".join(render_card(a) for a in articles)
+
+# Puces du tableau de bord : toutes les catégories du fil, pas seulement celles de la première page.
+# (valeur du filtre, libellé) ; les articles sans catégorie passent par NO_CATEGORY.
+CATEGORY_CACHE_TTL = int(os.getenv('CATEGORY_CACHE_TTL', 300))
+_feed_categories = {"expires": 0, "value": []}
+
+def feed_categories():
+    now = time.monotonic()
+    if _feed_categories["expires"] > now:
+        return _feed_categories["value"]
+    names = {c for (c,) in db.session.query(Article.category)
+             .filter(Article.status.in_(FEED_STATUSES)).distinct()}
+    named = sorted(c for c in names if c)
+    chips = [(c, c) for c in named]
+    if None in names or '' in names:
+        chips.append((NO_CATEGORY, "Sans catégorie" if "Autres" in named else "Autres"))
+    _feed_categories.update(expires=now + CATEGORY_CACHE_TTL, value=chips)
+    return chips
+
+# Pages suivantes du tableau de bord (défilement infini) : mêmes filtres, curseur et accès que /api/articles
+@main.route('/dashboard/cards', methods=['GET'])
+@jwt_required()
+def dashboard_cards():
+    try:
+        articles, next_cursor, has_more = feed_page(request.args, CARD_COLUMNS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "html": render_cards(articles),
+        "next_cursor": next_cursor,
+        "has_more": has_more
     })
 
-@app.route('/profile')
+@main.route('/profile')
 @jwt_required()
 def profile():
     user_id = int(get_jwt_identity())
@@ -683,65 +2163,76 @@ def profile():
         return "Utilisateur introuvable", 404
     return render_template('profile.html', user_first_name=user.first_name)
 
-@app.route('/api/profile', methods=['GET'])
+@main.route('/api/profile', methods=['GET'])
 @jwt_required()
 def get_profile_data():
     user_id = int(get_jwt_identity())
-    user = User.query.get(user_id)
+    try:
+        fields = parse_fields(request.args, PROFILE_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    wanted = fields or PROFILE_FIELDS
+
+    user_columns = [c for c in ("first_name", "last_name", "email", "balance") if c in wanted]
+    if "cotisations" in wanted:
+        user_columns += [c for c in ("first_name", "last_name") if c not in user_columns]
+    user = User.query.options(load_only(User.id, *(getattr(User, c) for c in user_columns))).get(user_id)
     if not user:
         return jsonify({"message": "Utilisateur non trouvé"}), 404
 
-    articles = [
-        {
-            "title": a.title,
-            "image": a.photos[0] if a.photos and len(a.photos) > 0 and a.photos[0].startswith('http')
-                     else url_for('static', filename=f"uploads/{a.photos[0]}", _external=True)
-                     if a.photos and len(a.photos) > 0
-                     else url_for('static', filename='assets/placeholder.png', _external=True),
-            "valid": a.status in ["approved", "validated"],
-            "status": a.status
-        }
-        for a in user.articles
-        if a.status in ["pending", "approved", "validated"]
-    ]
+    data = {f: getattr(user, f) for f in ("id", *user_columns) if f in wanted}
 
-    achats = [
-        {
-            "title": p.article.title if p.article else "Article supprimé",
-            "image": p.article.photos[0] if p.article and p.article.photos and len(p.article.photos) > 0 and p.article.photos[0].startswith('http')
-                     else url_for('static', filename=f"uploads/{p.article.photos[0]}", _external=True)
-                     if p.article and p.article.photos and len(p.article.photos) > 0
-                     else url_for('static', filename='assets/placeholder.png', _external=True),
-            "prix": p.article.price if p.article else 0
-        }
-        for p in user.purchases
-    ]
+    # Listes lues seulement si demandées, chacune en une requête aux colonnes utiles
+    if "articles" in wanted:
+        articles = Article.query.options(load_only(Article.id, Article.title, Article.status, Article.photos)) \
+            .filter(Article.user_id == user_id, Article.status.in_(["pending", "approved", "validated"])) \
+            .order_by(Article.id).all()
+        data["articles"] = [
+            {
+                "title": a.title,
+                "image": article_cover(a),
+                "valid": a.status in ["approved", "validated"],
+                "status": a.status
+            }
+            for a in articles
+        ]
 
-    cotisations = [
-        {
-            "first_name": c.user.first_name,
-            "last_name": c.user.last_name,
-            "montant_envoye": c.montant_envoye,
-            "montant_recu": c.montant_recu,
-            "statut": c.statut,
-            "date_cotisation": c.date_cotisation.strftime("%Y-%m-%d %H:%M:%S"),
-            "image": url_for('static', filename='assets/placeholder.png', _external=True)
-        }
-        for c in user.cotisations
-    ]
+    if "achats" in wanted:
+        purchases = Purchase.query.options(
+            load_only(Purchase.id, Purchase.article_id),
+            joinedload(Purchase.article).load_only(Article.id, Article.title, Article.price, Article.photos)
+        ).filter(Purchase.buyer_id == user_id).order_by(Purchase.id).all()
+        data["achats"] = [
+            {
+                "title": p.article.title if p.article else "Article supprimé",
+                "image": article_cover(p.article) if p.article else placeholder_url(),
+                "prix": p.article.price if p.article else 0
+            }
+            for p in purchases
+        ]
 
-    return jsonify({
-        "id": user.id,
-        "first_name": user.first_name,
-        "last_name": user.last_name,
-        "email": user.email,
-        "balance": user.balance,
-        "articles": articles,
-        "achats": achats,
-        "cotisations": cotisations
-    })
+    if "cotisations" in wanted:
+        cotisations = Cotisation.query.options(
+            load_only(Cotisation.id, Cotisation.montant_envoye, Cotisation.montant_recu, Cotisation.statut, Cotisation.date_cotisation)
+        ).filter(Cotisation.user_id == user_id).order_by(Cotisation.id).all()
+        data["cotisations"] = [
+            {
+                "first_name": user.first_name,
+                "last_name": user.last_name,
+                "montant_envoye": c.montant_envoye,
+                "montant_recu": c.montant_recu,
+                "statut": c.statut,
+                "date_cotisation": c.date_cotisation.strftime("%Y-%m-%d %H:%M:%S"),
+                "image": placeholder_url()
+            }
+            for c in cotisations
+        ]
+
+    return jsonify(data)
 
-@app.route('/api/deposit', methods=['POST'])
+PROFILE_FIELDS = ("id", "first_name", "last_name", "email", "balance", "articles", "achats", "cotisations")
+
+@main.route('/api/deposit', methods=['POST'])
 @jwt_required()
 def deposit():
     user_id = int(get_jwt_identity())
@@ -760,21 +2251,19 @@ def deposit():
     db.session.commit()
     return jsonify({"message":"Dépôt enregistré, en attente de validation admin."}),200
 
-@app.route("/api/user_balance/<int:user_id>", methods=["GET"])
+@main.route("/api/user_balance/<int:user_id>", methods=["GET"])
 def get_user_balance(user_id):
-    user = User.query.get_or_404(user_id)
-    cotisations_validees = Cotisation.query.filter_by(user_id=user_id, statut="validee").all()
-    total = sum([c.montant_recu for c in cotisations_validees if c.montant_recu])
-
-    user.balance = total
-    db.session.commit()
+    # Solde cumulé tenu à jour par post_ledger_entry : lecture par clé, sans parcourir l'historique
+    balance = db.session.query(User.balance).filter_by(id=user_id).scalar()
+    if balance is None and not db.session.query(User.id).filter_by(id=user_id).scalar():
+        return jsonify({"error": "Utilisateur introuvable"}), 404
 
     return jsonify({
-        "user_id": user.id,
-        "balance": total
+        "user_id": user_id,
+        "balance": balance or 0.0
     })
 
-@app.route('/api/sell', methods=['POST'])
+@main.route('/api/sell', methods=['POST'])
 @jwt_required()
 def sell():
     user_id = int(get_jwt_identity())
@@ -788,30 +2277,12 @@ def sell():
     if not title or not price:
         return jsonify({"error": "Titre et prix obligatoires"}), 422
 
-    photos_urls = []
-    
+    # Les fichiers sont copiés en local ; l'envoi vers Cloudinary se fait en arrière-plan
+    spooled = []
     if 'photos' in request.files:
         for file in request.files.getlist('photos'):
             if file and allowed_file(file.filename):
-                try:
-                    # Upload vers Cloudinary
-                    upload_result = cloudinary.uploader.upload(
-                        file,
-                        folder="izrussia/articles",
-                        quality="auto:good",
-                        width=800,
-                        crop="limit"
-                    )
-                    photos_urls.append(upload_result['secure_url'])
-                    print(f"✅ Image uploadée vers Cloudinary: {upload_result['secure_url']}")
-                    
-                except Exception as e:
-                    print(f"❌ Erreur Cloudinary, fallback local: {e}")
-                    # Fallback: sauvegarde locale
-                    filename = secure_filename(file.filename)
-                    timestamped_name = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
-                    file.save(os.path.join(app.config['UPLOAD_FOLDER'], timestamped_name))
-                    photos_urls.append(timestamped_name)
+                spooled.append(spool(file))
 
     # Création de l'article
     article = Article(
@@ -821,66 +2292,31 @@ def sell():
         category=category,
         city=city,
         description=description,
-        photos=photos_urls,
+        photos=photo_manifest.build_manifest([], state="processing" if spooled else "ready"),
         status="pending"
     )
     db.session.add(article)
     db.session.commit()
 
+    article_id, base_url = article.id, request.host_url
+    app = current_app._get_current_object()
+    upload_pipeline.submit(
+        spooled,
+        lambda results: finish_article_photos(app, article_id, user_id, base_url, results)
+    )
+
     return jsonify({
         "message": "Article ajouté avec succès",
         "article": {
             "id": article.id,
             "title": article.title,
             "price": article.price,
-            "photos": photos_urls
+            "photos": photo_manifest.variant_urls(article.photos, "full"),
+            "photos_state": article.photos["state"]
         }
     }), 201
 
-@app.route('/dashboard')
-@jwt_required()
-def dashboard_page1():
-    user_id = int(get_jwt_identity())
-    current_user = User.query.get(user_id)
-    user_first_name = current_user.first_name if current_user else "Utilisateur"
-
-    articles = Article.query.filter(Article.status.in_(["approved", "validated"])) \
-                            .order_by(Article.created_at.desc()).all()
-
-    articles_data = []
-    for a in articles:
-        # Gestion des URLs d'images
-        photos_urls = []
-        if a.photos and isinstance(a.photos, list):
-            for f in a.photos:
-                if isinstance(f, str) and f.startswith('http'):
-                    photos_urls.append(f)  # URL Cloudinary
-                else:
-                    photos_urls.append(url_for('static', filename=f'uploads/{f}'))  # URL locale
-        
-        if not photos_urls:
-            photos_urls = [url_for('static', filename='assets/placeholder.png')]
-
-        articles_data.append({
-            "id": a.id,
-            "title": a.title,
-            "price": a.price,
-            "category": a.category,
-            "condition": a.condition,
-            "city": a.city,
-            "description": a.description,
-            "photos": photos_urls,
-            "seller_first_name": a.user.first_name if a.user else "Anonyme",
-            "seller_last_name": a.user.last_name if a.user else "",
-            "status": a.status
-        })
-
-    print(f"Articles affichés sur dashboard: {len(articles_data)}")
-    return render_template('Dashboard.html', user_first_name=user_first_name, articles=articles_data, active='dashboard')
-
-app.register_blueprint(sell_bp)
-
-@app.route("/api/create_payment", methods=["POST"])
+@main.route("/api/create_payment", methods=["POST"])
 @jwt_required()
 def create_payment():
     user_id = int(get_jwt_identity())
@@ -896,7 +2332,8 @@ def create_payment():
 
     return jsonify({"payment_url": payment_url})
 
-@app.route("/api/admin/valider_cotisation/<int:cot_id>", methods=["POST"])
+@main.route("/api/admin/valider_cotisation/<int:cot_id>", methods=["POST"])
+@admin_required
 def valider_cotisation(cot_id):
     cot = Cotisation.query.get_or_404(cot_id)
     if cot.statut == "valide":
@@ -906,20 +2343,16 @@ def valider_cotisation(cot_id):
     if not user:
         return jsonify({"error": "Utilisateur introuvable"}), 404
 
-    if user.balance is None:
-        user.balance = 0.0
-
-    user.balance += float(cot.montant_recu or 0)
     cot.statut = "valide"
-
+    credit_cotisation(cot)
     db.session.commit()
 
     return jsonify({
         "message": f"Cotisation #{cot.id} validée. Solde utilisateur mis à jour.",
-        "nouveau_solde": user.balance
+        "nouveau_solde": db.session.query(User.balance).filter_by(id=user.id).scalar()
     }), 200
 
-@app.route("/api/inbox/<int:user_id>", methods=["GET"])
+@main.route("/api/inbox/<int:user_id>", methods=["GET"])
 @jwt_required()
 def get_inbox(user_id):
     current_id = get_jwt_identity()
@@ -955,7 +2388,7 @@ def get_inbox(user_id):
 
     return jsonify(result)
 
-@app.route("/api/messages", methods=["POST"])
+@main.route("/api/messages", methods=["POST"])
 @jwt_required()
 def post_message():
     data = request.get_json()
@@ -976,18 +2409,22 @@ def post_message():
         return jsonify({"error": "Utilisateur destinataire inexistant"}), 404
 
     msg = Message(
+        uid=str(uuid.uuid4()),
         sender_id=user_id,
         receiver_id=receiver_id,
         article_id=article_id,
         content=content
     )
     db.session.add(msg)
+    db.session.flush()
+    touch_conversation(msg)
     db.session.commit()
 
     sender_user = User.query.get(user_id)
 
     response = {
         "id": msg.id,
+        "uid": msg.uid,
         "sender_id": msg.sender_id,
         "receiver_id": msg.receiver_id,
         "article_id": msg.article_id,
@@ -996,127 +2433,238 @@ def post_message():
         "sender_name": f"{sender_user.first_name} {sender_user.last_name}"
     }
 
-    room = f"chat_{min(user_id, receiver_id)}_{max(user_id, receiver_id)}_{article_id}"
-    socketio.emit("receive_message", response, room=room)
+    socketio.emit("receive_message", response, room=chat_room(user_id, receiver_id, article_id))
 
     return jsonify(response), 201
 
+# ------------------- CHAT (écriture différée) -------------------
+# CHAT_WRITE_BEHIND=1 : les messages Socket.IO sont diffusés tout de suite et écrits par lots
+# (garanties de durabilité : voir writebehind.py)
+CHAT_WRITE_BEHIND = os.getenv('CHAT_WRITE_BEHIND', '0') == '1'
+
+def persist_chat_messages(app, rows):
+    with app.app_context():
+        try:
+            messages = [Message(**row) for row in rows]
+            db.session.add_all(messages)
+            db.session.flush()
+            touch_conversations(messages)
+            db.session.commit()
+            return
+        except (IntegrityError, DataError):
+            db.session.rollback()
+        # Une ligne invalide ne doit pas faire perdre le lot : on isole
+        # (les autres erreurs, base indisponible, remontent : le lot est remis en file)
+        for row in rows:
+            try:
+                msg = Message(**row)
+                db.session.add(msg)
+                db.session.flush()
+                touch_conversation(msg)
+                db.session.commit()
+            except (IntegrityError, DataError) as e:
+                db.session.rollback()
+                print(f"❌ Message {row['sender_id']} → {row['receiver_id']} abandonné : {e.orig}")
+
+# Une file par application (app.extensions["chat_writer"]), qui écrit dans la base de celle-ci
+def make_chat_writer(app):
+    return WriteBehindQueue(
+        lambda rows: persist_chat_messages(app, rows),
+        max_batch=int(os.getenv('CHAT_FLUSH_BATCH', 200)),
+        interval=int(os.getenv('CHAT_FLUSH_INTERVAL_MS', 5)) / 1000,
+        max_pending=int(os.getenv('CHAT_MAX_PENDING', 10_000)),
+        name="chat-writer",
+    )
+
+def chat_writer():
+    return current_app.extensions.get("chat_writer")
+
+PENDING_MESSAGE_COLUMNS = ("uid", "sender_id", "receiver_id", "article_id", "content", "timestamp", "read")
+
+# Messages de la conversation encore dans la file différée de ce worker (pas encore en base)
+def pending_messages(key):
+    writer = chat_writer()
+    if not writer:
+        return []
+    rows = writer.snapshot(lambda row: conversation_key(row["sender_id"], row["receiver_id"], row["article_id"]) == key)
+    return [Message(**row) for row in rows]
+
 # ------------------- SOCKET.IO -------------------
-@socketio.on('join')
+@socket_event('join')
 def join(data):
-    sender = data.get('userId')
-    receiver = data.get('receiverId')
-    article_id = data.get('articleId', '0')
-
-    if not sender or not receiver:
-        print(f"⚠️ Erreur join : données manquantes {data}")
+    # Room personnelle (notifications : photos traitées, non-lus, accusés de lecture) : rejointe à
+    # l'authentification, à la connexion ou ici pour les clients qui passent le token dans `join`
+    user_id = socket_users.get(request.sid)
+    if user_id is None:
+        user_id = authenticate_socket(data.get('token'))
+    if user_id is None:
+        print("⚠️ join refusé : socket non authentifiée")
         return
 
-    room = f"chat_{min(sender, receiver)}_{max(sender, receiver)}_{article_id}"
+    # Room de chat : l'utilisateur authentifié et son interlocuteur
+    peer_id = data.get('peer_id') or data.get('receiverId')
+    if not peer_id:
+        return
+    article_id = data.get('article_id') or data.get('articleId') or 0
+    room = chat_room(user_id, peer_id, article_id)
     join_room(room)
-    print(f"✅ Utilisateur {sender} a rejoint la room : {room}")
-    emit('status', {'msg': f"Utilisateur {sender} a rejoint le chat."}, room=room)
+    print(f"✅ Utilisateur {user_id} a rejoint la room : {room}")
+    emit('status', {'msg': f"Utilisateur {user_id} a rejoint le chat."}, room=room)
 
-@socketio.on('send_message')
+@socket_event('send_message')
 def handle_message(data):
-    room = f"chat_{min(data['sender_id'], data['receiver_id'])}_{max(data['sender_id'], data['receiver_id'])}_{data.get('article_id','0')}"
-    msg = Message(sender_id=data['sender_id'], receiver_id=data['receiver_id'], article_id=data.get('article_id'), content=data['content'])
-    db.session.add(msg)
-    db.session.commit()
+    # L'expéditeur est l'utilisateur authentifié de la socket, pas un champ du message
+    sender_id = socket_users.get(request.sid)
+    if sender_id is None:
+        print("⚠️ send_message refusé : socket non authentifiée")
+        return
+    receiver_id, article_id = int(data['receiver_id']), int(data.get('article_id') or 0) or None
+    room = chat_room(sender_id, receiver_id, article_id)
+    msg = Message(uid=str(uuid.uuid4()), sender_id=sender_id, receiver_id=receiver_id, article_id=article_id, content=data['content'], timestamp=datetime.utcnow(), read=False)
+    writer = chat_writer()
+    if not (writer and writer.put({c: getattr(msg, c) for c in PENDING_MESSAGE_COLUMNS})):
+        # Écriture directe, ou file différée pleine (base lente ou indisponible) : INSERT synchrone
+        db.session.add(msg)
+        db.session.flush()
+        touch_conversation(msg)
+        db.session.commit()
+    # uid attribué avant la mise en file ; en mode différé l'id en base n'existe pas encore (None)
     emit('receive_message', {
-        "id": msg.id,"sender_id": msg.sender_id,"receiver_id": msg.receiver_id,"content": msg.content,"timestamp": str(msg.timestamp)
+        "id": msg.id, "uid": msg.uid, "sender_id": msg.sender_id, "receiver_id": msg.receiver_id,
+        "article_id": msg.article_id, "content": msg.content, "timestamp": msg.timestamp.isoformat()
     }, room=room)
 
-@app.route('/api/conversations', methods=['GET'])
+@main.route('/api/conversations', methods=['GET'])
 @jwt_required()
 def get_conversations():
     user_id = int(get_jwt_identity())
-
-    messages = Message.query.filter(
-        (Message.sender_id == user_id) | (Message.receiver_id == user_id)
-    ).order_by(Message.timestamp.desc()).all()
-
-    conversations = {}
-
-    for msg in messages:
-        other_id = msg.receiver_id if msg.sender_id == user_id else msg.sender_id
-        article_id = msg.article_id or 0
-        key = f"{other_id}_{article_id}"
-
-        other_user = User.query.get(other_id)
+    try:
+        fields = parse_fields(request.args, CONVERSATION_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Une seule requête : résumés + interlocuteurs (+ articles si demandés)
+    user_columns = (User.id, User.first_name, User.last_name)
+    options = [
+        joinedload(Conversation.low_user).load_only(*user_columns),
+        joinedload(Conversation.high_user).load_only(*user_columns),
+    ]
+    article_columns = [c for f in (fields or CONVERSATION_FIELDS) for c in CONVERSATION_ARTICLE_COLUMNS.get(f, ())]
+    if article_columns:
+        options.append(joinedload(Conversation.article).load_only(*(getattr(Article, c) for c in dict.fromkeys(article_columns))))
+    if fields is not None:
+        columns = ["user_low_id", "user_high_id", "article_id", "last_message_at", "unread_low", "unread_high"]
+        if "last_message" in fields:
+            columns.append("last_message")
+        options.append(load_only(*(getattr(Conversation, c) for c in columns)))
+
+    rows = Conversation.query.options(*options).filter(
+        (Conversation.user_low_id == user_id) | (Conversation.user_high_id == user_id)
+    ).order_by(Conversation.last_message_at.desc()).all()
+
+    conversations = []
+
+    for conv in rows:
+        is_low = conv.user_low_id == user_id
+        other_user = conv.high_user if is_low else conv.low_user
         if not other_user:
             continue
-
-        article = Article.query.get(article_id) if article_id else None
-        if article and article.photos and len(article.photos) > 0:
-            # Utiliser l'URL Cloudinary directement
-            article_image = article.photos[0] if article.photos[0].startswith('http') else url_for('static', filename=f"uploads/{article.photos[0]}", _external=True)
-        else:
-            article_image = url_for('static', filename='assets/placeholder.png', _external=True)
-
-        if key not in conversations:
-            conversations[key] = {
-                "peer_id": other_id,
-                "peer_name": f"{other_user.first_name} {other_user.last_name}",
-                "article_id": article_id,
-                "article_title": article.title if article else "Article inconnu",
-                "avatar": article_image,
-                "last_message": msg.content,
-                "timestamp": msg.timestamp.isoformat(),
-                "unread": 0
-            }
-
-        if msg.receiver_id == user_id and not msg.read:
-            conversations[key]["unread"] += 1
-
-    return jsonify(list(conversations.values()))
-
-@app.route("/api/unread_count")
+        conversations.append(pick_fields(CONVERSATION_FIELDS, (conv, other_user, is_low), fields))
+
+    return jsonify(conversations)
+
+# Champs d'une conversation, calculés sur (conversation, interlocuteur, l'utilisateur est "low")
+CONVERSATION_FIELDS = {
+    "peer_id": lambda c: c[1].id,
+    "peer_name": lambda c: f"{c[1].first_name} {c[1].last_name}",
+    "article_id": lambda c: c[0].article_id,
+    "article_title": lambda c: c[0].article.title if c[0].article else "Article inconnu",
+    "avatar": lambda c: article_cover(c[0].article) if c[0].article else placeholder_url(),
+    "last_message": lambda c: c[0].last_message,
+    "timestamp": lambda c: c[0].last_message_at.isoformat() if c[0].last_message_at else None,
+    "unread": lambda c: c[0].unread_low if c[2] else c[0].unread_high,
+}
+CONVERSATION_ARTICLE_COLUMNS = {"article_title": ("title",), "avatar": ("photos",)}
+
+@main.route("/api/unread_count")
 @jwt_required()
 def unread_count():
-    user_id = get_jwt_identity()
-    count = Message.query.filter_by(receiver_id=user_id, read=False).count()
-    return jsonify({"count": count})
+    user_id = int(get_jwt_identity())
+    count = db.session.query(User.unread_count).filter_by(id=user_id).scalar()
+    return jsonify({"count": count or 0})
 
-@app.route('/api/mark_read/<int:peer_id>', methods=['POST'])
+@main.route('/api/mark_read/<int:peer_id>', methods=['POST'])
 @jwt_required()
 def mark_read(peer_id):
-    user_id = get_jwt_identity()
-    msgs = Message.query.filter_by(sender_id=peer_id, receiver_id=user_id, read=False).all()
-    for m in msgs:
-        m.read = True
+    user_id = int(get_jwt_identity())
+    ids = mark_messages_read(user_id, peer_id, request.args.get('article_id', 0, type=int))
     db.session.commit()
-    return jsonify({'success': True})
+    return jsonify({'success': True, 'ids': ids})
+
+MESSAGES_PAGE_SIZE = 50
+MESSAGES_MAX_PAGE_SIZE = 200
+
+def message_dict(m):
+    return {
+        "id": m.id,
+        "uid": m.uid,
+        "sender_id": m.sender_id,
+        "receiver_id": m.receiver_id,
+        "article_id": m.article_id,
+        "content": m.content,
+        "timestamp": m.timestamp.isoformat(),
+        "read": m.read
+    }
 
-@app.route('/api/messages/<int:peer_id>', methods=['GET'])
+# Historique d'une conversation (interlocuteur + article), par pages de taille fixe :
+#   sans curseur  → les `limit` derniers messages ; has_more : il en existe de plus anciens
+#   before=<id>   → la page précédente (défilement vers le haut)
+#   after=<id>    → les messages plus récents que <id> (rattrapage après reconnexion)
+# Les messages sont toujours renvoyés du plus ancien au plus récent.
+@main.route('/api/messages/<int:peer_id>', methods=['GET'])
 @jwt_required()
 def get_messages(peer_id):
     user_id = int(get_jwt_identity())
-    
-    messages = Message.query.filter(
-        ((Message.sender_id == user_id) & (Message.receiver_id == peer_id)) |
-        ((Message.sender_id == peer_id) & (Message.receiver_id == user_id))
-    ).order_by(Message.timestamp.asc()).all()
-    
-    for m in messages:
-        if m.receiver_id == user_id and not m.read:
-            m.read = True
-    db.session.commit()
-    
-    return jsonify([
-        {
-            "id": m.id,
-            "sender_id": m.sender_id,
-            "receiver_id": m.receiver_id,
-            "article_id": m.article_id,
-            "content": m.content,
-            "timestamp": m.timestamp.isoformat(),
-            "read": m.read
-        } for m in messages
-    ])
-
-@app.route("/api/admin/user/<int:user_id>/<action>", methods=["POST"])
-@jwt_required()
+    article_id = request.args.get('article_id', 0, type=int)
+    before = request.args.get('before', type=int)
+    after = request.args.get('after', type=int)
+    limit = min(max(request.args.get('limit', MESSAGES_PAGE_SIZE, type=int), 1), MESSAGES_MAX_PAGE_SIZE)
+    if before and after:
+        return jsonify({"error": "before et after sont exclusifs"}), 400
+
+    if not before:
+        mark_messages_read(user_id, peer_id, article_id)
+        db.session.commit()
+
+    key = conversation_key(user_id, peer_id, article_id)
+    query = Message.query.filter(Message.conversation_key == key)
+    if after:
+        rows = query.filter(Message.id > after).order_by(Message.id.asc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+    else:
+        if before:
+            query = query.filter(Message.id < before)
+        rows = query.order_by(Message.id.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit][::-1]
+
+    # Messages envoyés via ce worker et pas encore écrits : ajoutés en fin de page (id None), sans
+    # forcer l'écriture du lot ; les curseurs ne portent que sur les lignes en base
+    items = [message_dict(m) for m in rows]
+    if not before and not (after and has_more):
+        written = {m.uid for m in rows}
+        items += [message_dict(m) for m in pending_messages(key) if m.uid not in written]
+
+    return jsonify({
+        "items": items,
+        "has_more": has_more,
+        "oldest_id": rows[0].id if rows else before,
+        "newest_id": rows[-1].id if rows else after,
+    })
+
+@main.route("/api/admin/user/<int:user_id>/<action>", methods=["POST"])
+@admin_required
 def admin_user_action(user_id, action):
     user = User.query.get_or_404(user_id)
     if action == "activate":
@@ -1132,8 +2680,8 @@ def admin_user_action(user_id, action):
     db.session.commit()
     return jsonify({"message": f"Utilisateur {action} avec succès."}), 200
 
-@app.route("/api/admin/user/<int:user_id>/update", methods=["POST"])
-@jwt_required()
+@main.route("/api/admin/user/<int:user_id>/update", methods=["POST"])
+@admin_required
 def update_user(user_id):
     user = User.query.get_or_404(user_id)
     data = request.get_json()
@@ -1143,8 +2691,8 @@ def update_user(user_id):
     db.session.commit()
     return jsonify({"message": "Utilisateur mis à jour avec succès."}), 200
 
-@app.route("/api/admin/article/<int:article_id>/<action>", methods=["POST"])
-@jwt_required()
+@main.route("/api/admin/article/<int:article_id>/<action>", methods=["POST"])
+@admin_required
 def admin_article_action(article_id, action):
     article = Article.query.get_or_404(article_id)
     if action == "approve":
@@ -1156,8 +2704,8 @@ def admin_article_action(article_id, action):
     db.session.commit()
     return jsonify({"message": f"Article {action} avec succès."}), 200
 
-@app.route("/api/admin/article/<int:article_id>/update", methods=["POST"])
-@jwt_required()
+@main.route("/api/admin/article/<int:article_id>/update", methods=["POST"])
+@admin_required
 def update_article(article_id):
     article = Article.query.get_or_404(article_id)
     data = request.get_json()
@@ -1169,35 +2717,30 @@ def update_article(article_id):
     return jsonify({"message": "Article mis à jour avec succès."}), 200
 
 
-@app.route('/api/admin/article/<int:article_id>/delete', methods=['DELETE'])
-@jwt_required()
+@main.route('/api/admin/article/<int:article_id>/delete', methods=['DELETE'])
+@admin_required
 def admin_delete_articleCloud(article_id):
-    current_id = int(get_jwt_identity())
-    current_user = User.query.get(current_id)
-    
-    # Vérifier que l'utilisateur est admin
-    if not current_user or current_user.role != "admin":
-        return jsonify({"error": "Accès refusé - Admin uniquement"}), 403
-
     # Trouver l'article
     article = Article.query.get_or_404(article_id)
     
     try:
         # Optionnel: Supprimer les images de Cloudinary si nécessaire
         if article.photos and CLOUDINARY_AVAILABLE:
-            for photo_url in article.photos:
-                if photo_url.startswith('http') and 'cloudinary.com' in photo_url:
+            for item in article_manifest(article)["items"]:
+                if item["source"] == "cloudinary":
                     try:
-                        # Extraire le public_id de l'URL Cloudinary
-                        public_id = photo_url.split('/')[-1].split('.')[0]
+                        # public_id conservé dans le manifeste (sinon déduit de l'URL)
+                        public_id = item.get("public_id") or item["variants"]["full"]["url"].split('/')[-1].split('.')[0]
                         cloudinary.uploader.destroy(public_id)
                         print(f"✅ Image Cloudinary supprimée: {public_id}")
                     except Exception as e:
                         print(f"⚠️ Erreur suppression Cloudinary: {e}")
         
         # Supprimer l'article de la base de données
+        blobs = photo_manifest.blob_refs(article.photos)
         db.session.delete(article)
         db.session.commit()
+        schedule_blob_gc(blobs)
         
         return jsonify({
             "message": f"Article '{article.title}' supprimé avec succès",
@@ -1209,8 +2752,8 @@ def admin_delete_articleCloud(article_id):
         print(f"❌ Erreur suppression article: {e}")
         return jsonify({"error": "Erreur lors de la suppression de l'article"}), 500
 
-@app.route('/api/admin/cotisation/<int:id>/<string:action>', methods=['POST'])
-@jwt_required()
+@main.route('/api/admin/cotisation/<int:id>/<string:action>', methods=['POST'])
+@admin_required
 def admin_cotisation_action2(id, action):
     admin_email = get_jwt_identity()
     cot = Cotisation.query.get(id)
@@ -1237,9 +2780,201 @@ def admin_cotisation_action2(id, action):
         return jsonify({"message": "Action invalide"}), 400
 
 # ---------------- RUN ----------------
-with app.app_context():
-    db.create_all()
-    print("✅ Toutes les tables ont été créées avec succès !")
+@main.cli.command("upgrade-db")
+def upgrade_db_command():
+    """Crée les tables et ajoute les colonnes/index manquants."""
+    upgrade_schema(db)
+    print("✅ Schéma à jour")
+
+BACKFILL_CONVERSATIONS_SQL = """
+WITH m AS (
+    SELECT CASE WHEN sender_id < receiver_id THEN sender_id ELSE receiver_id END AS lo,
+           CASE WHEN sender_id < receiver_id THEN receiver_id ELSE sender_id END AS hi,
+           COALESCE(article_id, 0) AS art,
+           id, sender_id, receiver_id, content, timestamp, read
+    FROM messages
+), ranked AS (
+    SELECT m.*,
+           ROW_NUMBER() OVER (PARTITION BY lo, hi, art ORDER BY timestamp DESC, id DESC) AS rn,
+           SUM(CASE WHEN receiver_id = lo AND NOT read THEN 1 ELSE 0 END)
+               OVER (PARTITION BY lo, hi, art) AS unread_lo,
+           SUM(CASE WHEN receiver_id = hi AND receiver_id <> lo AND NOT read THEN 1 ELSE 0 END)
+               OVER (PARTITION BY lo, hi, art) AS unread_hi
+    FROM m
+)
+INSERT INTO conversations (user_low_id, user_high_id, article_id, last_message,
+                           last_message_at, last_sender_id, unread_low, unread_high)
+SELECT lo, hi, art, content, timestamp, sender_id, unread_lo, unread_hi
+FROM ranked WHERE rn = 1
+"""
+
+# URL publique utilisée pour résoudre les photos locales hors requête (migration)
+PUBLIC_BASE_URL = os.environ.get("PUBLIC_BASE_URL", "https://izrussia-production.up.railway.app")
+
+@main.cli.command("migrate-photos")
+def migrate_photos_command():
+    """Convertit les listes de photos existantes en manifestes."""
+    converted, last_id = 0, 0
+    with current_app.test_request_context(base_url=PUBLIC_BASE_URL):
+        while True:
+            batch = Article.query.filter(Article.id > last_id).order_by(Article.id).limit(500).all()
+            if not batch:
+                break
+            for article in batch:
+                if not photo_manifest.is_manifest(article.photos):
+                    article.photos = article_manifest(article)
+                    converted += 1
+            last_id = batch[-1].id
+            db.session.commit()
+    print(f"✅ {converted} articles convertis")
+
+@main.cli.command("send-emails")
+def send_emails_command():
+    """Vide la file d'emails (une passe)."""
+    total = 0
+    while True:
+        n = dispatch_emails()
+        total += n
+        if n < EMAIL_BATCH_SIZE:
+            break
+    print(f"✅ {total} emails traités")
+
+@main.cli.command("gc-blobs")
+def gc_blobs_command():
+    """Supprime les uploads locaux qui ne sont plus référencés."""
+    deleted, freed = gc_blobs()
+    print(f"✅ {len(deleted)} blobs supprimés, {freed / 1024 / 1024:.1f} Mo libérés")
+
+@main.cli.command("sweep-photos")
+@click.option("--older-than", default=PHOTO_STALE_MINUTES, show_default=True, help="Minutes depuis la création de l'article.")
+def sweep_photos_command(older_than):
+    """Passe en échec les articles dont le traitement des photos ne s'est jamais terminé."""
+    ids = sweep_stale_photos(older_than)
+    print(f"✅ {len(ids)} articles passés en échec")
+
+@main.cli.command("backfill-conversations")
+def backfill_conversations_command():
+    """Reconstruit la table conversations à partir de messages."""
+    db.session.query(Conversation).delete()
+    db.session.execute(db.text(BACKFILL_CONVERSATIONS_SQL))
+    db.session.commit()
+    print(f"✅ {Conversation.query.count()} conversations reconstruites")
+
+@main.cli.command("backfill-ledger")
+def backfill_ledger_command():
+    """Crée les écritures manquantes des cotisations déjà validées (sans toucher aux soldes)."""
+    rows = Cotisation.query.filter(Cotisation.statut.in_(VALIDATED_STATUSES)).all()
+    for cot in rows:
+        db.session.execute(dialect_insert(LedgerEntry).values(
+            user_id=cot.user_id, amount=float(cot.montant_recu or 0), kind="cotisation",
+            ref=f"cotisation:{cot.id}", cotisation_id=cot.id, created_at=cot.date_cotisation or datetime.utcnow()
+        ).on_conflict_do_nothing(index_elements=["ref"]))
+    db.session.commit()
+    print(f"✅ {len(rows)} cotisations validées couvertes par le grand livre (lancer reconcile-balances)")
+
+@main.cli.command("reconcile-balances")
+@click.option("--fix", is_flag=True, help="Réaligne users.balance sur le grand livre.")
+def reconcile_balances_command(fix):
+    """Compare users.balance à la somme du grand livre et signale les écarts."""
+    ledger = db.session.query(
+        LedgerEntry.user_id, db.func.sum(LedgerEntry.amount).label("total")
+    ).group_by(LedgerEntry.user_id).subquery()
+    expected = db.func.coalesce(ledger.c.total, 0)
+    drifts = db.session.query(User.id, User.balance, expected) \
+        .outerjoin(ledger, ledger.c.user_id == User.id) \
+        .filter(db.func.abs(db.func.coalesce(User.balance, 0) - expected) > 0.005).all()
+    for user_id, balance, total in drifts:
+        print(f"⚠️ Utilisateur #{user_id} : solde {balance} ≠ grand livre {total}")
+    if fix and drifts:
+        for user_id, _, total in drifts:
+            db.session.execute(
+                db.update(User).where(User.id == user_id).values(balance=total)
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+        print(f"✅ {len(drifts)} soldes réalignés")
+    elif not drifts:
+        print("✅ Soldes cohérents avec le grand livre")
+
+@main.cli.command("recount-unread")
+def recount_unread_command():
+    """Recalcule users.unread_count à partir de messages."""
+    unread = db.select(db.func.count(Message.id)).where(
+        Message.receiver_id == User.id, Message.read.is_(False)
+    ).scalar_subquery()
+    db.session.execute(db.update(User).values(unread_count=unread))
+    db.session.commit()
+    print("✅ Compteurs de non-lus recalculés")
+
+# ---------------- FABRIQUE D'APPLICATION ----------------
+# create_app() ne fait aucune E/S vers la base : un worker démarre sans attendre PostgreSQL
+# (une panne de base n'empêche plus l'import). Le schéma se crée explicitement, une fois par
+# déploiement : `flask --app app upgrade-db` (ou `python app.py` en local).
+JINJA_CACHE_DIR = os.getenv('JINJA_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'izrussia-jinja'))
+
+def create_app(config=None):
+    app = Flask(
+        __name__,
+        template_folder=TEMPLATES_DIR,
+        static_folder=STATIC_DIR
+    )
+    app.config.from_object(Config)
+
+    # Configuration
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['JWT_SECRET_KEY'] = 'jwt_super_secret_key'
+    # Cookie du token (pages rendues côté serveur) ; les API lisent toujours l'en-tête Authorization
+    app.config['JWT_COOKIE_SECURE'] = os.getenv('JWT_COOKIE_SECURE', 'True') == 'True'
+    app.config['JWT_COOKIE_SAMESITE'] = 'Lax'
+    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+
+    # Mail
+    # Surchargeables pour pointer vers un serveur SMTP local en test
+    # (ex. `python -m aiosmtpd -n -l localhost:8025` avec MAIL_SERVER=localhost MAIL_PORT=8025 MAIL_USE_TLS=False)
+    app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
+    app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 587))
+    app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', 'True') == 'True'
+    app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
+    app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
+    app.config['MAIL_DEFAULT_SENDER'] = ('IZRUSSIA', os.environ.get("MAIL_USERNAME"))
+
+    # Pool de connexions instrumenté (attente d'une connexion libre, délais dépassés : voir /metrics)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {"poolclass": InstrumentedQueuePool}
+
+    if config:
+        app.config.from_mapping(config)
+
+    # Gabarits compilés gardés sur disque : pas de recompilation Jinja à chaque démarrage de worker
+    os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+    app.jinja_options = {**app.jinja_options, "bytecode_cache": FileSystemBytecodeCache(JINJA_CACHE_DIR)}
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+    cloudinary.config(
+        cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
+        api_key=os.getenv('CLOUDINARY_API_KEY'),
+        api_secret=os.getenv('CLOUDINARY_API_SECRET')
+    )
+
+    CORS(app, resources={r"/*": {"origins": "*"}})
+    db.init_app(app)
+    mail.init_app(app)
+    jwt.init_app(app)
+    if int(os.getenv('WEB_CONCURRENCY', 1)) > 1 and not SOCKETIO_MESSAGE_QUEUE:
+        print("⚠️ WEB_CONCURRENCY > 1 sans SOCKETIO_MESSAGE_QUEUE : les messages temps réel ne traverseront pas les workers")
+    socketio.init_app(app, cors_allowed_origins="*", **socketio_options(SOCKETIO_MESSAGE_QUEUE))
+    count_emits(socketio.server)
+
+    app.register_blueprint(main)
+    app.register_blueprint(sell_bp)
+    # Tâches de fond propres à cette application (elle leur est passée explicitement)
+    app.extensions["email_dispatcher"] = {"started": False, "wakeup": False}
+    if CHAT_WRITE_BEHIND:
+        app.extensions["chat_writer"] = make_chat_writer(app)
+    return app
+
+# gunicorn : app:app
+app = create_app()
 
 if __name__ == "__main__":
     with app.app_context():
@@ -1259,7 +2994,7 @@ if __name__ == "__main__":
                 raise
 
             print("🔄 Création des tables...")
-            db.create_all()
+            upgrade_schema(db)
             print("✅ Base de données initialisée.")
 
             from sqlalchemy import inspect
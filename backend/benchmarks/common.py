@@ -0,0 +1,33 @@
+# backend/benchmarks/common.py
+# Outils partagés par les scripts de benchmark (lancés depuis backend/ : python benchmarks/<script>.py)
+import os
+import socket
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Importe app.py contre la base donnée et crée le schéma (comme `flask upgrade-db`)
+def load_app(database_url):
+    os.environ["DATABASE_URL"] = database_url
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    import werkzeug
+    # Le client de test de Flask 2.3 lit werkzeug.__version__, absent de Werkzeug 3.1 (requirements.txt)
+    if not hasattr(werkzeug, "__version__"):
+        werkzeug.__version__ = "3"
+    import app as izr
+    with izr.app.app_context():
+        izr.upgrade_schema(izr.db)
+    return izr
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
@@ -0,0 +1,207 @@
+# backend/benchmarks/endpoints.py
+# Benchmark des endpoints clés sur un jeu de données synthétique (voir seed.py).
+# Pour chaque scénario : latence p50/p95/p99, nombre de requêtes SQL par appel et pic mémoire
+# Python (tracemalloc, passe séparée pour ne pas fausser les latences). Résultat JSON
+# comparable d'un commit à l'autre :
+#   python benchmarks/endpoints.py --scale small --output avant.json
+#   (changement)
+#   python benchmarks/endpoints.py --scale small --output apres.json --compare avant.json
+# Base : SQLite dans /tmp par défaut (remplie au premier lancement puis réutilisée),
+# ou --database-url postgresql://… pour une base PostgreSQL locale.
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from sqlalchemy import event
+
+from common import BACKEND_DIR, load_app, percentile
+from seed import SCALES, seed
+
+
+# Scénarios : nom -> fonction (rng, contexte) qui renvoie (url, token)
+def scenarios(ctx):
+    users = ctx["users"]
+
+    def user_token(rng):
+        return ctx["token"](rng.randint(2, users))
+
+    return {
+        "articles_first_page": lambda rng: ("/api/articles", user_token(rng)),
+        "articles_category": lambda rng: (f"/api/articles?category={rng.choice(ctx['categories'])}", user_token(rng)),
+        "articles_deep_cursor": lambda rng: (f"/api/articles?cursor={ctx['deep_cursor']}", user_token(rng)),
+        "conversations": lambda rng: ("/api/conversations", user_token(rng)),
+        "profile": lambda rng: ("/api/profile", user_token(rng)),
+        "admin_data": lambda rng: ("/api/admin/data", ctx["token"](1)),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"], cwd=BACKEND_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def prepare(args):
+    if args.database_url is None:
+        path = f"/tmp/izr_bench_{args.scale}_{args.seed}.db"
+        if args.reseed and os.path.exists(path):
+            os.remove(path)
+        args.database_url = f"sqlite:///{path}"
+
+    izr = load_app(args.database_url)
+    with izr.app.app_context():
+        if args.reseed and izr.db.engine.dialect.name != "sqlite":
+            izr.db.drop_all()
+            izr.upgrade_schema(izr.db)
+        if not izr.db.session.query(izr.User.id).first():
+            print(f"⏳ Remplissage de la base ({args.scale})…", file=sys.stderr)
+            seed(izr, *SCALES[args.scale], seed=args.seed, log=lambda m: print(m, file=sys.stderr))
+        counts = {
+            model.__tablename__: izr.db.session.query(izr.db.func.count(model.id)).scalar()
+            for model in (izr.User, izr.Article, izr.Message, izr.Conversation)
+        }
+        engine = izr.db.engine
+    return izr, engine, counts
+
+
+def make_context(izr, client, counts):
+    tokens = {}
+
+    def token(user_id):
+        if user_id not in tokens:
+            with izr.app.app_context():
+                user = izr.db.session.get(izr.User, user_id)
+                tokens[user_id] = izr.create_access_token(
+                    identity=str(user_id), additional_claims=izr.auth_claims(user)
+                )
+        return tokens[user_id]
+
+    # Curseur de la 10e page du fil, obtenu en suivant la pagination
+    cursor = None
+    for _ in range(10):
+        page = client.get("/api/articles" + (f"?cursor={cursor}" if cursor else ""),
+                          headers={"Authorization": f"Bearer {token(2)}"}).get_json()
+        cursor = page.get("next_cursor") or cursor
+    with izr.app.app_context():
+        categories = [c for (c,) in izr.db.session.query(izr.Article.category).distinct() if c]
+    return {"users": counts["users"], "token": token, "deep_cursor": cursor or "", "categories": categories}
+
+
+def run(izr, client, name, make_request, args, queries):
+    rng = random.Random(f"{args.seed}:{name}")
+    requests = [make_request(rng) for _ in range(args.warmup + args.requests)]
+
+    latencies, query_counts, statuses = [], [], {}
+    for i, (url, token) in enumerate(requests):
+        queries[0] = 0
+        start = time.perf_counter()
+        response = client.get(url, headers={"Authorization": f"Bearer {token}"})
+        elapsed = (time.perf_counter() - start) * 1000
+        if i < args.warmup:
+            continue
+        latencies.append(elapsed)
+        query_counts.append(queries[0])
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    peaks = []
+    for url, token in requests[args.warmup:args.warmup + args.memory_samples]:
+        tracemalloc.start()
+        client.get(url, headers={"Authorization": f"Bearer {token}"})
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {
+        "requests": len(latencies),
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(statistics.mean(latencies), 2),
+        "queries_mean": round(statistics.mean(query_counts), 2),
+        "queries_max": max(query_counts),
+        "peak_alloc_kib": round(max(peaks) / 1024, 1) if peaks else None,
+    }
+
+
+# Tableau des écarts avec un résultat précédent (sur stderr)
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    print(f"{'scénario':24} {'p50':>18} {'p95':>18} {'requêtes':>14}", file=sys.stderr)
+    for name, new in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        cells = []
+        for key in ("p50_ms", "p95_ms"):
+            ratio = new[key] / old[key] if old[key] else float("inf")
+            cells.append(f"{old[key]:.1f}→{new[key]:.1f} ({ratio:.2f}x)")
+        cells.append(f"{old['queries_mean']:g}→{new['queries_mean']:g}")
+        print(f"{name:24} {cells[0]:>18} {cells[1]:>18} {cells[2]:>14}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des endpoints clés")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", help="défaut : SQLite dans /tmp, par échelle et graine")
+    parser.add_argument("--reseed", action="store_true", help="vide et remplit de nouveau la base")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--memory-samples", type=int, default=10)
+    parser.add_argument("--only", nargs="*", help="scénarios à lancer (défaut : tous)")
+    parser.add_argument("--output", help="fichier JSON (défaut : stdout)")
+    parser.add_argument("--compare", help="résultat JSON de référence")
+    args = parser.parse_args()
+
+    izr, engine, counts = prepare(args)
+    client = izr.app.test_client()
+    queries = [0]
+    event.listen(engine, "before_cursor_execute", lambda *a: queries.__setitem__(0, queries[0] + 1))
+    ctx = make_context(izr, client, counts)
+
+    results = {}
+    for name, make_request in scenarios(ctx).items():
+        if args.only and name not in args.only:
+            continue
+        results[name] = run(izr, client, name, make_request, args, queries)
+        print(f"  {name}: p50 {results[name]['p50_ms']} ms, {results[name]['queries_mean']} requêtes", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "date": datetime.utcnow().isoformat(timespec="seconds"),
+            "scale": args.scale,
+            "seed": args.seed,
+            "dialect": engine.dialect.name,
+            "rows": counts,
+            "python": platform.python_version(),
+            "requests": args.requests,
+            "max_rss_mib": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
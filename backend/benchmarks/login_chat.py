@@ -0,0 +1,138 @@
+# backend/benchmarks/login_chat.py
+# Latence du chat pendant une rafale de connexions.
+# Lance l'application sous gevent (monkey-patchée, comme `gunicorn -k gevent`) dans un sous-processus,
+# puis mesure l'aller-retour d'un message Socket.IO (send_message → receive_message) pendant que
+# des clients appellent /api/login en parallèle. Deux passes :
+#   inline : PASSWORD_HASH_THREADS=0, bcrypt dans le greenlet de la requête
+#   pool   : PASSWORD_HASH_THREADS=4, bcrypt dans le pool de threads
+# Usage (depuis backend/) : python benchmarks/login_chat.py [--logins 40] [--concurrency 8] [--rounds 12]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import BACKEND_DIR, free_port, percentile
+
+PASSWORD = "benchmark-password"
+
+
+def serve(port):
+    from gevent import monkey
+    monkey.patch_all()
+    sys.path.insert(0, BACKEND_DIR)
+    import app as izr
+
+    with izr.app.app_context():
+        izr.upgrade_schema(izr.db)
+        for email in ("alice@bench.local", "bob@bench.local"):
+            izr.db.session.add(izr.User("Bench", email.split("@")[0], email, None, PASSWORD))
+        izr.db.session.commit()
+    print("ready", flush=True)
+    izr.socketio.run(izr.app, host="127.0.0.1", port=port, log_output=False)
+
+
+def run_pass(name, threads, args):
+    import requests
+    import socketio
+
+    port = free_port()
+    db_path = os.path.join(tempfile.mkdtemp(prefix="izr_bench_"), "bench.db")
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{db_path}",
+        PASSWORD_HASH_THREADS=str(threads),
+        BCRYPT_LOG_ROUNDS=str(args.rounds),
+    )
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", str(port)],
+        env=env, cwd=BACKEND_DIR, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    try:
+        for line in server.stdout:
+            if line.strip() == "ready":
+                break
+        base = f"http://127.0.0.1:{port}"
+        for _ in range(50):
+            try:
+                requests.get(base + "/login", timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.1)
+
+        token = requests.post(base + "/api/login", json={"email": "alice@bench.local", "password": PASSWORD}).json()["access_token"]
+        received = threading.Event()
+        client = socketio.Client()
+        client.on("receive_message", lambda msg: received.set())
+        client.connect(base, auth={"token": token})
+        client.emit("join", {"peer_id": 2})
+        time.sleep(0.2)
+
+        latencies, stop = [], threading.Event()
+
+        def probe():
+            while not stop.is_set():
+                received.clear()
+                start = time.perf_counter()
+                client.emit("send_message", {"receiver_id": 2, "content": "ping"})
+                if received.wait(10):
+                    latencies.append((time.perf_counter() - start) * 1000)
+                time.sleep(0.02)
+
+        def login(i):
+            email = "alice@bench.local" if i % 2 else "bob@bench.local"
+            return requests.post(base + "/api/login", json={"email": email, "password": PASSWORD}, timeout=60).status_code
+
+        # Référence au repos, puis pendant la rafale
+        prober = threading.Thread(target=probe)
+        prober.start()
+        time.sleep(1)
+        idle = list(latencies)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            statuses = list(pool.map(login, range(args.logins)))
+        burst_seconds = time.perf_counter() - started
+        stop.set()
+        prober.join()
+        client.disconnect()
+
+        under_load = latencies[len(idle):]
+        return {
+            "mode": name,
+            "hash_threads": threads,
+            "logins": args.logins,
+            "login_ok": statuses.count(200),
+            "logins_per_s": round(args.logins / burst_seconds, 1),
+            "chat_idle_p50_ms": round(statistics.median(idle), 1) if idle else None,
+            "chat_load_p50_ms": round(percentile(under_load, 50), 1) if under_load else None,
+            "chat_load_p95_ms": round(percentile(under_load, 95), 1) if under_load else None,
+            "chat_load_max_ms": round(max(under_load), 1) if under_load else None,
+            "chat_samples": len(under_load),
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=12)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve)
+        return
+
+    results = [run_pass("inline", 0, args), run_pass("pool", 4, args)]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
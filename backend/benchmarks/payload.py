@@ -0,0 +1,99 @@
+# backend/benchmarks/payload.py
+# Octets transférés et temps de sérialisation des listes JSON, avant / après ?fields= et compression.
+# Base SQLite temporaire remplie d'articles (descriptions longues comme en production), puis
+# /api/articles, /api/conversations et /api/profile appelés via le client de test Flask
+# avec différentes combinaisons de champs et d'Accept-Encoding.
+# Usage (depuis backend/) : python benchmarks/payload.py [--articles 500] [--limit 50] [--repeat 30]
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from common import load_app
+
+SCENARIOS = [
+    # (endpoint, paramètres, Accept-Encoding)
+    ("/api/articles", "", "identity"),
+    ("/api/articles", "", "gzip"),
+    ("/api/articles", "", "br, gzip"),
+    ("/api/articles", "fields=id,title,price,photos,city", "identity"),
+    ("/api/articles", "fields=id,title,price,photos,city", "br, gzip"),
+    ("/api/conversations", "", "identity"),
+    ("/api/conversations", "", "br, gzip"),
+    ("/api/conversations", "fields=peer_id,peer_name,unread,timestamp", "br, gzip"),
+    ("/api/profile", "", "identity"),
+    ("/api/profile", "", "br, gzip"),
+    ("/api/profile", "fields=first_name,balance", "br, gzip"),
+]
+
+
+def seed(izr, args):
+    rng = random.Random(42)
+    words = "téléphone robe chaussures ordinateur sac montre neuf occasion livraison rapide Abidjan Moscou".split()
+    users = [izr.User(f"Prénom{i}", f"Nom{i}", f"user{i}@bench.local", None, "benchmark") for i in range(20)]
+    izr.db.session.add_all(users)
+    izr.db.session.flush()
+    for i in range(args.articles):
+        izr.db.session.add(izr.Article(
+            title=" ".join(rng.choices(words, k=4)),
+            description=" ".join(rng.choices(words, k=rng.randint(40, 160))),
+            price=rng.randint(1000, 500000),
+            category=rng.choice(["Mode", "Tech", "Maison", "Auto"]),
+            city=rng.choice(["Abidjan", "Moscou", "Bouaké"]),
+            condition=rng.choice(["Neuf", "Occasion"]),
+            user_id=users[i % len(users)].id,
+            status="approved",
+            photos=izr.photo_manifest.build_manifest([], state="ready"),
+        ))
+    izr.db.session.flush()
+    for i in range(1, len(users)):
+        izr.db.session.add(izr.Conversation(
+            user_low_id=users[0].id, user_high_id=users[i].id, article_id=i,
+            last_message=" ".join(rng.choices(words, k=20)), last_message_at=izr.datetime.utcnow(),
+        ))
+        izr.db.session.add(izr.Purchase(buyer_id=users[0].id, article_id=i, amount=1000, transaction_id=f"bench-{i}"))
+    izr.db.session.commit()
+    return izr.create_access_token(identity=str(users[0].id))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--articles", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="izr_bench_"), "bench.db")
+    izr = load_app(f"sqlite:///{db_path}")
+
+    with izr.app.app_context():
+        token = seed(izr, args)
+    client = izr.app.test_client()
+
+    results = []
+    for endpoint, params, encoding in SCENARIOS:
+        query = "&".join(p for p in (f"limit={args.limit}" if endpoint == "/api/articles" else "", params) if p)
+        url = endpoint + ("?" + query if query else "")
+        headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": encoding}
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            response = client.get(url, headers=headers)
+            timings.append((time.perf_counter() - start) * 1000)
+        results.append({
+            "url": url,
+            "accept_encoding": encoding,
+            "status": response.status_code,
+            "content_encoding": response.headers.get("Content-Encoding", "identity"),
+            "bytes": len(response.data),
+            "request_p50_ms": round(statistics.median(timings), 2),
+            "request_max_ms": round(max(timings), 2),
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+# backend/benchmarks/seed.py
+# Jeu de données synthétique déterministe pour les benchmarks.
+# Même graine + même échelle = mêmes lignes, ids compris : deux commits se comparent sur des
+# données identiques. Insertion par lots via SQLAlchemy Core (pas d'ORM ni d'événements) ; les
+# colonnes dérivées (conversation_key, résumés de conversations, unread_count) sont calculées ici.
+#   python benchmarks/seed.py --scale large --database-url postgresql://localhost/izr_bench
+import argparse
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import bcrypt
+from sqlalchemy import bindparam
+
+# utilisateurs, articles, messages (cotisations et achats : un par tranche de deux utilisateurs)
+SCALES = {
+    "tiny": (200, 2_000, 10_000),
+    "small": (2_000, 20_000, 100_000),
+    "medium": (20_000, 200_000, 1_000_000),
+    "large": (100_000, 1_000_000, 10_000_000),
+}
+
+EPOCH = datetime(2025, 1, 1)
+BATCH = 5_000
+MESSAGES_PER_CONVERSATION = 20
+PASSWORD = "benchmark-password"
+
+CATEGORIES = ["Mode", "Tech", "Maison", "Auto", "Beauté", "Sport", "Enfants", "Autres"]
+CITIES = ["Abidjan", "Moscou", "Bouaké", "Yamoussoukro", "Saint-Pétersbourg", "Kazan"]
+WORDS = (
+    "téléphone robe chaussures ordinateur sac montre casque livre vélo table chaise lampe "
+    "neuf occasion excellent état livraison rapide garantie original prix négociable urgent"
+).split()
+ARTICLE_STATUSES = ["approved"] * 17 + ["pending"] * 2 + ["rejected"]
+COTISATION_STATUSES = ["valide", "en_attente", "refuse"]
+
+
+def words(rng, n):
+    return " ".join(rng.choices(WORDS, k=n))
+
+
+def batched(rows, size=BATCH):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def user_rows(rng, n, password_hash):
+    for i in range(1, n + 1):
+        yield {
+            "id": i,
+            "uid": str(uuid.UUID(int=rng.getrandbits(128))),
+            "first_name": f"Prénom{i}",
+            "last_name": f"Nom{i}",
+            "email": f"user{i}@bench.local",
+            "phone": f"+225{rng.randint(10**7, 10**8 - 1)}",
+            "password_hash": password_hash,
+            "balance": float(rng.randint(0, 200_000)),
+            "created_at": EPOCH + timedelta(minutes=i),
+            "role": "admin" if i == 1 else "user",
+            "is_active": True,
+            "token_version": 0,
+            "unread_count": 0,
+        }
+
+
+def article_rows(rng, n, users, photos):
+    for i in range(1, n + 1):
+        yield {
+            "id": i,
+            "user_id": rng.randint(1, users),
+            "title": words(rng, 4),
+            "description": words(rng, rng.randint(20, 120)),
+            "category": rng.choice(CATEGORIES),
+            "city": rng.choice(CITIES),
+            "condition": rng.choice(["Neuf", "Occasion"]),
+            "price": float(rng.randint(1, 500) * 1000),
+            "status": rng.choice(ARTICLE_STATUSES),
+            "photos": photos,
+            "created_at": EPOCH + timedelta(seconds=30 * i),
+            "version": 1,
+        }
+
+
+# Messages regroupés par conversation ; `summaries` et `unread` sont remplis au passage
+def message_rows(rng, n, users, articles, summaries, unread):
+    seen = set()
+    message_id = 0
+    conversations = max(1, n // MESSAGES_PER_CONVERSATION)
+    for c in range(conversations):
+        while True:
+            lo, hi = sorted(rng.sample(range(1, users + 1), 2))
+            article_id = rng.randint(1, articles)
+            if (lo, hi, article_id) not in seen:
+                seen.add((lo, hi, article_id))
+                break
+        count = n // conversations + (1 if c < n % conversations else 0)
+        start = EPOCH + timedelta(seconds=rng.randint(0, 3600 * 24 * 365))
+        summary = {
+            "user_low_id": lo, "user_high_id": hi, "article_id": article_id,
+            "unread_low": 0, "unread_high": 0,
+        }
+        for k in range(count):
+            message_id += 1
+            sender, receiver = (lo, hi) if rng.random() < 0.5 else (hi, lo)
+            read = k < count - 3 or rng.random() < 0.5
+            content = words(rng, rng.randint(2, 20))
+            timestamp = start + timedelta(seconds=45 * k)
+            if not read:
+                summary["unread_low" if receiver == lo else "unread_high"] += 1
+                unread[receiver] = unread.get(receiver, 0) + 1
+            summary.update(last_message=content[:200], last_message_at=timestamp, last_sender_id=sender)
+            yield {
+                "id": message_id,
+                "sender_id": sender,
+                "receiver_id": receiver,
+                "article_id": article_id,
+                "content": content,
+                "timestamp": timestamp,
+                "read": read,
+                "conversation_key": f"{lo}:{hi}:{article_id}",
+            }
+        summaries.append(summary)
+
+
+def cotisation_rows(rng, users):
+    for i in range(1, users // 2 + 1):
+        envoye = float(rng.randint(1, 100) * 1000)
+        yield {
+            "id": i,
+            "user_id": rng.randint(1, users),
+            "montant_envoye": envoye,
+            "montant_recu": envoye * 0.95,
+            "statut": rng.choice(COTISATION_STATUSES),
+            "date_cotisation": EPOCH + timedelta(minutes=7 * i),
+        }
+
+
+def purchase_rows(rng, users, articles):
+    for i in range(1, users // 2 + 1):
+        yield {
+            "id": i,
+            "buyer_id": rng.randint(1, users),
+            "article_id": rng.randint(1, articles),
+            "transaction_id": f"bench-{i}",
+            "amount": float(rng.randint(1, 500) * 1000),
+            "created_at": EPOCH + timedelta(minutes=11 * i),
+        }
+
+
+def insert(conn, table, rows):
+    total = 0
+    for batch in batched(rows):
+        conn.execute(table.insert(), batch)
+        total += len(batch)
+    return total
+
+
+# Remplit une base vide ; renvoie {table: lignes insérées}
+def seed(izr, users, articles, messages, seed=42, log=print):
+    rng = random.Random(seed)
+    password_hash = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(4)).decode()
+    photos = izr.photo_manifest.build_manifest([], state="ready")
+    counts = {}
+    started = time.perf_counter()
+
+    # Une seule transaction : un seul fsync sous SQLite
+    with izr.db.engine.begin() as conn:
+        def step(model, rows):
+            counts[model.__tablename__] = insert(conn, model.__table__, rows)
+            log(f"  {model.__tablename__}: {counts[model.__tablename__]} lignes ({time.perf_counter() - started:.0f} s)")
+
+        step(izr.User, user_rows(rng, users, password_hash))
+        step(izr.Article, article_rows(rng, articles, users, photos))
+        summaries, unread = [], {}
+        step(izr.Message, message_rows(rng, messages, users, articles, summaries, unread))
+        step(izr.Conversation, iter(summaries))
+        step(izr.Cotisation, cotisation_rows(rng, users))
+        step(izr.Purchase, purchase_rows(rng, users, articles))
+
+        users_table = izr.User.__table__
+        for batch in batched(sorted(unread.items())):
+            conn.execute(
+                users_table.update().where(users_table.c.id == bindparam("target_id")),
+                [{"target_id": user_id, "unread_count": count} for user_id, count in batch],
+            )
+
+        if conn.dialect.name == "postgresql":
+            # Ids explicites : réaligner les séquences pour les INSERT suivants
+            for table in counts:
+                conn.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), coalesce(max(id), 1)) FROM {table}"
+                )
+        conn.exec_driver_sql("ANALYZE")
+    return counts
+
+
+def main():
+    from common import load_app
+
+    parser = argparse.ArgumentParser(description="Remplit une base vide avec le jeu de benchmark")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", default="sqlite:////tmp/izr_bench.db")
+    args = parser.parse_args()
+
+    izr = load_app(args.database_url)
+    with izr.app.app_context():
+        counts = seed(izr, *SCALES[args.scale], seed=args.seed)
+    print(json.dumps(counts))
+
+
+if __name__ == "__main__":
+    main()
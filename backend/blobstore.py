@@ -0,0 +1,107 @@
+# backend/blobstore.py
+# Stockage adressé par contenu des uploads locaux.
+# Chaque fichier est identifié par le SHA-256 de ses octets d'origine (calculé pendant la copie
+# du flux de la requête, voir uploads.spool) et stocké une seule fois :
+#   media/ab/abcdef….webp, abcdef…_card.webp, abcdef…_thumb.webp   (variantes, images.py)
+#   media/ab/abcdef….json                                          (métadonnées, écrites en dernier)
+# Un blob est complet dès que son .json existe. Les noms ne changent jamais : les fichiers
+# peuvent être servis avec un cache "immutable". Les compteurs de références vivent en base (app.py).
+import json
+import os
+import shutil
+import time
+
+
+class BlobStore:
+    def __init__(self, folder, processor=None):
+        self.folder = folder
+        self.processor = processor
+        os.makedirs(folder, exist_ok=True)
+
+    def _dir(self, sha):
+        return os.path.join(self.folder, sha[:2])
+
+    def _meta_path(self, sha):
+        return os.path.join(self._dir(sha), f"{sha}.json")
+
+    @staticmethod
+    def relpath(sha, filename):
+        return f"{sha[:2]}/{filename}"
+
+    def exists(self, sha):
+        return os.path.exists(self._meta_path(sha))
+
+    def get(self, sha):
+        with open(self._meta_path(sha)) as f:
+            return json.load(f)
+
+    def put(self, path, filename, sha):
+        if self.exists(sha):
+            # Déjà stocké : on rafraîchit la date pour protéger le blob du GC pendant l'upload en cours
+            os.utime(self._meta_path(sha))
+            return self.get(sha)
+
+        directory = self._dir(sha)
+        os.makedirs(directory, exist_ok=True)
+        meta = None
+
+        if self.processor and self.processor.available:
+            try:
+                result = self.processor.process(path, directory, sha)
+                meta = {
+                    "filename": self.relpath(sha, result["filename"]),
+                    "width": result["width"],
+                    "height": result["height"],
+                    "variants": {
+                        name: {**v, "filename": self.relpath(sha, v["filename"])}
+                        for name, v in result["variants"].items()
+                    },
+                }
+            except Exception as e:
+                print(f"⚠️ Traitement d'image impossible pour {filename}, copie brute : {e}")
+
+        if meta is None:
+            ext = os.path.splitext(filename or "")[1].lower()
+            shutil.copyfile(path, os.path.join(directory, f"{sha}{ext}"))
+            meta = {"filename": self.relpath(sha, f"{sha}{ext}"), "width": None, "height": None, "variants": {}}
+
+        meta.update(blob=sha, size=os.path.getsize(path))
+        tmp = f"{self._meta_path(sha)}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._meta_path(sha))
+        return meta
+
+    # Date de dernière écriture/réutilisation (None si absent)
+    def touched_at(self, sha):
+        try:
+            return os.path.getmtime(self._meta_path(sha))
+        except OSError:
+            return None
+
+    def delete(self, sha):
+        directory = self._dir(sha)
+        if not os.path.isdir(directory):
+            return 0
+        freed = 0
+        # Le .json d'abord : le blob cesse d'exister avant que ses fichiers disparaissent
+        names = sorted(os.listdir(directory), key=lambda n: not n.endswith(".json"))
+        for name in names:
+            if name.startswith(sha):
+                full = os.path.join(directory, name)
+                freed += os.path.getsize(full)
+                os.remove(full)
+        return freed
+
+    def iter_blobs(self):
+        for sub in os.listdir(self.folder):
+            directory = os.path.join(self.folder, sub)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if name.endswith(".json"):
+                    yield name[:-5]
+
+    def is_stale(self, sha, grace):
+        touched = self.touched_at(sha)
+        return touched is None or touched < time.time() - grace
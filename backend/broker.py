@@ -0,0 +1,121 @@
+# backend/broker.py
+# File de messages Socket.IO partagée entre workers.
+# Sans broker, les rooms vivent dans la mémoire du processus : un emit ne touche que les clients
+# connectés au même worker. Avec SOCKETIO_MESSAGE_QUEUE, chaque emit est publié sur le broker
+# et rejoué par tous les workers, qui le délivrent à leurs propres clients.
+#   redis://host:6379/0   → socketio.RedisManager (production)
+#   local://127.0.0.1:6380 → LocalManager + LocalHub ci-dessous (dev, tests, sans Redis)
+# Lancer le hub local : `python broker.py 127.0.0.1:6380`
+# Comme RedisManager, l'écoute utilise des sockets bloquantes : sous gevent, le worker doit être
+# monkey-patché (c'est le cas avec `gunicorn -k gevent`).
+import json
+import socket
+import socketserver
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+import socketio
+
+CHANNEL = "flask-socketio"
+RECONNECT_DELAY = 1
+
+
+# Hub de diffusion minimal : chaque ligne reçue d'un client est renvoyée à tous les clients
+class LocalHub(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        self.clients = set()
+        self.lock = threading.Lock()
+        super().__init__(address, _HubHandler)
+
+    def broadcast(self, line):
+        with self.lock:
+            clients = list(self.clients)
+        for client in clients:
+            try:
+                client.sendall(line)
+            except OSError:
+                with self.lock:
+                    self.clients.discard(client)
+
+
+class _HubHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        with self.server.lock:
+            self.server.clients.add(self.request)
+        try:
+            for line in self.rfile:
+                self.server.broadcast(line)
+        finally:
+            with self.server.lock:
+                self.server.clients.discard(self.request)
+
+
+# Client Socket.IO du hub local : même contrat que RedisManager (publish / listen)
+class LocalManager(socketio.PubSubManager):
+    name = "local"
+
+    def __init__(self, url="local://127.0.0.1:6380", channel=CHANNEL, write_only=False, logger=None, json=None):
+        parsed = urlparse(url)
+        self.address = (parsed.hostname or "127.0.0.1", parsed.port or 6380)
+        self._conn = None
+        self._lock = threading.Lock()
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+
+    def _line(self, data):
+        return (self.json.dumps({"channel": self.channel, "data": data}) + "\n").encode()
+
+    def _publish(self, data):
+        line = self._line(data)
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._conn is None:
+                        self._conn = socket.create_connection(self.address)
+                    self._conn.sendall(line)
+                    return
+                except OSError:
+                    self._conn = None
+                    if attempt:
+                        raise
+
+    def _listen(self):
+        # Reconnexion infinie : le thread de PubSubManager s'arrête si ce générateur se termine
+        while True:
+            try:
+                with socket.create_connection(self.address) as conn:
+                    for line in conn.makefile("rb"):
+                        message = json.loads(line)
+                        if message.get("channel") == self.channel:
+                            yield message["data"]
+            except OSError as e:
+                self._get_logger().warning(f"Broker local injoignable ({e}), nouvel essai")
+            time.sleep(RECONNECT_DELAY)
+
+
+BROKERS = {
+    "redis": socketio.RedisManager,
+    "rediss": socketio.RedisManager,
+    "local": LocalManager,
+}
+
+
+# Options supplémentaires pour SocketIO(app, ...) selon l'URL du broker (aucune si url vide)
+def socketio_options(url, channel=CHANNEL):
+    if not url:
+        return {}
+    scheme = urlparse(url).scheme
+    if scheme not in BROKERS:
+        raise ValueError(f"Broker Socket.IO inconnu : {url}")
+    return {"client_manager": BROKERS[scheme](url, channel=channel)}
+
+
+if __name__ == "__main__":
+    host, _, port = (sys.argv[1] if len(sys.argv) > 1 else "127.0.0.1:6380").rpartition(":")
+    with LocalHub((host or "127.0.0.1", int(port))) as hub:
+        print(f"📡 Broker local sur {host or '127.0.0.1'}:{port}")
+        hub.serve_forever()
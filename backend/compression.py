@@ -0,0 +1,57 @@
+# backend/compression.py
+# Compression des réponses JSON / HTML négociée par Accept-Encoding (br, sinon gzip).
+# Utilisée en after_request : les petites réponses (< min_size) partent telles quelles, la
+# compression coûtant plus que les octets gagnés. Brotli est facultatif (paquet `Brotli`) ;
+# sans lui seul gzip est proposé.
+# L'ETag d'une réponse compressée devient faible (W/"...") : les octets diffèrent de la version
+# non compressée, mais If-None-Match (comparaison faible) continue de produire des 304.
+import gzip
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/html", "text/plain", "text/css", "application/javascript"}
+
+
+class ResponseCompressor:
+    def __init__(self, min_size=1024, gzip_level=6, brotli_quality=5):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.encodings = ["br", "gzip"] if BROTLI_AVAILABLE else ["gzip"]
+
+    def encode(self, data, encoding):
+        if encoding == "br":
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def _eligible(self, response):
+        return (
+            response.status_code == 200
+            and not response.direct_passthrough
+            and not response.is_streamed
+            and "Content-Encoding" not in response.headers
+            and response.mimetype in COMPRESSIBLE_MIMETYPES
+        )
+
+    def compress(self, request, response):
+        if not self._eligible(response):
+            return response
+        response.vary.add("Accept-Encoding")
+
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        response.set_data(self.encode(data, encoding))
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,13 @@
+# backend/gunicorn.conf.py
+# Hooks gunicorn (chargé avec -c, voir Procfile et Dockerfile).
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+# Exécuté dans le maître à la sortie d'un worker : son instantané de métriques (METRICS_DIR)
+# est reporté dans retired.json puis supprimé, le répertoire ne grossit pas à chaque redémarrage
+def child_exit(server, worker):
+    from metrics import mark_process_dead
+    mark_process_dead(worker.pid)
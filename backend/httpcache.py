@@ -0,0 +1,69 @@
+# backend/httpcache.py
+# Cache LRU en mémoire de réponses JSON déjà sérialisées (pages publiques du catalogue).
+# Chaque entrée porte des étiquettes ("article:12", "user:3") : les listeners SQLAlchemy de app.py
+# évincent par étiquette quand un article ou son vendeur change. L'éviction n'atteint que le
+# processus courant ; sur les autres workers une entrée vit au plus `ttl` secondes.
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+CachedResponse = namedtuple("CachedResponse", "body etag last_modified tags expires")
+
+
+def strong_etag(body):
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+class ResponseCache:
+    def __init__(self, maxsize=1024, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires <= time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, last_modified=None, tags=()):
+        entry = CachedResponse(body, strong_etag(body), last_modified, frozenset(tags), time.monotonic() + self.ttl)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+        return entry
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def evict_tag(self, tag):
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
@@ -0,0 +1,77 @@
+# backend/images.py
+# Traitement local des images (repli quand Cloudinary est indisponible) :
+# décodage, orientation EXIF appliquée puis métadonnées supprimées, réduction à 800px
+# comme l'upload Cloudinary, export WebP + variantes (vignette, carte).
+# Le redimensionnement tourne dans un pool de processus pour ne jamais bloquer
+# la boucle gevent / Socket.IO du worker web.
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+from photos import VARIANTS
+
+WEBP_QUALITY = 80
+MAX_PIXELS = 40_000_000  # refuse les images "bombe de décompression"
+
+
+# Exécutée dans un processus du pool : ne dépend que de ses arguments
+def process_image(src_path, dest_dir, base):
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+    with Image.open(src_path) as img:
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+        width, height = img.size
+
+        variants = {}
+        for name, max_width in sorted(VARIANTS.items(), key=lambda v: -v[1]):
+            variant = img.copy()
+            variant.thumbnail((max_width, max_width * 4))
+            filename = f"{base}.webp" if name == "full" else f"{base}_{name}.webp"
+            # Pas d'exif= ni d'icc_profile= : les métadonnées ne sont pas recopiées
+            variant.save(os.path.join(dest_dir, filename), "WEBP", quality=WEBP_QUALITY, method=4)
+            variants[name] = {"filename": filename, "width": variant.width, "height": variant.height}
+
+    full = variants["full"]
+    return {
+        "filename": full["filename"],
+        "width": full["width"],
+        "height": full["height"],
+        "original_width": width,
+        "original_height": height,
+        "variants": variants,
+    }
+
+
+class ImageProcessor:
+    def __init__(self, workers=2, timeout=60):
+        self.workers = workers
+        self.timeout = timeout
+        self._executor = None
+
+    @property
+    def available(self):
+        return PIL_AVAILABLE
+
+    # Pool créé au premier usage : pas de processus lancés à l'import de chaque worker
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def process(self, src_path, dest_dir, base):
+        future = self._pool().submit(process_image, src_path, dest_dir, base)
+        return future.result(timeout=self.timeout)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
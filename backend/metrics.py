@@ -0,0 +1,269 @@
+# backend/metrics.py
+# Métriques au format texte Prometheus, sans dépendance.
+# Écriture sans verrou : chaque mise à jour est une opération sur un dict ou une liste du
+# processus ; sous gevent les greenlets ne sont pas préemptés au milieu. Des threads
+# d'arrière-plan mettent aussi à jour des métriques (émissions Socket.IO via counted_emit depuis
+# le flusher write-behind et les workers d'upload, attente du pool SQL) : deux incréments
+# simultanés du même compteur peuvent exceptionnellement n'en compter qu'un.
+# Plusieurs workers : avec un répertoire partagé (METRICS_DIR), chaque worker y publie son
+# instantané toutes les `interval` secondes ; /metrics additionne ceux de tous les workers.
+# Les compteurs et histogrammes des workers arrêtés restent comptés, leurs jauges non :
+# mark_process_dead (hook child_exit de gunicorn) les reporte dans retired.json et supprime
+# le fichier du worker.
+import json
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def snapshot(self):
+        return {"type": self.type, "help": self.help, "labels": self.labels,
+                "values": [[list(k), v] for k, v in self.values.items()]}
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, labels=(), amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    # collect : fonction appelée à chaque instantané, renvoie {labels: valeur}
+    def __init__(self, name, help, labels=(), collect=None):
+        super().__init__(name, help, labels)
+        self.collect = collect
+
+    def inc(self, labels=(), amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+    def snapshot(self):
+        if self.collect is not None:
+            self.values = self.collect()
+        return super().snapshot()
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    # Ligne par jeu de labels : [compte par seau (non cumulé)..., +Inf, somme, total]
+    def observe(self, value, labels=()):
+        row = self.values.get(labels)
+        if row is None:
+            row = self.values[labels] = [0] * (len(self.buckets) + 3)
+        row[bisect_left(self.buckets, value)] += 1
+        row[-2] += value
+        row[-1] += 1
+
+    def snapshot(self):
+        data = super().snapshot()
+        data["buckets"] = self.buckets
+        return data
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def _add(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=(), collect=None):
+        return self._add(Gauge(name, help, labels, collect))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+
+# Additionne des instantanés (un par worker) : {nom: instantané fusionné}
+def merge(snapshots):
+    merged = {}
+    for snapshot in snapshots:
+        for name, data in snapshot.items():
+            target = merged.setdefault(name, dict(data, values={}))
+            for labels, value in data["values"]:
+                key = tuple(labels)
+                if data["type"] == "histogram":
+                    row = target["values"].setdefault(key, [0] * len(value))
+                    target["values"][key] = [a + b for a, b in zip(row, value)]
+                else:
+                    target["values"][key] = target["values"].get(key, 0) + value
+    return merged
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render(merged):
+    lines = []
+    for name, data in sorted(merged.items()):
+        lines.append(f"# HELP {name} {data['help']}")
+        lines.append(f"# TYPE {name} {data['type']}")
+        for key, value in sorted(data["values"].items()):
+            if data["type"] != "histogram":
+                lines.append(f"{name}{_labels(data['labels'], key)} {value:g}")
+                continue
+            cumulative = 0
+            for bound, count in zip([*data["buckets"], "+Inf"], value):
+                cumulative += count
+                le = f'le="{bound:g}"' if bound != "+Inf" else 'le="+Inf"'
+                lines.append(f"{name}_bucket{_labels(data['labels'], key, le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(data['labels'], key)} {value[-2]:g}")
+            lines.append(f"{name}_count{_labels(data['labels'], key)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+# Inverse de merge pour un seul instantané : valeurs au format de Metric.snapshot
+def _unmerge(merged):
+    return {name: dict(data, values=[[list(k), v] for k, v in data["values"].items()])
+            for name, data in merged.items()}
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(path, snapshot):
+    with open(path + ".tmp", "w") as f:
+        json.dump(snapshot, f)
+    os.replace(path + ".tmp", path)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# Publication des instantanés par worker et agrégation à la lecture
+class MetricsExporter:
+    def __init__(self, registry, directory=None, interval=5):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self._thread = None
+
+    def publish(self):
+        _write(os.path.join(self.directory, f"{os.getpid()}.json"), self.registry.snapshot())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.publish()
+            except OSError as e:
+                print(f"⚠️ Métriques non publiées : {e}")
+
+    # Lancé au premier appel, dans le worker (après le fork de gunicorn)
+    def start(self):
+        if self.directory and self._thread is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._thread = threading.Thread(target=self._run, name="metrics", daemon=True)
+            self._thread.start()
+
+    def collect(self):
+        if not self.directory:
+            return render(merge([self.registry.snapshot()]))
+        self.publish()
+        snapshots = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(".json"):
+                continue
+            snapshot = _read(os.path.join(self.directory, filename))
+            if snapshot is None:
+                continue
+            if not (filename[:-5].isdigit() and _alive(int(filename[:-5]))):
+                snapshot = {n: d for n, d in snapshot.items() if d["type"] != "gauge"}
+            snapshots.append(snapshot)
+        return render(merge(snapshots))
+
+
+# Worker arrêté : compteurs et histogrammes ajoutés à retired.json, fichier du worker supprimé.
+# Appelé par le seul processus maître (gunicorn.conf.py), donc sans écriture concurrente.
+def mark_process_dead(pid, directory=None):
+    directory = directory or os.getenv("METRICS_DIR")
+    if not directory:
+        return
+    path = os.path.join(directory, f"{pid}.json")
+    snapshot = _read(path)
+    if snapshot is not None:
+        kept = {n: d for n, d in snapshot.items() if d["type"] != "gauge"}
+        retired_path = os.path.join(directory, "retired.json")
+        _write(retired_path, _unmerge(merge([_read(retired_path) or {}, kept])))
+    for stale in (path, path + ".tmp"):
+        try:
+            os.remove(stale)
+        except FileNotFoundError:
+            pass
+
+
+# QueuePool qui mesure l'attente d'une connexion libre (histogramme) et les délais dépassés.
+# `instances` : pools vivants du processus (un par Engine), pour les jauges de taille/occupation.
+class InstrumentedQueuePool(QueuePool):
+    wait_histogram = None
+    timeouts = None
+    instances = weakref.WeakSet()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        InstrumentedQueuePool.instances.add(self)
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            if self.timeouts is not None:
+                self.timeouts.inc()
+            raise
+        finally:
+            if self.wait_histogram is not None:
+                self.wait_histogram.observe(time.perf_counter() - started)
@@ -0,0 +1,76 @@
+# backend/passwords.py
+# Hachage bcrypt des mots de passe hors de la boucle gevent.
+# Un hachage coûte ~250 ms de CPU (coût 12) : appelé directement dans le greenlet de la requête,
+# il gèle tout le worker, sockets du chat comprises. Ici le calcul part dans un pool de vrais
+# threads système (bcrypt relâche le GIL) ; le greenlet appelant attend sans bloquer le hub.
+# La file est bornée : au-delà de `max_pending` hachages en cours ou en attente, HasherBusy.
+# Format compatible Flask-Bcrypt ($2b$<coût>$...) : les hachages existants restent valides.
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+
+class HasherBusy(Exception):
+    pass
+
+
+def _gevent_patched():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("threading")
+
+
+class PasswordHasher:
+    # workers=0 : calcul dans le thread appelant (référence pour le benchmark)
+    def __init__(self, rounds=12, workers=4, max_pending=64, wait_timeout=5):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self.wait_timeout = wait_timeout
+        self._submit = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    # Pool créé au premier usage, dans le worker (après le monkey-patch de gunicorn)
+    def _init(self):
+        with self._lock:
+            if self._submit is not None:
+                return
+            self._slots = threading.BoundedSemaphore(self.max_pending)
+            if self.workers <= 0:
+                self._submit = lambda fn, *args: fn(*args)
+            elif _gevent_patched():
+                from gevent.threadpool import ThreadPool
+                pool = ThreadPool(self.workers)
+                self._submit = lambda fn, *args: pool.spawn(fn, *args).get()
+            else:
+                pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+                self._submit = lambda fn, *args: pool.submit(fn, *args).result()
+
+    def _run(self, fn, *args):
+        if self._submit is None:
+            self._init()
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise HasherBusy()
+        try:
+            return self._submit(fn, *args)
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        salt = bcrypt.gensalt(self.rounds)
+        return self._run(bcrypt.hashpw, password.encode("utf-8"), salt).decode("utf-8")
+
+    def check(self, password_hash, password):
+        try:
+            return self._run(bcrypt.checkpw, password.encode("utf-8"), password_hash.encode("utf-8"))
+        except ValueError:
+            return False  # hachage illisible
+
+    # Vrai si le hachage n'a pas été calculé avec le coût configuré
+    def needs_rehash(self, password_hash):
+        parts = (password_hash or "").split("$")
+        return len(parts) < 4 or not parts[2].isdigit() or int(parts[2]) != self.rounds
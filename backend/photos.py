@@ -0,0 +1,115 @@
+# backend/photos.py
+# Manifeste des photos d'un article, calculé une fois à l'écriture et stocké dans Article.photos :
+#   {"version": 1, "state": "ready" | "processing" | "partial" | "failed", "cover": 0, "items": [
+#       {"source": "cloudinary" | "local" | "url", "public_id": ..., "filename": ..., "blob": ...,
+#        "width": ..., "height": ...,
+#        "variants": {"thumb": {"url", "width", "height"}, "card": {...}, "full": {...}}}
+#   ]}
+# Les anciennes lignes (liste d'URLs / de noms de fichiers) sont converties à la volée en lecture
+# et définitivement par la commande `flask migrate-photos`.
+
+MANIFEST_VERSION = 1
+
+# Largeur maximale de chaque variante (même limite de 800px que l'upload Cloudinary pour "full")
+VARIANTS = {
+    "thumb": 320,
+    "card": 480,
+    "full": 800,
+}
+
+
+def _scaled(width, height, max_width):
+    if not width or not height:
+        return None, None
+    if width <= max_width:
+        return width, height
+    return max_width, round(height * max_width / width)
+
+
+def cloudinary_variant_url(url, max_width):
+    # Transformation à la volée : .../image/upload/<transfo>/v123/dossier/id.jpg
+    if "/upload/" not in url:
+        return url
+    head, tail = url.split("/upload/", 1)
+    return f"{head}/upload/c_limit,w_{max_width},q_auto,f_auto/{tail}"
+
+
+def _item(source, url_for_width, width=None, height=None, **extra):
+    variants = {}
+    for name, max_width in VARIANTS.items():
+        w, h = _scaled(width, height, max_width)
+        variants[name] = {"url": url_for_width(max_width), "width": w, "height": h}
+    return {"source": source, "width": width, "height": height, **extra, "variants": variants}
+
+
+def cloudinary_photo(upload_result):
+    url = upload_result["secure_url"]
+    return _item(
+        "cloudinary",
+        lambda w: cloudinary_variant_url(url, w),
+        upload_result.get("width"),
+        upload_result.get("height"),
+        public_id=upload_result.get("public_id"),
+    )
+
+
+# variants : {nom: {"url", "width", "height"}} produits par le traitement local (images.py)
+def local_photo(filename, url, width=None, height=None, variants=None, blob=None):
+    extra = {"filename": filename}
+    if blob:
+        extra["blob"] = blob  # empreinte dans le BlobStore (compteur de références)
+    item = _item("local", lambda w: url, width, height, **extra)
+    for name, variant in (variants or {}).items():
+        if name in item["variants"]:
+            item["variants"][name] = dict(variant)
+    return item
+
+
+def url_photo(url):
+    if "res.cloudinary.com" in url:
+        return _item("cloudinary", lambda w: cloudinary_variant_url(url, w))
+    return _item("url", lambda w: url)
+
+
+def build_manifest(items, cover=0, state="ready"):
+    return {"version": MANIFEST_VERSION, "state": state, "cover": cover, "items": items}
+
+
+def manifest_from_legacy(photos, local_url):
+    items = []
+    for f in photos or []:
+        if not f or not isinstance(f, str):
+            continue
+        if f.startswith("http"):
+            items.append(url_photo(f))
+        else:
+            items.append(local_photo(f, local_url(f)))
+    return build_manifest(items)
+
+
+def is_manifest(photos):
+    return isinstance(photos, dict) and photos.get("version") == MANIFEST_VERSION
+
+
+def normalize(photos, local_url):
+    if is_manifest(photos):
+        return photos
+    return manifest_from_legacy(photos if isinstance(photos, list) else [], local_url)
+
+
+def variant_urls(manifest, variant="thumb"):
+    items = manifest.get("items") or []
+    cover = manifest.get("cover") or 0
+    if 0 < cover < len(items):
+        items = [items[cover]] + items[:cover] + items[cover + 1:]
+    return [item["variants"][variant]["url"] for item in items]
+
+
+def variants(manifest, variant="full"):
+    return [dict(item["variants"][variant]) for item in manifest.get("items") or []]
+
+
+def blob_refs(photos):
+    if not is_manifest(photos):
+        return []
+    return [item["blob"] for item in photos.get("items") or [] if item.get("blob")]
@@ -0,0 +1,34 @@
+# backend/schema.py
+# Mise à jour idempotente du schéma : db.create_all() crée les tables
+# manquantes mais n'ajoute ni colonnes ni index aux tables existantes.
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateColumn
+
+# Fonctions (conn) -> None exécutées après la mise à jour (triggers, DDL spécifique au dialecte...)
+_upgrade_hooks = []
+
+
+def on_upgrade(fn):
+    _upgrade_hooks.append(fn)
+    return fn
+
+
+def upgrade_schema(db):
+    db.create_all()
+    engine = db.engine
+    inspector = inspect(engine)
+
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+                    print(f"🧱 Colonne ajoutée : {table.name}.{column.name}")
+
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+        for hook in _upgrade_hooks:
+            hook(conn)
@@ -0,0 +1,142 @@
+# backend/search.py
+# Recherche plein texte sur les articles.
+#   - PostgreSQL : colonne générée tsvector (titre, description, catégorie, ville) + index GIN
+#   - SQLite     : table virtuelle FTS5 synchronisée par triggers (tests, dev local)
+# Les moteurs ne renvoient que des ids classés ; le chargement des articles reste dans app.py.
+import re
+
+from sqlalchemy import bindparam, text
+
+from schema import on_upgrade
+
+MAX_TERMS = 8
+
+PG_DDL = [
+    """
+    ALTER TABLE articles ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(category, '') || ' ' || coalesce(city, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_articles_search ON articles USING GIN (search_vector)",
+]
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+        title, description, category, city,
+        content='articles', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_fts_ai AFTER INSERT ON articles BEGIN
+        INSERT INTO articles_fts(rowid, title, description, category, city)
+        VALUES (new.id, new.title, new.description, new.category, new.city);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_fts_ad AFTER DELETE ON articles BEGIN
+        INSERT INTO articles_fts(articles_fts, rowid, title, description, category, city)
+        VALUES ('delete', old.id, old.title, old.description, old.category, old.city);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_fts_au AFTER UPDATE ON articles BEGIN
+        INSERT INTO articles_fts(articles_fts, rowid, title, description, category, city)
+        VALUES ('delete', old.id, old.title, old.description, old.category, old.city);
+        INSERT INTO articles_fts(rowid, title, description, category, city)
+        VALUES (new.id, new.title, new.description, new.category, new.city);
+    END
+    """,
+]
+
+
+@on_upgrade
+def install_search(conn):
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        for ddl in PG_DDL:
+            conn.exec_driver_sql(ddl)
+    elif dialect == "sqlite":
+        exists = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE name = 'articles_fts'"
+        ).first()
+        for ddl in SQLITE_DDL:
+            conn.exec_driver_sql(ddl)
+        if not exists:
+            # Indexer les articles déjà présents
+            conn.exec_driver_sql("INSERT INTO articles_fts(articles_fts) VALUES ('rebuild')")
+
+
+def tokenize(q):
+    return re.findall(r"\w+", (q or "").lower())[:MAX_TERMS]
+
+
+def _filters_sql(filters, alias):
+    clauses = [f"{alias}.status IN :statuses"]
+    params = {"statuses": list(filters["statuses"])}
+    for field in ("category", "city"):
+        if filters.get(field):
+            clauses.append(f"{alias}.{field} = :{field}")
+            params[field] = filters[field]
+    return " AND ".join(clauses), params
+
+
+def _search_postgres(session, terms, filters, limit, offset):
+    # Préfixe sur chaque terme, tous obligatoires : "velo:* & rouge:*"
+    tsquery = " & ".join(f"{t}:*" for t in terms)
+    where, params = _filters_sql(filters, "a")
+    sql = text(f"""
+        SELECT a.id, ts_rank_cd(a.search_vector, q) AS rank
+        FROM articles a, to_tsquery('simple', :tsquery) q
+        WHERE a.search_vector @@ q AND {where}
+        ORDER BY rank DESC, a.id DESC
+        LIMIT :limit OFFSET :offset
+    """).bindparams(bindparam("statuses", expanding=True))
+    return session.execute(sql, {"tsquery": tsquery, "limit": limit, "offset": offset, **params}).all()
+
+
+def _search_sqlite(session, terms, filters, limit, offset):
+    match = " ".join(f'"{t}"*' for t in terms)
+    where, params = _filters_sql(filters, "a")
+    # bm25 : plus petit = plus pertinent ; poids titre > description > catégorie/ville
+    sql = text(f"""
+        SELECT a.id, -bm25(articles_fts, 10.0, 4.0, 2.0, 2.0) AS rank
+        FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid
+        WHERE articles_fts MATCH :match AND {where}
+        ORDER BY rank DESC, a.id DESC
+        LIMIT :limit OFFSET :offset
+    """).bindparams(bindparam("statuses", expanding=True))
+    return session.execute(sql, {"match": match, "limit": limit, "offset": offset, **params}).all()
+
+
+def _search_like(session, terms, filters, limit, offset):
+    # Repli pour les autres bases : pas d'index, pas de classement
+    where, params = _filters_sql(filters, "a")
+    for i, t in enumerate(terms):
+        where += f" AND lower(a.title || ' ' || coalesce(a.description, '') || ' ' || coalesce(a.category, '') || ' ' || coalesce(a.city, '')) LIKE :t{i}"
+        params[f"t{i}"] = f"%{t}%"
+    sql = text(f"""
+        SELECT a.id, 0 AS rank FROM articles a
+        WHERE {where}
+        ORDER BY a.id DESC
+        LIMIT :limit OFFSET :offset
+    """).bindparams(bindparam("statuses", expanding=True))
+    return session.execute(sql, {"limit": limit, "offset": offset, **params}).all()
+
+
+SEARCH_BACKENDS = {
+    "postgresql": _search_postgres,
+    "sqlite": _search_sqlite,
+}
+
+
+# [(id, rang)] des articles correspondant à `q`, du plus pertinent au moins pertinent
+def search_article_ids(session, q, filters, limit, offset=0):
+    terms = tokenize(q)
+    if not terms:
+        return []
+    backend = SEARCH_BACKENDS.get(session.get_bind().dialect.name, _search_like)
+    return backend(session, terms, filters, limit, offset)
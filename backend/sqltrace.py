@@ -0,0 +1,88 @@
+# backend/sqltrace.py
+# Instrumentation SQL par requête HTTP : nombre d'instructions, temps passé en base et
+# instructions répétées (même forme normalisée : littéraux et listes IN remplacés par "?").
+# Écoute before/after_cursor_execute sur toutes les Engine ; seules les instructions exécutées
+# pendant une trace ouverte (begin … end, dans le même greenlet / thread) sont comptées.
+# Garde N+1 : avec max_repeats > 0, la (max_repeats + 1)-ième exécution d'une même forme
+# lève RepeatedQueryError, ce qui fait échouer la requête (activé en mode test).
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMS = re.compile(r"%\(\w+\)s|%s|\$\d+|:\w+")
+_LISTS = re.compile(r"\?(?:\s*,\s*\?)+")
+_SPACES = re.compile(r"\s+")
+
+
+class RepeatedQueryError(RuntimeError):
+    pass
+
+
+@lru_cache(maxsize=2048)
+def normalize(statement):
+    shape = _STRINGS.sub("?", statement)
+    shape = _PARAMS.sub("?", shape)
+    shape = _NUMBERS.sub("?", shape)
+    shape = _LISTS.sub("?", shape)
+    return _SPACES.sub(" ", shape).strip()
+
+
+class QueryStats:
+    def __init__(self, max_repeats=0):
+        self.max_repeats = max_repeats
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    # Formes exécutées plus d'une fois, les plus fréquentes d'abord
+    def repeated(self):
+        return [(shape, n) for shape, n in self.shapes.most_common() if n > 1]
+
+
+_current = ContextVar("sql_trace", default=None)
+
+
+def begin(max_repeats=0):
+    stats = QueryStats(max_repeats)
+    _current.set(stats)
+    return stats
+
+
+# Ferme la trace en cours et la renvoie (None si aucune) ; appelable plusieurs fois
+def end():
+    stats = _current.get()
+    _current.set(None)
+    return stats
+
+
+def current():
+    return _current.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("sql_trace_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    starts = conn.info.get("sql_trace_start")
+    if stats is None or not starts:
+        return
+    stats.duration += time.perf_counter() - starts.pop()
+    stats.count += 1
+    shape = normalize(statement)
+    stats.shapes[shape] += 1
+    if stats.max_repeats and stats.shapes[shape] > stats.max_repeats:
+        raise RepeatedQueryError(
+            f"Requête exécutée {stats.shapes[shape]} fois (max {stats.max_repeats}), N+1 probable : {shape}"
+        )
@@ -0,0 +1,44 @@
+# backend/tests/conftest.py
+# Application importée une fois par session contre une base SQLite temporaire, en mode test
+# (garde N+1 de sqltrace active). Lancer depuis backend/ : python -m pytest -q tests
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+
+@pytest.fixture(scope="session")
+def izr(tmp_path_factory):
+    from common import load_app
+
+    os.environ.setdefault("BCRYPT_LOG_ROUNDS", "4")
+    module = load_app(f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}")
+    module.app.testing = True
+    return module
+
+
+@pytest.fixture
+def app_context(izr):
+    with izr.app.app_context():
+        yield
+        izr.db.session.rollback()
+
+
+@pytest.fixture
+def client(izr):
+    return izr.app.test_client()
+
+
+def make_user(izr, email, role="user"):
+    user = izr.User("Test", email.split("@")[0], email, None, "test-password")
+    user.role = role
+    izr.db.session.add(user)
+    return user
+
+
+def auth_header(izr, user):
+    token = izr.create_access_token(identity=str(user.id), additional_claims=izr.auth_claims(user))
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,40 @@
+# backend/tests/test_auth.py
+# Compte désactivé : connexion refusée et tokens existants rejetés par jwt_required,
+# y compris les tokens émis avant les claims (sans tv).
+import pytest
+
+from conftest import auth_header, make_user
+
+
+@pytest.fixture
+def accounts(izr, request):
+    with izr.app.app_context():
+        user = make_user(izr, f"{request.node.name}@auth.test")
+        admin = make_user(izr, f"admin-{request.node.name}@auth.test", role="admin")
+        izr.db.session.commit()
+        legacy = izr.create_access_token(identity=str(user.id))
+        return {
+            "id": user.id, "email": user.email, "user": auth_header(izr, user),
+            "legacy": {"Authorization": f"Bearer {legacy}"}, "admin": auth_header(izr, admin),
+        }
+
+
+def login(client, email):
+    return client.post("/api/login", json={"email": email, "password": "test-password"})
+
+
+def test_active_user_logs_in(client, accounts):
+    response = login(client, accounts["email"])
+    assert response.status_code == 200
+    token = response.get_json()["access_token"]
+    assert client.get("/api/conversations", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+    assert client.get("/api/conversations", headers=accounts["legacy"]).status_code == 200
+
+
+def test_deactivated_user_is_rejected(client, accounts):
+    response = client.put(f"/api/admin/user/{accounts['id']}/deactivate", headers=accounts["admin"])
+    assert response.status_code == 200
+
+    assert login(client, accounts["email"]).status_code == 403
+    assert client.get("/api/conversations", headers=accounts["user"]).status_code == 401
+    assert client.get("/api/conversations", headers=accounts["legacy"]).status_code == 401
@@ -0,0 +1,73 @@
+# backend/tests/test_blobs.py
+# Références des blobs locaux : un upload isolé (/upload) reste sans référence et part au GC ;
+# la suppression d'un article libère ses blobs et planifie leur GC.
+import io
+import threading
+
+import pytest
+
+from conftest import auth_header, make_user
+
+
+@pytest.fixture
+def store(izr, tmp_path, monkeypatch):
+    monkeypatch.setattr(izr.blob_store, "folder", str(tmp_path))
+    return izr.blob_store
+
+
+@pytest.fixture(scope="module")
+def users(izr):
+    with izr.app.app_context():
+        user = make_user(izr, "owner@blobs.test")
+        admin = make_user(izr, "admin@blobs.test", role="admin")
+        izr.db.session.commit()
+        return {"user": (user.id, auth_header(izr, user)), "admin": auth_header(izr, admin)}
+
+
+def upload(client, headers, payload):
+    return client.post("/upload", headers=headers, content_type="multipart/form-data",
+                       data={"photo": (io.BytesIO(payload), "photo.png")})
+
+
+def test_upload_requires_login(client, store):
+    assert upload(client, {}, b"\x89PNG anonyme").status_code == 401
+
+
+def test_unattached_upload_is_collected(izr, client, store, users):
+    response = upload(client, users["user"][1], b"\x89PNG isole")
+    assert response.status_code == 200
+    sha = response.get_json()["filename"].split("/")[1].split(".")[0]
+    assert store.exists(sha)
+    with izr.app.app_context():
+        assert izr.db.session.get(izr.UploadBlob, sha) is None
+        deleted, _ = izr.gc_blobs(grace=0)
+    assert sha in deleted
+    assert not store.exists(sha)
+
+
+def test_admin_delete_releases_and_schedules_gc(izr, client, store, users, monkeypatch):
+    collected, done = [], threading.Event()
+
+    def fake_gc(shas, grace=0):
+        collected.extend(shas)
+        done.set()
+        return [], 0
+    monkeypatch.setattr(izr, "gc_blobs", fake_gc)
+
+    sha = "ab" * 32
+    with izr.app.app_context():
+        photo = izr.photo_manifest.local_photo(f"ab/{sha}.webp", "/media/x.webp", 1, 1, {}, blob=sha)
+        article = izr.Article(user_id=users["user"][0], title="Photo", price=1, status="approved",
+                              photos=izr.photo_manifest.build_manifest([photo]))
+        izr.db.session.add(article)
+        izr.db.session.flush()
+        izr.retain_blobs([sha])
+        izr.db.session.commit()
+        article_id = article.id
+
+    response = client.delete(f"/api/admin/article/{article_id}/delete", headers=users["admin"])
+    assert response.status_code == 200
+    assert done.wait(5)
+    assert collected == [sha]
+    with izr.app.app_context():
+        assert izr.db.session.get(izr.UploadBlob, sha).refcount == 0
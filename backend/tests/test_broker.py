@@ -0,0 +1,114 @@
+# backend/tests/test_broker.py
+# Diffusion Socket.IO entre deux workers via le broker local (SOCKETIO_MESSAGE_QUEUE=local://...).
+# Deux processus de l'application partagent une base SQLite et un LocalHub ; un message envoyé
+# à l'un doit arriver à un client connecté à l'autre.
+# Le module sert aussi de point d'entrée des workers : python tests/test_broker.py <port> [--seed]
+import os
+import subprocess
+import sys
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "broker-password"
+USERS = ("alice@broker.local", "bob@broker.local")
+
+
+def serve(port, seed):
+    from gevent import monkey
+    monkey.patch_all()
+    sys.path.insert(0, BACKEND_DIR)
+    import app as izr
+
+    with izr.app.app_context():
+        izr.upgrade_schema(izr.db)
+        if seed:
+            for email in USERS:
+                izr.db.session.add(izr.User("Broker", email.split("@")[0], email, None, PASSWORD))
+            izr.db.session.commit()
+    print("ready", flush=True)
+    izr.socketio.run(izr.app, host="127.0.0.1", port=port, log_output=False)
+
+
+def start_worker(env, seed=False):
+    sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+    import requests
+    from common import free_port
+
+    port = free_port()
+    args = [sys.executable, os.path.abspath(__file__), str(port)] + (["--seed"] if seed else [])
+    proc = subprocess.Popen(args, env=env, cwd=BACKEND_DIR, stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, text=True)
+    for line in proc.stdout:
+        if line.strip() == "ready":
+            break
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(base + "/login", timeout=1)
+            return proc, base
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("worker injoignable")
+
+
+def login(base, email):
+    import requests
+    response = requests.post(base + "/api/login", json={"email": email, "password": PASSWORD})
+    return response.json()["access_token"]
+
+
+def test_message_crosses_workers(tmp_path):
+    import socketio
+    sys.path.insert(0, BACKEND_DIR)
+    from broker import LocalHub
+
+    hub = LocalHub(("127.0.0.1", 0))
+    threading.Thread(target=hub.serve_forever, daemon=True).start()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp_path / 'broker.db'}",
+        SOCKETIO_MESSAGE_QUEUE=f"local://127.0.0.1:{hub.server_address[1]}",
+        BCRYPT_LOG_ROUNDS="4",
+    )
+    workers, clients = [], []
+    try:
+        workers.append(start_worker(env, seed=True))
+        workers.append(start_worker(env))
+        (_, base_a), (_, base_b) = workers
+
+        received = threading.Event()
+        messages = []
+
+        def on_message(msg):
+            messages.append(msg)
+            received.set()
+
+        bob = socketio.Client()
+        bob.on("receive_message", on_message)
+        bob.connect(base_b, auth={"token": login(base_b, USERS[1])})
+        clients.append(bob)
+        bob.emit("join", {"peer_id": 1})
+
+        alice = socketio.Client()
+        alice.connect(base_a, auth={"token": login(base_a, USERS[0])})
+        clients.append(alice)
+        time.sleep(0.5)  # le join de bob est traité par le worker B
+
+        alice.emit("send_message", {"receiver_id": 2, "content": "bonjour via le broker"})
+        assert received.wait(10), "message non reçu sur le second worker"
+        assert messages[0]["content"] == "bonjour via le broker"
+        assert messages[0]["sender_id"] == 1
+    finally:
+        for client in clients:
+            client.disconnect()
+        for proc, _ in workers:
+            proc.terminate()
+            proc.wait()
+        hub.shutdown()
+        hub.server_close()
+
+
+if __name__ == "__main__":
+    serve(int(sys.argv[1]), "--seed" in sys.argv)
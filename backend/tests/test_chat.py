@@ -0,0 +1,123 @@
+# backend/tests/test_chat.py
+# Conversations par (paire d'utilisateurs, article) : résumé mis à jour à chaque message, compteurs
+# de non-lus, et lecture limitée à la conversation ouverte.
+import pytest
+
+from conftest import auth_header, make_user
+
+
+@pytest.fixture
+def pair(izr, request):
+    with izr.app.app_context():
+        tag = request.node.name.replace("[", "_").replace("]", "")
+        buyer = make_user(izr, f"buyer-{tag}@chat.test")
+        seller = make_user(izr, f"seller-{tag}@chat.test")
+        izr.db.session.flush()
+        articles = [izr.Article(user_id=seller.id, title=f"Chat {i}", price=1, status="approved") for i in range(2)]
+        izr.db.session.add_all(articles)
+        izr.db.session.commit()
+        return {
+            "buyer": (buyer.id, auth_header(izr, buyer)),
+            "seller": (seller.id, auth_header(izr, seller)),
+            "articles": [a.id for a in articles],
+        }
+
+
+def send(client, sender, receiver_id, article_id, content):
+    response = client.post("/api/messages", headers=sender[1],
+                           json={"receiver_id": receiver_id, "article_id": article_id, "content": content})
+    assert response.status_code == 201
+    return response.get_json()
+
+
+def conversations(client, user):
+    rows = client.get("/api/conversations", headers=user[1]).get_json()
+    return {c["article_id"]: c for c in rows}
+
+
+def unread(client, user):
+    return client.get("/api/unread_count", headers=user[1]).get_json()["count"]
+
+
+def test_conversation_summary_and_unread_counters(client, pair):
+    buyer, seller = pair["buyer"], pair["seller"]
+    first, second = pair["articles"]
+    send(client, buyer, seller[0], first, "Toujours disponible ?")
+    send(client, seller, buyer[0], first, "Oui")
+    send(client, seller, buyer[0], first, "Livraison possible")
+    send(client, seller, buyer[0], second, "Autre article")
+
+    convs = conversations(client, buyer)
+    assert set(convs) == {first, second}
+    assert convs[first]["last_message"] == "Livraison possible"
+    assert convs[first]["unread"] == 2
+    assert convs[second]["unread"] == 1
+    assert conversations(client, seller)[first]["unread"] == 1
+    assert unread(client, buyer) == 3
+
+
+def test_reading_one_article_keeps_the_other_unread(client, pair):
+    buyer, seller = pair["buyer"], pair["seller"]
+    first, second = pair["articles"]
+    for i in range(2):
+        send(client, seller, buyer[0], first, f"premier {i}")
+    for i in range(3):
+        send(client, seller, buyer[0], second, f"second {i}")
+
+    page = client.get(f"/api/messages/{seller[0]}?article_id={first}", headers=buyer[1]).get_json()
+    assert [m["content"] for m in page["items"]] == ["premier 0", "premier 1"]
+
+    convs = conversations(client, buyer)
+    assert convs[first]["unread"] == 0
+    assert convs[second]["unread"] == 3
+    assert unread(client, buyer) == 3
+
+    marked = client.post(f"/api/mark_read/{seller[0]}?article_id={second}", headers=buyer[1]).get_json()
+    assert len(marked["ids"]) == 3
+    assert conversations(client, buyer)[second]["unread"] == 0
+    assert unread(client, buyer) == 0
+
+
+def test_conversations_ordered_by_last_message_with_sparse_fields(client, pair):
+    buyer, seller = pair["buyer"], pair["seller"]
+    first, second = pair["articles"]
+    send(client, buyer, seller[0], second, "Ancien")
+    send(client, buyer, seller[0], first, "Récent")
+
+    rows = client.get("/api/conversations?fields=article_id,last_message", headers=seller[1]).get_json()
+    assert rows == [{"article_id": first, "last_message": "Récent"},
+                    {"article_id": second, "last_message": "Ancien"}]
+
+
+def test_backfill_rebuilds_the_maintained_summaries(izr, client, pair):
+    buyer, seller = pair["buyer"], pair["seller"]
+    first, second = pair["articles"]
+    send(client, buyer, seller[0], first, "Bonjour")
+    send(client, seller, buyer[0], first, "Bonjour à vous")
+    send(client, seller, buyer[0], second, "Et celui-ci ?")
+    client.post(f"/api/mark_read/{buyer[0]}?article_id={first}", headers=seller[1])
+
+    maintained = [conversations(client, user) for user in (buyer, seller)]
+    result = izr.app.test_cli_runner().invoke(args=["backfill-conversations"])
+    assert result.exit_code == 0
+    assert [conversations(client, user) for user in (buyer, seller)] == maintained
+
+
+def test_unread_counter_and_receipts_are_pushed(izr, client, pair, monkeypatch):
+    buyer, seller = pair["buyer"], pair["seller"]
+    first, _ = pair["articles"]
+    pushed = []
+    monkeypatch.setattr(izr.socketio, "emit", lambda event, payload, room=None, **kw: pushed.append((event, room, payload)))
+
+    ids = [send(client, seller, buyer[0], first, f"message {i}")["id"] for i in range(2)]
+    counts = [p["count"] for event, room, p in pushed if event == "unread_count" and room == izr.user_room(buyer[0])]
+    assert counts == [1, 2]
+
+    pushed.clear()
+    client.post(f"/api/mark_read/{seller[0]}?article_id={first}", headers=buyer[1])
+    assert ("messages_read", izr.user_room(seller[0]), {"reader_id": buyer[0], "ids": ids}) in pushed
+    assert ("unread_count", izr.user_room(buyer[0]), {"count": 0}) in pushed
+
+    pushed.clear()
+    client.post(f"/api/mark_read/{seller[0]}?article_id={first}", headers=buyer[1])
+    assert pushed == []  # rien à marquer : ni accusé ni compteur
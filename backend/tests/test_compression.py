@@ -0,0 +1,68 @@
+# backend/tests/test_compression.py
+# Réponses JSON : br de préférence, sinon gzip, selon Accept-Encoding ; ETag affaibli mais 304
+# toujours possible ; petites réponses non compressées. Champs partiels avec ?fields=.
+import gzip
+import json
+
+import pytest
+
+import compression
+from conftest import auth_header, make_user
+
+
+@pytest.fixture(scope="module")
+def catalog(izr):
+    with izr.app.app_context():
+        seller = make_user(izr, "seller@compression.test")
+        izr.db.session.flush()
+        article = izr.Article(user_id=seller.id, title="Fiche volumineuse", price=3, status="approved",
+                              description="Description détaillée. " * 200)
+        izr.db.session.add(article)
+        izr.db.session.commit()
+        return {"headers": auth_header(izr, seller), "article": article.id}
+
+
+def detail(client, catalog, encoding, **headers):
+    return client.get(f"/api/articles/{catalog['article']}", headers={"Accept-Encoding": encoding, **headers})
+
+
+def decode(response):
+    encoding = response.headers.get("Content-Encoding")
+    if encoding == "br":
+        return json.loads(compression.brotli.decompress(response.data))
+    if encoding == "gzip":
+        return json.loads(gzip.decompress(response.data))
+    return response.get_json()
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("br, gzip", "br"),
+    ("gzip, deflate", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("identity", None),
+])
+def test_negotiation(client, catalog, accept, expected):
+    if expected == "br" and not compression.BROTLI_AVAILABLE:
+        pytest.skip("paquet Brotli absent")
+    response = detail(client, catalog, accept)
+    assert response.headers.get("Content-Encoding") == expected
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert decode(response)["name"] == "Fiche volumineuse"
+
+
+def test_compressed_etag_is_weak_and_revalidates(client, catalog):
+    first = detail(client, catalog, "gzip")
+    assert first.headers["ETag"].startswith('W/"')
+    assert detail(client, catalog, "gzip", **{"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+
+def test_small_responses_are_not_compressed(client, catalog):
+    response = client.get("/api/articles?limit=1&fields=id", headers={**catalog["headers"], "Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+
+
+def test_sparse_fieldsets(client, catalog):
+    body = client.get("/api/articles?limit=3&fields=id,title", headers=catalog["headers"]).get_json()
+    assert body["items"] and all(set(item) == {"id", "title"} for item in body["items"])
+    response = client.get("/api/articles?fields=id,secret", headers=catalog["headers"])
+    assert response.status_code == 400
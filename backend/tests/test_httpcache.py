@@ -0,0 +1,58 @@
+# backend/tests/test_httpcache.py
+# Fiche article publique : ETag fort et 304 sur If-None-Match sans requête SQL, puis nouvelle
+# empreinte dès que l'article ou le nom de son vendeur change.
+import pytest
+
+from conftest import make_user
+
+
+@pytest.fixture
+def article(izr, request):
+    with izr.app.app_context():
+        seller = make_user(izr, f"{request.node.name}@httpcache.test")
+        izr.db.session.flush()
+        article = izr.Article(user_id=seller.id, title="Fiche en cache", price=5, status="approved")
+        izr.db.session.add(article)
+        izr.db.session.commit()
+        return {"id": article.id, "seller": seller.id}
+
+
+def fetch(client, article, etag=None):
+    headers = {"If-None-Match": etag} if etag else {}
+    return client.get(f"/api/articles/{article['id']}", headers=headers)
+
+
+def test_conditional_get_answers_304_without_sql(client, article):
+    first = fetch(client, article)
+    assert first.status_code == 200
+    assert first.headers["ETag"]
+    assert "s-maxage" in first.headers["Cache-Control"]
+    assert "public" in first.headers["Cache-Control"]
+
+    revalidated = fetch(client, article, first.headers["ETag"])
+    assert revalidated.status_code == 304
+    assert revalidated.data == b""
+    assert 'desc="0 req"' in revalidated.headers["Server-Timing"]
+
+
+def test_article_update_changes_etag(izr, client, article):
+    etag = fetch(client, article).headers["ETag"]
+    with izr.app.app_context():
+        izr.db.session.get(izr.Article, article["id"]).title = "Fiche modifiée"
+        izr.db.session.commit()
+
+    response = fetch(client, article, etag)
+    assert response.status_code == 200
+    assert response.get_json()["name"] == "Fiche modifiée"
+    assert response.headers["ETag"] != etag
+
+
+def test_vendor_rename_changes_etag(izr, client, article):
+    etag = fetch(client, article).headers["ETag"]
+    with izr.app.app_context():
+        izr.db.session.get(izr.User, article["seller"]).first_name = "Renommé"
+        izr.db.session.commit()
+
+    response = fetch(client, article, etag)
+    assert response.status_code == 200
+    assert response.get_json()["vendor"]["name"].startswith("Renommé")
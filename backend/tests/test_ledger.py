@@ -0,0 +1,58 @@
+# backend/tests/test_ledger.py
+# Grand livre : une cotisation n'est créditée qu'une fois, quelle que soit la route de validation
+# (en masse, unitaire, rejouée), et users.balance reste la somme des écritures.
+import pytest
+
+from conftest import auth_header, make_user
+
+
+@pytest.fixture
+def member(izr, request):
+    with izr.app.app_context():
+        admin = make_user(izr, f"admin-{request.node.name}@ledger.test", role="admin")
+        user = make_user(izr, f"{request.node.name}@ledger.test")
+        izr.db.session.flush()
+        cotisations = [izr.Cotisation(user_id=user.id, montant_envoye=m, montant_recu=m, statut="en_attente")
+                       for m in (10, 20, 30)]
+        izr.db.session.add_all(cotisations)
+        izr.db.session.commit()
+        return {"id": user.id, "admin": auth_header(izr, admin), "cotisations": [c.id for c in cotisations]}
+
+
+def balance(izr, user_id):
+    with izr.app.app_context():
+        user = izr.db.session.get(izr.User, user_id)
+        entries = izr.LedgerEntry.query.filter_by(user_id=user_id).all()
+        assert user.balance == sum(e.amount for e in entries)
+        return user.balance
+
+
+def bulk_validate(client, member, ids):
+    response = client.post("/api/admin/cotisations/bulk", headers=member["admin"],
+                           json={"action": "validate", "ids": ids})
+    assert response.status_code == 200
+    return {item["id"]: item["result"] for item in response.get_json()["results"]}
+
+
+def test_bulk_validate_credits_once(izr, client, member):
+    first, second, third = member["cotisations"]
+    assert bulk_validate(client, member, [first, second]) == {first: "validated", second: "validated"}
+    assert balance(izr, member["id"]) == 30
+
+    missing = max(member["cotisations"]) + 10_000
+    results = bulk_validate(client, member, [first, second, third, missing])
+    assert results == {first: "unchanged", second: "unchanged", third: "validated", missing: "not_found"}
+    assert balance(izr, member["id"]) == 60
+
+
+def test_validation_routes_share_the_ledger_ref(izr, client, member):
+    first, second, _ = member["cotisations"]
+    assert client.post(f"/api/admin/cotisation/{first}/validate", headers=member["admin"]).status_code == 200
+    assert client.post(f"/api/admin/cotisation/{first}/validate", headers=member["admin"]).status_code == 200
+    assert bulk_validate(client, member, [first, second]) == {first: "unchanged", second: "validated"}
+    assert balance(izr, member["id"]) == 30
+
+    # Rejetée puis revalidée : le crédit déjà passé n'est pas rejoué
+    client.post("/api/admin/cotisations/bulk", headers=member["admin"], json={"action": "reject", "ids": [first]})
+    assert bulk_validate(client, member, [first]) == {first: "validated"}
+    assert balance(izr, member["id"]) == 30
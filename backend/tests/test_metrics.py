@@ -0,0 +1,30 @@
+# backend/tests/test_metrics.py
+# Agrégation multi-workers : l'instantané d'un worker arrêté est reporté dans retired.json
+# (compteurs, histogrammes) puis supprimé ; /metrics garde les totaux, pas ses jauges.
+from metrics import MetricsExporter, Registry, mark_process_dead
+
+DEAD_PID = 2 ** 22 + 1  # au-delà de pid_max par défaut : aucun processus vivant
+
+
+def worker_registry(requests, clients):
+    registry = Registry()
+    registry.counter("requests_total", "Requêtes").inc(amount=requests)
+    registry.gauge("clients", "Clients").inc(amount=clients)
+    registry.histogram("latency_seconds", "Latence").observe(0.02)
+    return registry
+
+
+def test_dead_workers_are_folded_into_retired(tmp_path, monkeypatch):
+    for requests in (3, 4):
+        monkeypatch.setattr("os.getpid", lambda: DEAD_PID)
+        MetricsExporter(worker_registry(requests, 5), str(tmp_path)).publish()
+        monkeypatch.undo()
+        mark_process_dead(DEAD_PID, str(tmp_path))
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["retired.json"]
+
+    live = MetricsExporter(worker_registry(1, 2), str(tmp_path))
+    text = live.collect()
+    assert "requests_total 8" in text
+    assert "clients 2" in text
+    assert "latency_seconds_count 3" in text
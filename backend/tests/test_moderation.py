@@ -0,0 +1,53 @@
+# backend/tests/test_moderation.py
+# Modération en masse : une transaction pour la liste, un résultat par id (not_found compris),
+# validation des paramètres et accès réservé aux administrateurs.
+import pytest
+
+from conftest import auth_header, make_user
+
+
+@pytest.fixture
+def moderation(izr, request):
+    with izr.app.app_context():
+        admin = make_user(izr, f"admin-{request.node.name}@moderation.test", role="admin")
+        seller = make_user(izr, f"{request.node.name}@moderation.test")
+        izr.db.session.flush()
+        articles = [izr.Article(user_id=seller.id, title=f"Modération {i}", price=1, status="pending") for i in range(3)]
+        izr.db.session.add_all(articles)
+        izr.db.session.commit()
+        return {"admin": auth_header(izr, admin), "seller": auth_header(izr, seller), "ids": [a.id for a in articles]}
+
+
+def bulk(client, headers, action, ids):
+    return client.post("/api/admin/articles/bulk", headers=headers, json={"action": action, "ids": ids})
+
+
+def statuses(izr, ids):
+    with izr.app.app_context():
+        return {a.id: a.status for a in izr.Article.query.filter(izr.Article.id.in_(ids))}
+
+
+def test_admin_only_and_validated_input(client, moderation):
+    ids = moderation["ids"]
+    assert bulk(client, moderation["seller"], "approve", ids).status_code == 403
+    assert bulk(client, moderation["admin"], "approve", []).status_code == 400
+    assert bulk(client, moderation["admin"], "approve", ["x"]).status_code == 400
+    assert bulk(client, moderation["admin"], "approve", list(range(1, 502))).status_code == 400
+    assert bulk(client, moderation["admin"], "publish", ids).status_code == 400
+
+
+def test_results_per_id(izr, client, moderation):
+    first, second, third = moderation["ids"]
+    missing = third + 10_000
+
+    body = bulk(client, moderation["admin"], "approve", [first, second, first, missing]).get_json()
+    assert body["results"] == [{"id": first, "result": "approved"}, {"id": second, "result": "approved"},
+                               {"id": missing, "result": "not_found"}]
+    assert body["counts"] == {"approved": 2, "not_found": 1}
+
+    bulk(client, moderation["admin"], "reject", [second])
+    assert statuses(izr, moderation["ids"]) == {first: "approved", second: "rejected", third: "pending"}
+
+    body = bulk(client, moderation["admin"], "delete", [third, missing]).get_json()
+    assert body["counts"] == {"deleted": 1, "not_found": 1}
+    assert third not in statuses(izr, moderation["ids"])
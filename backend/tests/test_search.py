@@ -0,0 +1,67 @@
+# backend/tests/test_search.py
+# /api/search sur les deux moteurs disponibles ici : FTS5 (SQLite) et le repli LIKE des autres
+# bases. Tous les termes sont requis, préfixes acceptés, seuls les articles publiés sortent.
+import pytest
+
+import search
+from conftest import auth_header, make_user
+
+
+@pytest.fixture(scope="module")
+def catalog(izr):
+    with izr.app.app_context():
+        seller = make_user(izr, "seller@search.test")
+        izr.db.session.flush()
+        rows = {
+            "title": ("Vélo zorglub rouge", "Cadre acier", "approved", "Moscou"),
+            "description": ("Cadre de course", "zorglub rouge très léger", "validated", "Kazan"),
+            "other_city": ("Casque zorglub", "Bleu", "approved", "Kazan"),
+            "pending": ("Zorglub rouge en attente", "", "pending", "Moscou"),
+        }
+        articles = {}
+        for key, (title, description, status, city) in rows.items():
+            articles[key] = izr.Article(user_id=seller.id, title=title, description=description,
+                                        status=status, city=city, price=10)
+            izr.db.session.add(articles[key])
+        izr.db.session.commit()
+        return {"headers": auth_header(izr, seller), **{k: a.id for k, a in articles.items()}}
+
+
+@pytest.fixture(params=["sqlite", "like"])
+def backend(request, monkeypatch):
+    if request.param == "like":
+        monkeypatch.delitem(search.SEARCH_BACKENDS, "sqlite")
+    return request.param
+
+
+def found(client, catalog, **params):
+    response = client.get("/api/search", headers=catalog["headers"], query_string=params)
+    assert response.status_code == 200
+    return [item["id"] for item in response.get_json()["items"]]
+
+
+def test_query_is_required(client, catalog):
+    assert client.get("/api/search?q=", headers=catalog["headers"]).status_code == 400
+
+
+def test_all_terms_required_and_pending_hidden(client, catalog, backend):
+    ids = found(client, catalog, q="zorglub rouge")
+    assert sorted(ids) == sorted([catalog["title"], catalog["description"]])
+
+
+def test_prefix_and_city_filter(client, catalog, backend):
+    assert set(found(client, catalog, q="zorgl")) == {catalog["title"], catalog["description"], catalog["other_city"]}
+    assert set(found(client, catalog, q="zorglub", city="Kazan")) == {catalog["description"], catalog["other_city"]}
+
+
+def test_title_match_ranks_first(client, catalog):
+    assert found(client, catalog, q="zorglub rouge")[0] == catalog["title"]
+
+
+def test_index_follows_updates(izr, client, catalog):
+    with izr.app.app_context():
+        article = izr.db.session.get(izr.Article, catalog["other_city"])
+        article.title = "Casque grumpf"
+        izr.db.session.commit()
+    assert found(client, catalog, q="grumpf") == [catalog["other_city"]]
+    assert catalog["other_city"] not in found(client, catalog, q="zorglub")
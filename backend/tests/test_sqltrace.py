@@ -0,0 +1,73 @@
+# backend/tests/test_sqltrace.py
+# Garde N+1 : une même instruction exécutée plus de max_repeats fois dans une trace lève
+# RepeatedQueryError ; les routes en mode test tournent sous SQL_TEST_MAX_REPEATS.
+import pytest
+from sqlalchemy.orm import joinedload
+
+import sqltrace
+from conftest import auth_header, make_user
+
+SELLERS = 15  # plus que SQL_TEST_MAX_REPEATS : un chargement paresseux par article serait refusé
+
+
+@pytest.fixture(scope="module")
+def catalog(izr):
+    with izr.app.app_context():
+        admin = make_user(izr, "admin@sqltrace.test", role="admin")
+        for i in range(SELLERS):
+            seller = make_user(izr, f"seller{i}@sqltrace.test")
+            izr.db.session.flush()
+            izr.db.session.add(izr.Article(user_id=seller.id, title=f"Article {i}", price=10 + i, status="approved"))
+        izr.db.session.commit()
+        return auth_header(izr, admin)
+
+
+def test_lazy_loads_per_row_are_rejected(izr, catalog, app_context):
+    sqltrace.begin(max_repeats=3)
+    try:
+        with pytest.raises(sqltrace.RepeatedQueryError):
+            for article in izr.Article.query.filter(izr.Article.title.like("Article %")).all():
+                article.user.first_name
+    finally:
+        sqltrace.end()
+
+
+def test_joined_load_passes(izr, catalog, app_context):
+    stats = sqltrace.begin(max_repeats=3)
+    try:
+        articles = izr.Article.query.options(joinedload(izr.Article.user)) \
+            .filter(izr.Article.title.like("Article %")).all()
+        assert all(a.user.first_name for a in articles)
+    finally:
+        sqltrace.end()
+    assert stats.count == 1
+
+
+def test_all_articles_has_no_n_plus_one(izr, client, catalog):
+    with izr.app.app_context():
+        total = izr.Article.query.count()
+    response = client.get(f"/api/all-articles?limit={total}", headers=catalog)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert len(body["articles"]) == total
+    assert body["has_more"] is False
+
+    seen, page = [], 1
+    while True:
+        body = client.get(f"/api/all-articles?limit=5&page={page}", headers=catalog).get_json()
+        seen.extend(a["id"] for a in body["articles"])
+        if not body["has_more"]:
+            break
+        page += 1
+    assert seen == sorted(set(seen), reverse=True)
+    assert len(seen) == total
+
+
+def test_server_timing_only_in_debug_or_test(izr, client, catalog, monkeypatch):
+    assert "db;dur=" in client.get("/api/articles", headers=catalog).headers["Server-Timing"]
+
+    monkeypatch.setattr(izr.app, "testing", False)
+    assert "Server-Timing" not in client.get("/api/articles", headers=catalog).headers
+
+    monkeypatch.setattr(izr, "SQL_TRACE", "True")
+    assert "Server-Timing" in client.get("/api/articles", headers=catalog).headers
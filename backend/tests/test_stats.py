@@ -0,0 +1,64 @@
+# backend/tests/test_stats.py
+# Statistiques admin : mêmes chiffres en direct et depuis les agrégats journaliers, et
+# invalidation des deux jours quand une cotisation change de date.
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import auth_header, make_user
+
+DAYS_AGO = 40  # jour clos propre à ce module (les autres tests n'écrivent qu'aujourd'hui)
+
+
+@pytest.fixture(scope="module")
+def closed_day(izr):
+    day = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=DAYS_AGO)
+    with izr.app.app_context():
+        admin = make_user(izr, "admin@stats.test", role="admin")
+        member = make_user(izr, "member@stats.test")
+        izr.db.session.flush()
+        izr.db.session.add_all([
+            izr.Cotisation(user_id=member.id, montant_envoye=100, montant_recu=90, statut="valide", date_cotisation=day),
+            izr.Cotisation(user_id=member.id, montant_envoye=50, montant_recu=45, statut="en_attente", date_cotisation=day),
+        ])
+        izr.db.session.commit()
+        return {"headers": auth_header(izr, admin), "day": day}
+
+
+@pytest.fixture(autouse=True)
+def no_background_refresh(izr, monkeypatch):
+    monkeypatch.setattr(izr, "schedule_stats_refresh", lambda app: None)
+
+
+def series(client, closed_day, day):
+    body = client.get(f"/api/admin/stats?from={day.date()}&to={day.date()}", headers=closed_day["headers"]).get_json()
+    return body["series"]
+
+
+def refresh(izr):
+    with izr.app.app_context():
+        izr.refresh_stats_rollups()
+        assert izr.missing_rollup_days() == []
+
+
+def test_rollups_match_live_figures(izr, client, closed_day):
+    live = series(client, closed_day, closed_day["day"])
+    assert live[0]["deposits_count"] == 2
+    assert live[0]["deposits_received"] == 135
+
+    refresh(izr)
+    assert series(client, closed_day, closed_day["day"]) == live
+
+
+def test_date_change_invalidates_both_days(izr, client, closed_day):
+    refresh(izr)
+    moved_to = closed_day["day"] - timedelta(days=1)
+    with izr.app.app_context():
+        cotisation = izr.Cotisation.query.filter_by(date_cotisation=closed_day["day"], statut="en_attente").first()
+        cotisation.date_cotisation = moved_to
+        izr.db.session.commit()
+        assert set(izr.missing_rollup_days()) == {closed_day["day"].date(), moved_to.date()}
+
+    refresh(izr)
+    assert series(client, closed_day, closed_day["day"])[0]["deposits_count"] == 1
+    assert series(client, closed_day, moved_to)[0]["deposits_received"] == 45
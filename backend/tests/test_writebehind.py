@@ -0,0 +1,70 @@
+# backend/tests/test_writebehind.py
+# File d'écriture différée du chat : lot remis en file sur échec, file bornée, et historique qui
+# lit les messages en attente sans forcer l'écriture du lot.
+import time
+import uuid
+from datetime import datetime
+
+import pytest
+
+from conftest import auth_header, make_user
+from writebehind import WriteBehindQueue
+
+
+def test_failed_batch_is_requeued_and_queue_is_bounded():
+    state, written = {"down": True}, []
+
+    def flush(batch):
+        if state["down"]:
+            raise RuntimeError("base indisponible")
+        written.extend(batch)
+
+    queue = WriteBehindQueue(flush, max_batch=3, interval=0.01, max_pending=5, max_backoff=0.05, name="test")
+    try:
+        assert [queue.put(i) for i in range(7)] == [True] * 5 + [False] * 2
+        time.sleep(0.2)
+        assert queue.pending() == 5 and not written
+
+        state["down"] = False
+        deadline = time.time() + 5
+        while queue.pending() and time.time() < deadline:
+            time.sleep(0.02)
+        assert written == [0, 1, 2, 3, 4]
+    finally:
+        queue.close()
+
+
+@pytest.fixture
+def held_writer(izr, monkeypatch):
+    # File qui n'écrit jamais pendant le test (intervalle très long)
+    flushed = []
+    queue = WriteBehindQueue(flushed.extend, interval=3600, name="test-chat")
+    monkeypatch.setitem(izr.app.extensions, "chat_writer", queue)
+    yield queue, flushed
+    queue._closed = True
+
+
+def test_history_includes_pending_messages_without_flushing(izr, client, held_writer):
+    queue, flushed = held_writer
+    with izr.app.app_context():
+        alice = make_user(izr, "alice@writebehind.test")
+        bob = make_user(izr, "bob@writebehind.test")
+        izr.db.session.flush()
+        izr.db.session.add(izr.Message(sender_id=bob.id, receiver_id=alice.id, content="en base"))
+        izr.db.session.commit()
+        alice_id, bob_id, headers = alice.id, bob.id, auth_header(izr, alice)
+
+    uid = str(uuid.uuid4())
+    queue.put({"uid": uid, "sender_id": bob_id, "receiver_id": alice_id, "article_id": None,
+               "content": "en file", "timestamp": datetime.utcnow(), "read": False})
+    queue.put({"uid": str(uuid.uuid4()), "sender_id": bob_id, "receiver_id": alice_id, "article_id": 99,
+               "content": "autre conversation", "timestamp": datetime.utcnow(), "read": False})
+
+    page = client.get(f"/api/messages/{bob_id}", headers=headers).get_json()
+    assert [m["content"] for m in page["items"]] == ["en base", "en file"]
+    assert page["items"][1]["uid"] == uid and page["items"][1]["id"] is None
+    assert page["newest_id"] == page["items"][0]["id"]
+    assert queue.pending() == 2 and not flushed
+
+    page = client.get(f"/api/messages/{bob_id}?after={page['newest_id']}", headers=headers).get_json()
+    assert [m["uid"] for m in page["items"]] == [uid]
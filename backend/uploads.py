@@ -0,0 +1,139 @@
+# backend/uploads.py
+# Pipeline d'upload des photos en arrière-plan.
+# La requête /api/sell copie les fichiers reçus dans des fichiers temporaires (rapide, disque local),
+# crée l'article puis confie les uploads à un pool borné : envois concurrents, timeout, reprises,
+# repli éventuel sur un autre uploader. Quand toutes les photos d'un lot sont traitées,
+# le callback `on_done` reçoit les résultats dans l'ordre d'origine.
+#
+# Sous gevent (serveur Socket.IO), le pool n'est coopératif que si le worker est monkey-patché :
+# les threads du pool deviennent alors des greenlets.
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+CHUNK_SIZE = 64 * 1024
+
+# Fichier reçu, copié sur disque ; sha256 calculé pendant la copie
+Spooled = namedtuple("Spooled", "path filename sha256 size")
+
+
+class CloudinaryUploader:
+    name = "cloudinary"
+
+    def __init__(self, timeout=30):
+        self.timeout = timeout
+
+    def upload(self, item):
+        import cloudinary.uploader
+
+        result = cloudinary.uploader.upload(
+            item.path,
+            folder="izrussia/articles",
+            quality="auto:good",
+            width=800,
+            crop="limit",
+            timeout=self.timeout,
+        )
+        return "cloudinary", result
+
+
+# Remplaçant sur disque de Cloudinary (repli en production, uploader par défaut en tests).
+# Les fichiers vont dans le BlobStore : un contenu déjà reçu n'est ni retraité ni recopié.
+class LocalUploader:
+    name = "local"
+
+    def __init__(self, store):
+        self.store = store
+
+    def upload(self, item):
+        return "local", self.store.put(item.path, item.filename, item.sha256)
+
+
+UPLOADERS = {
+    "cloudinary": CloudinaryUploader,
+    "local": LocalUploader,
+}
+
+
+# Copie un FileStorage dans un fichier temporaire (le flux de la requête n'est plus valide
+# après la réponse) en calculant son empreinte au passage, sans relire le fichier
+def spool(file_storage):
+    suffix = os.path.splitext(file_storage.filename or "")[1]
+    fd, path = tempfile.mkstemp(prefix="izr_upload_", suffix=suffix)
+    digest, size = hashlib.sha256(), 0
+    with os.fdopen(fd, "wb") as out:
+        while True:
+            chunk = file_storage.stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+            size += len(chunk)
+    return Spooled(path, file_storage.filename, digest.hexdigest(), size)
+
+
+class UploadPipeline:
+    def __init__(self, uploader, fallback=None, workers=4, retries=2, backoff=0.5, run_async=True):
+        self.uploader = uploader
+        self.fallback = fallback
+        self.retries = retries
+        self.backoff = backoff
+        self.run_async = run_async
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload")
+
+    def _upload_one(self, item):
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    return self.uploader.upload(item)
+                except Exception as e:
+                    print(f"⚠️ Upload {item.filename} échoué ({self.uploader.name}, essai {attempt + 1}) : {e}")
+                    if attempt < self.retries:
+                        time.sleep(self.backoff * 2 ** attempt)
+            if self.fallback:
+                try:
+                    return self.fallback.upload(item)
+                except Exception as e:
+                    print(f"❌ Repli {self.fallback.name} échoué pour {item.filename} : {e}")
+            return None
+        finally:
+            try:
+                os.remove(item.path)
+            except OSError:
+                pass
+
+    # spooled : [Spooled] ; on_done(résultats) appelé une seule fois
+    def submit(self, spooled, on_done):
+        if not spooled:
+            on_done([])
+            return
+        if not self.run_async:
+            on_done([self._upload_one(item) for item in spooled])
+            return
+
+        results = [None] * len(spooled)
+        remaining = [len(spooled)]
+        lock = threading.Lock()
+
+        def run(index, item):
+            try:
+                results[index] = self._upload_one(item)
+            finally:
+                with lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    try:
+                        on_done(results)
+                    except Exception as e:
+                        print(f"❌ Finalisation des photos échouée : {e}")
+
+        for index, item in enumerate(spooled):
+            self.executor.submit(run, index, item)
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,118 @@
+# backend/writebehind.py
+# Écriture différée ("write-behind") des messages de chat envoyés par Socket.IO.
+# Le handler horodate et diffuse le message tout de suite, puis le confie à une file vidée par lots :
+# une transaction (un fsync) pour N messages au lieu d'une par message, et aucune connexion du pool
+# tenue par le greenlet de la socket. L'id est attribué par la base à l'INSERT du lot : il suit
+# l'ordre d'écriture, ce que suppose le curseur `after` de l'historique (Message.id > after).
+# L'appelant donne à chaque élément sa propre clé stable (uid) avant la mise en file.
+#
+# Garanties :
+#   - un message diffusé est écrit au plus tard `interval` secondes (ou `max_batch` messages) après ;
+#   - en cas d'arrêt propre (SIGTERM gunicorn, fin de processus) la file est vidée (atexit) ;
+#   - en cas de crash du processus, les messages encore en file (au plus un intervalle) sont perdus ;
+#   - base indisponible : le lot est remis en tête de file et retenté avec un délai croissant
+#     (plafonné à `max_backoff`), sans limite d'essais ; la file est bornée à `max_pending` éléments,
+#     au-delà `put` refuse et l'appelant écrit lui-même (synchrone) ;
+#   - une ligne refusée par la base (contrainte) est isolée, journalisée et abandonnée seule.
+# Lecture : `snapshot` donne les éléments pas encore écrits (en file ou lot en cours), à fusionner
+# avec ce qui est lu en base ; sur les autres workers, un message apparaît après son écriture.
+import atexit
+import threading
+
+
+class WriteBehindQueue:
+    def __init__(self, flush, max_batch=200, interval=0.005, max_pending=10_000, max_backoff=5.0,
+                 name="write-behind"):
+        self.flush = flush
+        self.max_batch = max_batch
+        self.interval = interval
+        self.max_pending = max_pending
+        self.max_backoff = max_backoff
+        self.name = name
+        self._items = []
+        self._inflight = []
+        self._failures = 0
+        self._lock = threading.Lock()
+        self._drain_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._closed = False
+        atexit.register(self.close)
+
+    # False si la file est pleine : l'élément n'est pas pris en charge
+    def put(self, item):
+        with self._lock:
+            if len(self._items) + len(self._inflight) >= self.max_pending:
+                return False
+            self._items.append(item)
+            full = len(self._items) >= self.max_batch
+            if self._thread is None:
+                # Thread lancé au premier message (greenlet sous gevent monkey-patché)
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        if full and not self._failures:
+            self._wakeup.set()
+        return True
+
+    def pending(self):
+        with self._lock:
+            return len(self._items) + len(self._inflight)
+
+    # Éléments pas encore écrits, du plus ancien au plus récent (filtrés par `match`)
+    def snapshot(self, match=None):
+        with self._lock:
+            items = self._inflight + self._items
+        return [item for item in items if match is None or match(item)]
+
+    def _take(self):
+        with self._lock:
+            batch, self._items = self._items[:self.max_batch], self._items[self.max_batch:]
+            self._inflight = batch
+            return batch
+
+    def _done(self, batch, ok):
+        with self._lock:
+            if not ok:
+                self._items[:0] = batch
+            self._inflight = []
+
+    # Écrit ce qui est en file ; appelable depuis n'importe quel thread.
+    # S'arrête au premier lot en échec (remis en file) et retourne False.
+    def drain(self):
+        with self._drain_lock:
+            while True:
+                batch = self._take()
+                if not batch:
+                    self._failures = 0
+                    return True
+                try:
+                    self.flush(batch)
+                except Exception as e:
+                    self._done(batch, False)
+                    self._failures += 1
+                    print(f"⚠️ {self.name} : écriture de {len(batch)} éléments échouée "
+                          f"(échec {self._failures}, {self.pending()} en file) : {e}")
+                    return False
+                self._done(batch, True)
+
+    def _delay(self):
+        if not self._failures:
+            return self.interval
+        return min(self.interval * 2 ** (self._failures + 3), self.max_backoff)
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self._delay())
+            self._wakeup.clear()
+            try:
+                self.drain()
+            except Exception as e:
+                print(f"❌ {self.name} : {e}")
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        if not self.drain():
+            print(f"❌ {self.name} : {self.pending()} éléments perdus à l'arrêt")